@@ -1,53 +1,82 @@
-import sys
+import io
+import logging
 from datetime import datetime
+from time import perf_counter_ns
 from storageDevice import SolidStateDrive
 from storageDevice import Ram
 import settings
+import request_log
+from metrics import SimulationMetrics, RAM, SSD, HDD, TIER_NAMES
+import trace_cache
+import trace_parser
 from placement_policy_rl import RLPlacement
 from migration_agent_system import MigrationAgentSystem
+from profiler import PhaseProfiler
+import checkpoint
+import devices
+import hdd_model
+import ssd_model
+import tiers
+import admission
+import belady
 
-READS_SSD = 0
-READS_HDD = 0
-WRITES_SSD = 0
-WRITES_HDD = 0
-READS_RAM = 0
-WRITES_RAM = 0
-HDD_SERVED_TIME = 0
-SSD_SERVED_TIME = 0
-RAM_SERVED_TIME = 0
+logger = request_log.get_logger('trace')
+
+# Policies written for the RAM / SSD / HDD hierarchy only (belady.py: their offline-optimal bounds)
+LEGACY_POLICIES = ('hashed', 'ssd_caching', 'f4') + tuple(belady.ORACLE_POLICIES)
 
 class Trace:
 
-    def __init__(self, env, resource_hdd, resource_ssd):
+    def __init__(self, env, resource_hdd, resource_ssd, config=settings):
+        # config: the settings module or any object with the same attribute names
+        # (see simulation.make_config), so runs can differ without touching settings
+        self.config = config
+        # Storage hierarchy, fastest tier first (settings.TIERS, see tiers.py); the
+        # classic RAM / SSD / HDD stack by default
+        self.tiers = tiers.tier_specs(config)
+        self.tier_names = tuple(spec.name for spec in self.tiers)
+        self.tier_spec = {spec.name: spec for spec in self.tiers}
+        self.metrics = SimulationMetrics(self.tier_names)
+        # Per-request output sink (settings.REQUEST_LOG); closed by simulation.run_simulation
+        self.request_log = request_log.make_request_log(config, self.tier_names)
+        self.log_request = self.request_log.write
         self.env = env
-        self.concurrent_access_hdd = resource_hdd
-        self.concurrent_access_ssd = resource_ssd
-        self.read_transferRateHDD = settings.READ_DATA_TRANSFER_RATE_HDD
-        self.write_transferRateHDD = settings.WRITE_DATA_TRANSFER_RATE_HDD
-        self.read_transferRateSSD = settings.READ_DATA_TRANSFER_RATE_SSD
-        self.write_transferRateSSD = settings.WRITE_DATA_TRANSFER_RATE_SSD
-        self.size_file_default = settings.DEFAULT_SIZE_FILE    # 128 MB size file by default
+        self.read_transferRateHDD = self.config.READ_DATA_TRANSFER_RATE_HDD
+        self.write_transferRateHDD = self.config.WRITE_DATA_TRANSFER_RATE_HDD
+        self.read_transferRateSSD = self.config.READ_DATA_TRANSFER_RATE_SSD
+        self.write_transferRateSSD = self.config.WRITE_DATA_TRANSFER_RATE_SSD
+        self.size_file_default = self.config.DEFAULT_SIZE_FILE    # 128 MB size file by default
         self.solidStateDrive = None
         self.ram = None
 
-        # NEW: Storage capacity tracking
-        self.ssd_used_bytes = 0
-        self.ram_used_bytes = 0
-        self.ssd_stored_files = {}  # {file_id: size_bytes}
-        self.ram_stored_files = {}  # {file_id: size_bytes}
-        self.access_order = []  # Track access order for LRU
-        self.eviction_policy = settings.EVICTION_POLICY
+        # NEW: Storage capacity tracking, one store per tier with a capacity, evicting
+        # by the tier's EVICTION_POLICY (eviction.py)
+        self.eviction_policy = tiers.eviction_policy(self.config)
+        self.tier_stores = {spec.name: spec.make_store()
+                            for spec in self.tiers if spec.capacity_bytes is not None}
 
         self.timestamp_unit_ns_factor = 1  # Factor for working timestamp in nanosecond unit
         self.size_file_unit_b_factor = 1  # Factor for working in Megabyte file size unit
         self.transfer_rate_unit_mbs_factor = 1  # Factor for working in transfer rate in Megabyte per seconds
         self.transfer_rate_ms_factor = 1000     # Factor for working file transfer rate duration in milliseconds
-        self.replacement_policy = settings.REPLACEMENT_POLICY.lower()
-        timestamp_unit = settings.TIMESTAMP_UNIT
-        size_file_unit = settings.SIZE_FILE_UNIT
-        
-        ssd_capacity_bytes = settings.SSD_CAPACITY_BYTES
-        ram_capacity_bytes = settings.RAM_CAPACITY_BYTES
+        self.replacement_policy = self.config.REPLACEMENT_POLICY.lower()
+        # The legacy transfer a request goes through (an oracle policy reuses its online one's)
+        self.transfer_policy = belady.ORACLE_POLICIES.get(self.replacement_policy, self.replacement_policy)
+        timestamp_unit = self.config.TIMESTAMP_UNIT
+        size_file_unit = self.config.SIZE_FILE_UNIT
+        if self.replacement_policy in LEGACY_POLICIES and not tiers.is_default(self.tiers):
+            raise ValueError(f"REPLACEMENT_POLICY '{self.replacement_policy}' needs the RAM / SSD / HDD tiers "
+                             f"(TIERS has {', '.join(self.tier_names)})")
+        # all_<tier>: every request served by that tier
+        self.all_tier = None
+        if self.replacement_policy.startswith('all_'):
+            self.all_tier = self.replacement_policy[len('all_'):].upper()
+            if self.all_tier not in self.tier_spec:
+                raise ValueError(f"Unknown tier in REPLACEMENT_POLICY '{self.replacement_policy}' "
+                                 f"(expected one of {', '.join(self.tier_names)})")
+        
+        ssd_capacity_bytes = self.config.SSD_CAPACITY_BYTES
+        ram_capacity_bytes = self.config.RAM_CAPACITY_BYTES
 
         self.second_to_nanosecond = 1000 * 1000 * 1000
         self.nanosecond_to_millisecond = 1 / float(1000 * 1000)
@@ -78,46 +107,202 @@ class Trace:
         self.write_transferRateSSD = self.write_transferRateSSD * mb_to_byte
 
         if self.replacement_policy == 'ssd_caching':
-            self.solidStateDrive = SolidStateDrive(capacity_bytes=ssd_capacity_bytes)
+            # Optional TinyLFU admission of HDD misses (settings.SSD_ADMISSION, admission.py)
+            ssd_admission = admission.make_admission(getattr(self.config, 'SSD_ADMISSION', None),
+                                                     ssd_capacity_bytes, self.config)
+            self.solidStateDrive = SolidStateDrive(capacity_bytes=ssd_capacity_bytes,
+                                                   eviction_policy=self.eviction_policy,
+                                                   admission=ssd_admission)
         elif self.replacement_policy == 'f4':
-            self.ram = Ram(capacity_bytes=ram_capacity_bytes)
+            self.ram = Ram(capacity_bytes=ram_capacity_bytes, eviction_policy=self.eviction_policy)
+        elif self.replacement_policy in belady.ORACLE_POLICIES:
+            # Upper bound of ssd_caching / f4: their cache evicts by Bélády's MIN over the
+            # whole trace, read up front (belady.py)
+            future = belady.load_future(self.config)
+            if belady.ORACLE_POLICIES[self.replacement_policy] == 'ssd_caching':
+                self.solidStateDrive = SolidStateDrive(
+                    capacity_bytes=ssd_capacity_bytes,
+                    cache=belady.BeladyEviction(ssd_capacity_bytes, future))
+            else:
+                self.ram = Ram(capacity_bytes=ram_capacity_bytes,
+                               cache=belady.BeladyEviction(ram_capacity_bytes, future))
         elif self.replacement_policy == 'rl_c51':
-            # RL agent will decide tier per request
-            self.solidStateDrive = SolidStateDrive(capacity_bytes=ssd_capacity_bytes)
-            self.ram = Ram(capacity_bytes=ram_capacity_bytes)
+            # RL agent will decide tier per request: one action per tier
+            self.solidStateDrive = SolidStateDrive(capacity_bytes=ssd_capacity_bytes,
+                                                   eviction_policy=self.eviction_policy)
+            self.ram = Ram(capacity_bytes=ram_capacity_bytes, eviction_policy=self.eviction_policy)
             self.rl = RLPlacement(ssd_cap=ssd_capacity_bytes, ram_cap=ram_capacity_bytes,
-                                  device=getattr(settings, 'RL_DEVICE', 'cpu'))
+                                  device=getattr(self.config, 'RL_DEVICE', 'cpu'),
+                                  tier_names=self.tier_names)
         
-        # NEW: Initialize unified agent system (works with all policies)
+        # NEW: Initialize unified agent system (works with all policies); migrates along the hierarchy
         self.agent_system = MigrationAgentSystem(
             ssd_capacity_bytes=ssd_capacity_bytes,
             ram_capacity_bytes=ram_capacity_bytes,
             env=self.env,
-            placement_agent=getattr(self, 'rl', None)  # Pass RL agent if it exists
+            placement_agent=getattr(self, 'rl', None),  # Pass RL agent if it exists
+            hierarchy=[(spec.name, spec.capacity_bytes) for spec in self.tiers]
         )
         self.agent_check_counter = 0
-        
-        print("[INIT] Migration Agent System initialized")
-        print(f"  SSD capacity: {ssd_capacity_bytes / 1e9:.1f}GB")
-        print(f"  RAM capacity: {ram_capacity_bytes / 1e9:.1f}GB")
-        print(f"  Placement policy: {self.replacement_policy}")
-        print(f"  Migration enabled: Yes")
+
+        # Device service per tier. Memory tiers (no devices) are served without queueing.
+        # A device tier shares one resource of `devices` servers (flat model: latency +
+        # size / rate), or becomes a per-device array: the mechanical HDD model
+        # (hdd_model.py), the internal SSD model (ssd_model.py), or the flat model with a
+        # queue per device (settings.DEVICE_QUEUES). Array requests are placed on the
+        # devices by DEVICE_LAYOUT (devices.py).
+        layout = getattr(self.config, 'DEVICE_LAYOUT', devices.DEVICE_LAYOUT)
+        stripe_bytes = getattr(self.config, 'STRIPE_UNIT_BYTES', devices.STRIPE_UNIT_BYTES)
+        group_size = getattr(self.config, 'DEVICE_GROUP_SIZE', devices.DEVICE_GROUP_SIZE)
+        device_queues = getattr(self.config, 'DEVICE_QUEUES', False)
+        resource_class = type(resource_hdd)
+        shared = {TIER_NAMES[HDD]: resource_hdd, TIER_NAMES[SSD]: resource_ssd}
+        self.tier_resource = {}    # tier name -> shared resource (flat model)
+        self.tier_devices = {}     # tier name -> per-device array
+        self.tier_layout = {}      # tier name -> DeviceLayout of its array
+        for spec in self.tiers:
+            if spec.is_memory:
+                continue
+            if spec.model == 'mechanical':
+                array = hdd_model.HDDArray(self.env, self.config, spec.devices, spec.read_rate, spec.write_rate)
+            elif spec.model == 'internal':
+                array = ssd_model.SSDArray(self.env, self.config, spec.devices, spec.capacity_bytes)
+            elif device_queues:
+                array = devices.DeviceQueues(self.env, resource_class, spec.devices, spec.read_rate,
+                                             spec.write_rate, group_size, spec.latency_ns)
+            else:
+                resource = shared.get(spec.name)
+                if resource is None or resource.capacity != spec.devices:
+                    resource = resource_class(self.env, capacity=spec.devices)
+                self.tier_resource[spec.name] = resource
+                continue
+            if spec.capacity_bytes is not None:
+                device_bytes = spec.capacity_bytes // spec.devices
+            else:
+                device_bytes = getattr(self.config, 'HDD_CAPACITY_BYTES', hdd_model.HDD_CAPACITY_BYTES)
+            self.tier_devices[spec.name] = array
+            self.tier_layout[spec.name] = devices.DeviceLayout(spec.devices, layout, stripe_bytes, device_bytes)
+
+        # Phase profiler (settings.PROFILE): timing wrappers on this run's objects only,
+        # nothing is wrapped when profiling is off (see profiler.py)
+        self.profiler = None
+        if getattr(self.config, 'PROFILE', False):
+            self.profiler = PhaseProfiler()
+            self.instrument_phases()
+
+        # Checkpoint/resume (settings.CHECKPOINT_EVERY / RESUME_FROM, see checkpoint.py);
+        # resume_row is the first trace row source_trace_rl dispatches
+        self.checkpointer = None
+        if getattr(self.config, 'CHECKPOINT_EVERY', 0):
+            self.checkpointer = checkpoint.Checkpointer(self.config)
+        self.resume_row = 0
+        
+        logger.info("[INIT] Migration Agent System initialized")
+        for spec in self.tiers:
+            if spec.capacity_bytes is not None:
+                logger.info("  %s capacity: %.1fGB", spec.name, spec.capacity_bytes / 1e9)
+        logger.info("  Placement policy: %s", self.replacement_policy)
+        logger.info("  Migration enabled: Yes")
+
+    # Used bytes and stored files of the classic SSD / RAM tiers (0 / {} if absent)
+    @property
+    def ssd_used_bytes(self):
+        store = self.tier_stores.get(TIER_NAMES[SSD])
+        return store.used_bytes if store is not None else 0
+
+    @property
+    def ram_used_bytes(self):
+        store = self.tier_stores.get(TIER_NAMES[RAM])
+        return store.used_bytes if store is not None else 0
+
+    @property
+    def ssd_stored_files(self):
+        store = self.tier_stores.get(TIER_NAMES[SSD])
+        return store.files if store is not None else {}
+
+    @property
+    def ram_stored_files(self):
+        store = self.tier_stores.get(TIER_NAMES[RAM])
+        return store.files if store is not None else {}
+
+    def tier_usage(self):
+        """Used bytes by tier name, for the tiers with a capacity."""
+        return {name: store.used_bytes for name, store in self.tier_stores.items()}
+
+    def instrument_phases(self):
+        """Wrap this run's agent, migration system and capacity checks with the phase profiler."""
+        if getattr(self, 'rl', None) is not None:
+            self.profiler.instrument(self.rl.agent, 'act', 'act')
+            self.profiler.instrument(self.rl.agent, 'learn', 'learn')
+        self.profiler.instrument(self.agent_system, 'track_io_request', 'migrate')
+        self.profiler.instrument(self.agent_system, 'periodic_update', 'migrate')
+        self.profiler.instrument(self, 'admit', 'bookkeeping')
+
+    # Simulation state saved by checkpoints; everything else is derived from the config
+    CHECKPOINT_ATTRS = ('metrics', 'tier_stores', 'solidStateDrive', 'ram', 'rl', 'agent_system',
+                        'agent_check_counter')
+
+    def checkpoint_state(self):
+        """The live simulation-state objects by attribute name, for pickling while no request is in flight."""
+        state = {name: getattr(self, name) for name in self.CHECKPOINT_ATTRS if hasattr(self, name)}
+        # Per-device state (head positions, die timelines, GC debt, load) by tier and array
+        # type; the device parameters come from the config
+        state['tier_devices'] = {name: (type(array).__name__, array.device_state())
+                                 for name, array in self.tier_devices.items()}
+        return state
+
+    def restore_checkpoint_state(self, state):
+        """Replace this Trace's simulation state by a checkpoint's; capacities follow this run's config."""
+        self.agent_system.migration_executor.stop()
+        if self.profiler is not None:
+            self.profiler.detach()
+        state = dict(state)
+        saved_devices = state.pop('tier_devices', {})
+        for name, array in self.tier_devices.items():
+            saved = saved_devices.get(name)
+            if saved is not None and saved[0] == type(array).__name__:
+                array.restore_devices(saved[1])
+        # Stored files of the tiers this run has; a tier new to this run starts empty
+        saved_stores = state.pop('tier_stores', {})
+        for name, value in state.items():
+            setattr(self, name, value)
+        for name, store in self.tier_stores.items():
+            store = self.tier_stores[name] = saved_stores.get(name, store)
+            store.capacity_bytes = self.tier_spec[name].capacity_bytes
+        ssd_capacity_bytes = self.config.SSD_CAPACITY_BYTES
+        ram_capacity_bytes = self.config.RAM_CAPACITY_BYTES
+        if self.solidStateDrive is not None:
+            self.solidStateDrive.capacity_bytes = ssd_capacity_bytes
+        if self.ram is not None:
+            self.ram.capacity_bytes = ram_capacity_bytes
+        if getattr(self, 'rl', None) is not None:
+            self.rl.ssd_cap = ssd_capacity_bytes
+            self.rl.ram_cap = ram_capacity_bytes
+        self.agent_system.device_hierarchy = list(self.tier_names)
+        self.agent_system.tier_capacity = {spec.name: spec.capacity_bytes for spec in self.tiers}
+        self.agent_system.env = self.env
+        self.agent_system.migration_executor.start()
+        if self.profiler is not None:
+            self.instrument_phases()
 
 
     def source_trace(self, delimeter, column_id, column_timestamp, column_size, column_type_operation, file_path=None):
         prevTime = 0
         i = 0
         size_file = 0
+
+        # A columnar trace cache (trace_cache.py) replays without re-parsing text
+        if trace_cache.is_cache(file_path):
+            yield from self.source_trace_cached(trace_cache.TraceCache(file_path))
+            return
         
-        # If file_path is provided, read from file; otherwise read from stdin
-        if file_path:
-            try:
-                lines = open(file_path, 'r')
-            except FileNotFoundError:
-                print(f"Error: File '{file_path}' not found!")
-                return
-        else:
-            lines = sys.stdin
+        # If file_path is provided, read from file; otherwise read from stdin.
+        # gzip/bz2/xz input is decompressed on the fly (trace_parser.open_trace)
+        try:
+            lines = io.TextIOWrapper(trace_parser.open_trace(file_path))
+        except FileNotFoundError:
+            logger.error("Error: File '%s' not found!", file_path)
+            return
         
         for line in lines:
             line = line.strip()
@@ -145,31 +330,63 @@ class Trace:
                 type_operation = 'Read'
             else:
                 type_operation = campos[column_type_operation]
-            if self.replacement_policy == 'ssd_caching':
-                self.env.process(self.transfer_with_ssd_caching(file_id, size_file, type_operation))
-            elif self.replacement_policy == 'f4':
-                self.env.process(self.transfer_with_f_four(file_id, size_file, type_operation, campos[-1]))
-            elif self.replacement_policy == 'hashed':
-                self.env.process(self.transfer_with_hashed(file_id, size_file, type_operation))
-            elif self.replacement_policy == 'rl_c51':
+            is_seq, inter_arrival_s = False, 0.0
+            if self.replacement_policy == 'rl_c51':
                 # infer seq/rand from column: campos[4]
                 is_seq = (campos[4].strip().lower() == 'seq') if len(campos) > 4 else False
                 inter_arrival_s = float(campos[5]) if len(campos) > 5 else 0.0
-                is_read = (type_operation.lower() == 'read')
-                self.env.process(self.transfer_with_rl(file_id, size_file, is_read, is_seq, inter_arrival_s))
-            elif self.replacement_policy == 'all_ram':
-                is_read = (type_operation.lower() == 'read')
-                self.env.process(self.transfer_with_all_ram(file_id, size_file, is_read))
-            elif self.replacement_policy == 'all_ssd':
-                is_read = (type_operation.lower() == 'read')
-                self.env.process(self.transfer_with_all_ssd(file_id, size_file, is_read))
-            elif self.replacement_policy == 'all_hdd':
-                is_read = (type_operation.lower() == 'read')
-                self.env.process(self.transfer_with_all_hdd(file_id, size_file, is_read))
+            self.dispatch_request(file_id, size_file, type_operation, campos[-1], is_seq, inter_arrival_s)
         
-        # Close file if it was opened (not stdin)
-        if file_path:
-            lines.close()
+        # Close file (stdin itself stays open)
+        lines.close()
+
+    def source_trace_cached(self, cache):
+        """Replay a columnar trace cache with the legacy policies.
+
+        Mirrors source_trace on the MSRC columns: timestamp deltas drive arrivals,
+        LBA is the file id and block_size is scaled by SIZE_FILE_UNIT. The cache has
+        no zone column, so f4 (hot / cold by zone) cannot replay from it.
+        """
+        if self.transfer_policy == 'f4':
+            raise ValueError(f"REPLACEMENT_POLICY '{self.replacement_policy}' needs the zone column of a "
+                             f"legacy text trace; a trace cache has none (set FILE_PATH to the text trace)")
+        cols = cache.columns
+        prevTime = None
+        for start in range(0, len(cache), 65536):
+            stop = start + 65536
+            rows = zip(cols['timestamp'][start:stop].tolist(),
+                       cols['is_read'][start:stop].tolist(),
+                       cols['lba'][start:stop].tolist(),
+                       cols['block_size'][start:stop].tolist(),
+                       cols['is_seq'][start:stop].tolist(),
+                       cols['inter_arrival'][start:stop].tolist())
+            for actualTime, is_read, lba, block_size, is_seq, inter_arrival_s in rows:
+                if prevTime is None:
+                    prevTime = actualTime
+                delay = (actualTime - prevTime) * self.timestamp_unit_ns_factor
+                prevTime = actualTime
+                if delay < 0:
+                    delay = 0
+                yield self.env.timeout(delay)
+                size_file = block_size * self.size_file_unit_b_factor
+                type_operation = 'Read' if is_read else 'Write'
+                self.dispatch_request(str(lba), size_file, type_operation, '', bool(is_seq), inter_arrival_s)
+
+    def dispatch_request(self, file_id, size_file, type_operation, zone, is_seq, inter_arrival_s):
+        """Start the transfer process of the configured legacy policy for one request."""
+        policy = self.transfer_policy
+        if policy == 'ssd_caching':
+            self.env.process(self.transfer_with_ssd_caching(file_id, size_file, type_operation, is_seq))
+        elif policy == 'f4':
+            self.env.process(self.transfer_with_f_four(file_id, size_file, type_operation, zone, is_seq))
+        elif self.replacement_policy == 'hashed':
+            self.env.process(self.transfer_with_hashed(file_id, size_file, type_operation, is_seq))
+        elif self.replacement_policy == 'rl_c51':
+            is_read = (type_operation.lower() == 'read')
+            self.env.process(self.transfer_with_rl(file_id, size_file, is_read, is_seq, inter_arrival_s))
+        elif self.all_tier is not None:
+            is_read = (type_operation.lower() == 'read')
+            self.env.process(self.transfer_with_all_tier(self.all_tier, file_id, size_file, is_read, is_seq))
 
     def source_trace_rl(self, file_path=None):
         """Read trace file in RL format: timestamp, operation, LBA, block_size, seq/rand, inter_arrival, service_time, idle_time
@@ -180,52 +397,91 @@ class Trace:
         This method is optimized for the RL placement policy which needs direct access to
         all trace fields for feature extraction.
         """
-        from features import create_feature_extractor
-        
-        if file_path is None:
-            print("Error: RL policy requires FILE_PATH to be set in settings!")
-            return
+        from features import FeatureExtractor
         
+        # file_path None reads stdin; the extractor then normalizes in streaming mode.
+        # Ingestion options come from this run's config, not the settings module
+        cfg = self.config
+        prof = self.profiler
+        t0 = perf_counter_ns()
         try:
-            fe = create_feature_extractor()
+            fe = FeatureExtractor(file_path if file_path is not None else '-',
+                                  use_cache=getattr(cfg, 'TRACE_CACHE', None),
+                                  streaming=getattr(cfg, 'FEATURE_NORMALIZATION', 'prescan') == 'streaming',
+                                  lookahead=getattr(cfg, 'STREAMING_LOOKAHEAD', None),
+                                  parse_workers=getattr(cfg, 'TRACE_PARSE_WORKERS', None),
+                                  tier_names=self.tier_names)
         except Exception as e:
-            print(f"Error initializing FeatureExtractor: {e}")
+            logger.error("Error initializing FeatureExtractor: %s", e)
             return
-        
-        for idx, (state_vec, raw) in enumerate(fe.iter_states()):
-            # Calculate inter-arrival time (time to wait before processing this request)
-            inter_arrival = raw['inter']
-            if idx == 0:
-                # Skip inter-arrival delay on first request
-                inter_arrival = 0
-            
-            # Convert to nanoseconds for SimPy
-            inter_arrival_ns = inter_arrival * self.second_to_nanosecond
-            yield self.env.timeout(inter_arrival_ns)
-            
-            # Extract fields from raw trace data
-            file_id = str(int(raw['file_id']))
-            size_file = int(raw['block_size'])
-            is_read = bool(raw['is_read'])
-            service_time_s = raw['service']  # service_time in seconds (only used for RL reward)
-            
-            # Process request based on replacement policy
-            if self.replacement_policy == 'rl_c51':
-                self.env.process(self.transfer_with_rl_state(
-                    file_id=file_id,
-                    size_file=size_file,
-                    is_read=is_read,
-                    state_vec=state_vec,
-                    service_time_s=service_time_s
-                ))
-            elif self.replacement_policy == 'all_ram':
-                self.env.process(self.transfer_with_all_ram(file_id, size_file, is_read))
-            elif self.replacement_policy == 'all_ssd':
-                self.env.process(self.transfer_with_all_ssd(file_id, size_file, is_read))
-            elif self.replacement_policy == 'all_hdd':
-                self.env.process(self.transfer_with_all_hdd(file_id, size_file, is_read))
-
-    def transfer_with_hashed(self, file_id, size_file, type_operation):
+        if getattr(self, 'rl', None) is not None:
+            self.rl.feature_extractor = fe
+        batches = fe.iter_batches()
+        if prof is not None:
+            # Construction covers the normalization pre-scan; chunks are timed as they are parsed
+            prof.add('parse', perf_counter_ns() - t0)
+            batches = prof.iterate(batches, 'parse')
+        
+        # Batch cursor: rows arrive as parsed chunks with a precomputed state matrix,
+        # columns are converted to Python lists once per chunk
+        first = True
+        ckpt = self.checkpointer
+        resume_row = self.resume_row
+        base = 0    # trace row of the batch's first record
+        for batch in batches:
+            rec = batch.records
+            n = len(rec)
+            if base + n <= resume_row:
+                # Dispatched before the checkpoint this run resumed from
+                base += n
+                continue
+            start = max(resume_row - base, 0)
+            rows = zip(rec['inter_arrival'][start:].tolist(), rec['lba'][start:].tolist(),
+                       rec['block_size'][start:].tolist(), rec['is_read'][start:].tolist(),
+                       rec['service'][start:].tolist(), rec['is_seq'][start:].tolist())
+            for i, (inter_arrival, lba, block_size, is_read, service_time_s, is_seq) in enumerate(rows, start):
+                # Calculate inter-arrival time (time to wait before processing this request)
+                if first:
+                    # Skip inter-arrival delay on first request (and on the first one after a resume,
+                    # whose delay elapsed before the checkpoint)
+                    inter_arrival = 0
+                    first = False
+                
+                # Convert to nanoseconds for SimPy
+                inter_arrival_ns = inter_arrival * self.second_to_nanosecond
+                yield self.env.timeout(inter_arrival_ns)
+
+                # Checkpoint only while no request is in flight: processes cannot be saved.
+                # If none has been idle for a whole interval, stop dispatching until they finish
+                if ckpt is not None and base + i >= ckpt.next_row:
+                    if self.env.peek() != float('inf') and ckpt.overdue(base + i):
+                        while self.env.peek() != float('inf'):
+                            yield self.env.timeout(self.env.peek() - self.env.now)
+                    if self.env.peek() == float('inf'):
+                        ckpt.save(self, base + i)
+                
+                # Extract fields from raw trace data
+                file_id = str(lba)
+                size_file = block_size
+                is_read = bool(is_read)
+                is_seq = bool(is_seq)
+                # service_time_s: service_time in seconds (only used for RL reward)
+                
+                # Process request based on replacement policy
+                if self.replacement_policy == 'rl_c51':
+                    self.env.process(self.transfer_with_rl_state(
+                        file_id=file_id,
+                        size_file=size_file,
+                        is_read=is_read,
+                        state_vec=fe.state_at(batch, i),
+                        service_time_s=service_time_s,
+                        is_seq=is_seq
+                    ))
+                elif self.all_tier is not None:
+                    self.env.process(self.transfer_with_all_tier(self.all_tier, file_id, size_file, is_read, is_seq))
+            base += n
+
+    def transfer_with_hashed(self, file_id, size_file, type_operation, is_seq=False):
         locationSelected = ''
         # print ('Trace %s arriving at %d [ms]' % (file_id, self.env.now))
         capeSelected = self.getCapeSelected(file_id)
@@ -234,62 +490,110 @@ class Trace:
             transferRateSSD = self.read_transferRateSSD
             transferRateHDD = self.read_transferRateHDD
             if capeSelected == 1:
-                global READS_SSD
-                READS_SSD += 1
+                self.metrics.reads[SSD] += 1
             else:
-                global READS_HDD
-                READS_HDD += 1
+                self.metrics.reads[HDD] += 1
         else:
             transferRateSSD = self.write_transferRateSSD
             transferRateHDD = self.write_transferRateHDD
             if capeSelected == 1:
-                global WRITES_SSD
-                WRITES_SSD += 1
+                self.metrics.writes[SSD] += 1
             else:
-                global WRITES_HDD
-                WRITES_HDD += 1
+                self.metrics.writes[HDD] += 1
 
         if capeSelected == 1:
             transferDuration = (size_file / float(transferRateSSD)) * self.second_to_nanosecond
             transferDuration = int(transferDuration)
             locationSelected = 'SSD'
-            with self.concurrent_access_ssd.request() as req:
-                arrived_time = self.env.now
-                yield req
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time = returned_time - arrived_time
-                global SSD_SERVED_TIME
-                SSD_SERVED_TIME = SSD_SERVED_TIME + served_time
-                # Save time values in millisecond unit [ms]
-                arrived_time = int(arrived_time * self.nanosecond_to_millisecond)
-                returned_time = int(returned_time * self.nanosecond_to_millisecond)
-                served_time = int(served_time * self.nanosecond_to_millisecond)
-                print(str(file_id) + ',' + str(arrived_time) + ',' + str(returned_time) + ',' + str(served_time) + ',' + locationSelected)
+            arrived_time, started_time, returned_time = yield from self.ssd_transfer(
+                file_id, size_file, type_operation == 'read', transferDuration)
+            served_time = returned_time - arrived_time
+            self.metrics.served_time[SSD] += served_time
+            self.metrics.observe(SSD, type_operation == 'read', size_file, arrived_time, started_time, returned_time)
+            self.log_request(file_id, arrived_time, returned_time, served_time, locationSelected)
         else:
             transferDuration = (size_file / float(transferRateHDD)) * self.second_to_nanosecond
             transferDuration =  int(transferDuration)
             locationSelected = 'HDD'
-            with self.concurrent_access_hdd.request() as req:
-                arrived_time = self.env.now
-                yield req
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time = returned_time - arrived_time
-                global HDD_SERVED_TIME
-                HDD_SERVED_TIME = HDD_SERVED_TIME + served_time
-                # Save time values in millisecond unit [ms]
-                arrived_time = int(arrived_time * self.nanosecond_to_millisecond)
-                returned_time = int(returned_time * self.nanosecond_to_millisecond)
-                served_time = int(served_time * self.nanosecond_to_millisecond)
-                print(str(file_id) + ',' + str(arrived_time) + ',' + str(returned_time) + ',' + str(served_time) + ',' + locationSelected)
+            arrived_time, started_time, returned_time = yield from self.hdd_transfer(
+                file_id, size_file, type_operation == 'read', is_seq, transferDuration)
+            served_time = returned_time - arrived_time
+            self.metrics.served_time[HDD] += served_time
+            self.metrics.observe(HDD, type_operation == 'read', size_file, arrived_time, started_time, returned_time)
+            self.log_request(file_id, arrived_time, returned_time, served_time, locationSelected)
         # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  self.env.now))
 
+    def tier_transfer(self, tier, file_id, size_file, is_read, is_seq=False):
+        """Serve one request on any tier of the hierarchy and return (arrived, started, returned) times.
+
+        Flat service time: the tier's latency plus size / transfer rate (no transfer time
+        for a memory tier without rates). Memory tiers serve it without queueing, device
+        tiers through device_transfer.
+        """
+        spec = self.tier_spec[tier]
+        rate = spec.read_rate if is_read else spec.write_rate
+        transferDuration = spec.latency_ns
+        if rate:
+            transferDuration += (size_file / float(rate)) * self.second_to_nanosecond
+        transferDuration = int(transferDuration)
+        if spec.is_memory:
+            arrived_time = self.env.now
+            yield self.env.timeout(transferDuration)
+            return arrived_time, arrived_time, self.env.now
+        return (yield from self.device_transfer(tier, file_id, size_file, is_read, is_seq, transferDuration))
+
+    def device_transfer(self, tier, file_id, size_file, is_read, is_seq, transferDuration):
+        """Serve one request on a device tier and return (arrived, started, returned) times.
+
+        Flat model: transferDuration on the tier's shared resource, or on the request's
+        devices with DEVICE_QUEUES (devices.py). Mechanical model: queued on the request's
+        drives, whose seek, rotation and transfer time replace transferDuration
+        (hdd_model.py). Internal model: die parallelism, read/program latency and GC
+        stalls at the tier's current fullness replace it (ssd_model.py).
+        """
+        array = self.tier_devices.get(tier)
+        if array is not None:
+            store = self.tier_stores.get(tier)
+            fullness = store.used_bytes / float(store.capacity_bytes) if store is not None and store.capacity_bytes > 0 \
+                else 0.0
+            return (yield from self.tier_layout[tier].route(self.env, array.serve, hdd_model.lba_of(file_id),
+                                                            size_file, is_read, is_seq, fullness))
+        with self.tier_resource[tier].request() as req:
+            arrived_time = self.env.now
+            yield req
+            started_time = self.env.now
+            yield self.env.timeout(transferDuration)
+            return arrived_time, started_time, self.env.now
+
+    def ssd_transfer(self, file_id, size_file, is_read, transferDuration):
+        """Serve one request on the SSD tier (device_transfer)."""
+        return (yield from self.device_transfer(TIER_NAMES[SSD], file_id, size_file, is_read, False,
+                                                transferDuration))
+
+    def hdd_transfer(self, file_id, size_file, is_read, is_seq, transferDuration):
+        """Serve one request on the HDD tier (device_transfer)."""
+        return (yield from self.device_transfer(TIER_NAMES[HDD], file_id, size_file, is_read, is_seq,
+                                                transferDuration))
+
+    def record_request(self, tier, file_id, size_file, is_read, arrived_time, started_time, returned_time):
+        """Count a served request in the tier's metrics and the request log; returns its served time (ns)."""
+        index = self.metrics.tier_index[tier]
+        served_time_ns = returned_time - arrived_time
+        self.metrics.served_time[index] += served_time_ns
+        self.metrics.observe(index, is_read, size_file, arrived_time, started_time, returned_time)
+        if is_read:
+            self.metrics.reads[index] += 1
+        else:
+            self.metrics.writes[index] += 1
+        # Per-request output (request_log.py)
+        self.log_request(file_id, arrived_time, returned_time, served_time_ns, tier)
+        return served_time_ns
+
     def getCapeSelected(self, id):
         value = hash(id)
         return value & 1
 
-    def transfer_with_ssd_caching(self, file_id, size_file, type_operation):
+    def transfer_with_ssd_caching(self, file_id, size_file, type_operation, is_seq=False):
         locationSelected = ''
         # print ('Trace %s arriving at %d [ms]' % (file_id, self.env.now))
         value = self.solidStateDrive.get_data(file_id)
@@ -297,76 +601,59 @@ class Trace:
         if type_operation == 'read':
             transferRateSSD = self.read_transferRateSSD
             transferRateHDD = self.read_transferRateHDD
-            if value == -1:
-                global READS_HDD
-                READS_HDD += 1
+            if value is None:
+                self.metrics.reads[HDD] += 1
             else:
-                global READS_SSD
-                READS_SSD += 1
+                self.metrics.reads[SSD] += 1
         else:
             transferRateSSD = self.write_transferRateSSD
             transferRateHDD = self.write_transferRateHDD
-            if value == -1:
-                global WRITES_HDD
-                WRITES_HDD += 1
+            if value is None:
+                self.metrics.writes[HDD] += 1
             else:
-                global WRITES_SSD
-                WRITES_SSD += 1
+                self.metrics.writes[SSD] += 1
 
-        if value == -1: # The file_id is not in Solid State Drive
+        if value is None: # The file_id is not in Solid State Drive
             transferDuration = (size_file / float(transferRateHDD)) * self.second_to_nanosecond
             transferDuration = int(transferDuration)
             locationSelected = 'HDD'
-            with self.concurrent_access_hdd.request() as req_hdd:
-                arrived_time = self.env.now
-                yield req_hdd
-                # print ('Trace hdd %s arriving at %d [ms]' % (file_id, arrived_time))
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time = returned_time - arrived_time
-                global HDD_SERVED_TIME
-                HDD_SERVED_TIME = HDD_SERVED_TIME + served_time
-                # Save time values in millisecond unit [ms]
-                # arrived_time = int(arrived_time * self.nanosecond_to_millisecond)
-                # returned_time = int(returned_time * self.nanosecond_to_millisecond)
-                # served_time = int(served_time * self.nanosecond_to_millisecond)
-                print(str(file_id) + ',' + str(arrived_time) + ',' + str(returned_time) + ',' + str(served_time) + ',' + locationSelected)
-                # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
-            self.solidStateDrive.set_data(file_id, 5)
+            arrived_time, started_time, returned_time = yield from self.hdd_transfer(
+                file_id, size_file, type_operation == 'read', is_seq, transferDuration)
+            served_time = returned_time - arrived_time
+            self.metrics.served_time[HDD] += served_time
+            self.metrics.observe(HDD, type_operation == 'read', size_file, arrived_time, started_time, returned_time)
+            self.log_request(file_id, arrived_time, returned_time, served_time, locationSelected)
+            # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
+            self.solidStateDrive.set_data(file_id, int(size_file))
         else: # else we need to move to solid state drive the file id
             transferDuration = (size_file / float(transferRateSSD)) * self.second_to_nanosecond
             transferDuration = int(transferDuration)
             locationSelected = 'SSD'
-            with self.concurrent_access_ssd.request() as req_ssd:
-                arrived_time = self.env.now
-                yield req_ssd
-                # print ('Trace ssd %s arriving at %d [ms]' % (file_id, arrived_time))
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time = returned_time - arrived_time
-                global SSD_SERVED_TIME
-                SSD_SERVED_TIME = SSD_SERVED_TIME + served_time
-                # Save time values in millisecond unit [ms]
-                # arrived_time = int(arrived_time * self.nanosecond_to_millisecond)
-                # returned_time = int(returned_time * self.nanosecond_to_millisecond)
-                # served_time = int(served_time * self.nanosecond_to_millisecond)
-                print(str(file_id) + ',' + str(arrived_time) + ',' + str(returned_time) + ',' + str(served_time) + ',' + locationSelected)
-                # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
-        
-        # NEW: Check SSD capacity after storing (both HDD and SSD paths)
-        self.check_ssd_capacity(file_id, size_file)
+            arrived_time, started_time, returned_time = yield from self.ssd_transfer(
+                file_id, size_file, type_operation == 'read', transferDuration)
+            served_time = returned_time - arrived_time
+            self.metrics.served_time[SSD] += served_time
+            self.metrics.observe(SSD, type_operation == 'read', size_file, arrived_time, started_time, returned_time)
+            self.log_request(file_id, arrived_time, returned_time, served_time, locationSelected)
+            # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
+        
+        # NEW: Check SSD capacity after storing (both HDD and SSD paths); a miss the
+        # admission filter rejected is not on the SSD
+        if file_id in self.solidStateDrive:
+            self.check_ssd_capacity(file_id, size_file)
         # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  self.env.now))
 
-    def transfer_with_f_four(self, file_id, size_file, type_operation, zone):
+    def transfer_with_f_four(self, file_id, size_file, type_operation, zone, is_seq=False):
         locationSelected = ''
         # print ('Trace %s arriving at %d [ms]' % (file_id, self.env.now))
         value = self.ram.get_data(file_id)
         if value is not None and value >= 0:  # The file_id is in RAM
-            global READS_RAM
-            READS_RAM += 1
+            self.metrics.reads[RAM] += 1
             transferDuration = 10      # [ns]
             locationSelected = 'RAM'
+            arrived_time = self.env.now
             yield self.env.timeout(transferDuration)
+            self.metrics.observe(RAM, True, size_file, arrived_time, arrived_time, self.env.now)
             # print ('Finished reading trace %s in %s at %d [ms]' % (file_id, locationSelected,  self.env.now))
         else:
             type_operation = type_operation.lower()
@@ -374,62 +661,43 @@ class Trace:
                 transferRateSSD = self.read_transferRateSSD
                 transferRateHDD = self.read_transferRateHDD
                 if zone == 'hot':
-                    global READS_SSD
-                    READS_SSD += 1
+                    self.metrics.reads[SSD] += 1
                 else:
-                    global READS_HDD
-                    READS_HDD += 1
+                    self.metrics.reads[HDD] += 1
             else:
                 transferRateSSD = self.write_transferRateSSD
                 transferRateHDD = self.write_transferRateHDD
                 if zone == 'hot':
-                    global WRITES_SSD
-                    WRITES_SSD += 1
+                    self.metrics.writes[SSD] += 1
                 else:
-                    global WRITES_HDD
-                    WRITES_HDD += 1
+                    self.metrics.writes[HDD] += 1
 
             if zone == 'hot':
                 transferDuration = (size_file / float(transferRateSSD)) * self.second_to_nanosecond
                 transferDuration = int(transferDuration)
                 locationSelected = 'SSD'
-                with self.concurrent_access_ssd.request() as req_ssd:
-                    arrived_time = self.env.now
-                    # print ('Trace Hot %s arriving at %d [ms]' % (file_id, arrived_time))
-                    yield req_ssd
-                    yield self.env.timeout(transferDuration)
-                    returned_time = self.env.now
-                    served_time = returned_time - arrived_time
-                    global SSD_SERVED_TIME
-                    SSD_SERVED_TIME = SSD_SERVED_TIME + served_time
-                    # Save time values in millisecond unit [ms]
-                    arrived_time = int(arrived_time * self.nanosecond_to_millisecond)
-                    returned_time = int(returned_time * self.nanosecond_to_millisecond)
-                    served_time = int(served_time * self.nanosecond_to_millisecond)
-                    print(str(file_id) + ',' + str(arrived_time) + ',' + str(returned_time) + ',' + str(served_time) + ',' + locationSelected)
-                    # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
+                arrived_time, started_time, returned_time = yield from self.ssd_transfer(
+                    file_id, size_file, type_operation == 'read', transferDuration)
+                served_time = returned_time - arrived_time
+                self.metrics.served_time[SSD] += served_time
+                self.metrics.observe(SSD, type_operation == 'read', size_file, arrived_time, started_time, returned_time)
+                self.log_request(file_id, arrived_time, returned_time, served_time, locationSelected)
+                # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
             else:
                 transferDuration = (size_file / float(transferRateHDD)) * self.second_to_nanosecond
                 transferDuration = int(transferDuration)
                 locationSelected = 'HDD'
-                with self.concurrent_access_hdd.request() as req_hdd:
-                    arrived_time = self.env.now
-                    # print ('Trace Warm %s arriving at %d [ms]' % (file_id, arrived_time))
-                    yield req_hdd
-                    yield self.env.timeout(transferDuration)
-                    returned_time = self.env.now
-                    served_time = returned_time - arrived_time
-                    global HDD_SERVED_TIME
-                    HDD_SERVED_TIME = HDD_SERVED_TIME + served_time
-                    # Save time values in millisecond unit [ms]
-                    arrived_time = int(arrived_time * self.nanosecond_to_millisecond)
-                    returned_time = int(returned_time * self.nanosecond_to_millisecond)
-                    served_time = int(served_time * self.nanosecond_to_millisecond)
-                    print(str(file_id) + ',' + str(arrived_time) + ',' + str(returned_time) + ',' + str(served_time) + ',' + locationSelected)
-                    # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
-            self.ram.set_data(file_id, 5)
-            # NEW: Check RAM capacity after storing
-            self.check_ram_capacity(file_id, size_file)
+                arrived_time, started_time, returned_time = yield from self.hdd_transfer(
+                    file_id, size_file, type_operation == 'read', is_seq, transferDuration)
+                served_time = returned_time - arrived_time
+                self.metrics.served_time[HDD] += served_time
+                self.metrics.observe(HDD, type_operation == 'read', size_file, arrived_time, started_time, returned_time)
+                self.log_request(file_id, arrived_time, returned_time, served_time, locationSelected)
+                # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  returned_time))
+            self.ram.set_data(file_id, int(size_file))
+            # NEW: Check RAM capacity after storing (a file MIN bypassed is not in RAM)
+            if file_id in self.ram.cache:
+                self.check_ram_capacity(file_id, size_file)
         # print ('Finished moving trace %s in %s at %d [ms]' % (file_id, locationSelected,  self.env.now))
 
     def transfer_with_rl(self, file_id, size_file, is_read, is_seq, inter_arrival_s):
@@ -440,61 +708,16 @@ class Trace:
             is_seq=is_seq,
             inter_arrival_s=inter_arrival_s,
             ssd_used=self.ssd_used_bytes,
-            ssd_cap=settings.SSD_CAPACITY_BYTES,
+            ssd_cap=self.config.SSD_CAPACITY_BYTES,
             ram_used=self.ram_used_bytes,
-            ram_cap=settings.RAM_CAPACITY_BYTES,
+            ram_cap=self.config.RAM_CAPACITY_BYTES,
             file_id=str(file_id))
 
-        # Map tier to device + transfer rate
-        if is_read:
-            trSSD, trHDD = self.read_transferRateSSD, self.read_transferRateHDD
-        else:
-            trSSD, trHDD = self.write_transferRateSSD, self.write_transferRateHDD
-    
-        if tier == 'RAM':
-            transferDuration = 10 # ns for RAM hit (like your f4 path)
-            arrived_time = self.env.now
-            yield self.env.timeout(int(transferDuration))
-            returned_time = self.env.now
-            served_time = returned_time - arrived_time
-            global READS_RAM, WRITES_RAM, RAM_SERVED_TIME
-            RAM_SERVED_TIME += served_time
-            if is_read:
-                READS_RAM += 1
-            else:
-                WRITES_RAM += 1
-            # no device resource contention when RAM
-            locationSelected = 'RAM'
-        elif tier == 'SSD':
-            transferDuration = int((size_file / float(trSSD)) * self.second_to_nanosecond)
-            locationSelected = 'SSD'
-            with self.concurrent_access_ssd.request() as req:
-                arrived_time = self.env.now
-                yield req
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time = returned_time - arrived_time
-                global SSD_SERVED_TIME, READS_SSD, WRITES_SSD
-                SSD_SERVED_TIME += served_time
-                if is_read:
-                    READS_SSD += 1
-                else:
-                    WRITES_SSD += 1
-        else:
-            transferDuration = int((size_file / float(trHDD)) * self.second_to_nanosecond)
-            locationSelected = 'HDD'
-            with self.concurrent_access_hdd.request() as req:
-                arrived_time = self.env.now
-                yield req
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time = returned_time - arrived_time
-                global HDD_SERVED_TIME, READS_HDD, WRITES_HDD
-                HDD_SERVED_TIME += served_time
-                if is_read:
-                    READS_HDD += 1
-                else:
-                    WRITES_HDD += 1
+        arrived_time, started_time, returned_time = yield from self.tier_transfer(
+            tier, file_id, size_file, is_read, is_seq)
+        self.record_request(tier, file_id, size_file, is_read, arrived_time, started_time, returned_time)
+        # Service time, with seek/rotation or dies and GC of the device models
+        transferDuration = returned_time - started_time
     
         # Latency accounting for reward: latency = service time only (I/O time)
         # Removed: inter-arrival time and idle time
@@ -502,11 +725,8 @@ class Trace:
         latency_s = service
         
         # Store bookkeeping for capacity (reuse your tracking helpers)
-        size_b = int(size_file)
-        if tier == 'SSD':
-            self.check_ssd_capacity(file_id, size_b)
-        elif tier == 'RAM':
-            self.check_ram_capacity(file_id, size_b)
+        if tier in self.tier_stores:
+            self.admit(tier, file_id, int(size_file))
     
         # Inform agent about outcome, build next-state from same req as proxy
         self.rl.observe(latency_s=latency_s,
@@ -515,106 +735,51 @@ class Trace:
             next_is_seq=is_seq,
             next_inter_arrival_s=inter_arrival_s,
             ssd_used=self.ssd_used_bytes,
-            ssd_cap=settings.SSD_CAPACITY_BYTES,
+            ssd_cap=self.config.SSD_CAPACITY_BYTES,
             ram_used=self.ram_used_bytes,
-            ram_cap=settings.RAM_CAPACITY_BYTES,
+            ram_cap=self.config.RAM_CAPACITY_BYTES,
             file_id=str(file_id),
             done=False)
     
-        self.rl.set_last_tier(str(file_id), locationSelected)
-    
-        # Emit CSV like other paths (ms units)
-        arrived_ms = int(arrived_time * self.nanosecond_to_millisecond)
-        returned_ms = int(returned_time * self.nanosecond_to_millisecond)
-        served_ms = int((returned_time - arrived_time) * self.nanosecond_to_millisecond)
-        print(f"{file_id},{arrived_ms},{returned_ms},{served_ms},{locationSelected}")
+        self.rl.set_last_tier(str(file_id), tier)
     
 
-    def transfer_with_rl_state(self, file_id, size_file, is_read, state_vec, service_time_s):
+    def transfer_with_rl_state(self, file_id, size_file, is_read, state_vec, service_time_s, is_seq=False):
         """Process request with RL agent using pre-computed state vector.
         
         Args:
             file_id: File identifier from trace
             size_file: Block size in bytes
             is_read: True if read operation, False if write
-            state_vec: Pre-computed 7-dim state vector from FeatureExtractor
+            state_vec: Pre-computed 7-dim (4 + tiers) state vector from FeatureExtractor
             service_time_s: Service time in seconds from trace (used for RL reward)
+            is_seq: True if the trace marks the request sequential (HDD mechanical model)
         
         This variant receives the complete 7-dim state from FeatureExtractor,
         avoiding redundant feature computation in the agent.
         
         Latency (RL reward) = service_time only (not inter_arrival or idle_time)
         """
-        import numpy as np
-        
         # Query agent for tier choice using state vector directly
         tier = self.rl.select_tier_from_state(
             state=state_vec,
             ssd_used=self.ssd_used_bytes,
-            ssd_cap=settings.SSD_CAPACITY_BYTES,
+            ssd_cap=self.config.SSD_CAPACITY_BYTES,
             ram_used=self.ram_used_bytes,
-            ram_cap=settings.RAM_CAPACITY_BYTES,
+            ram_cap=self.config.RAM_CAPACITY_BYTES,
             file_id=str(file_id))
 
-        # Map tier to device + transfer rate
-        if is_read:
-            trSSD, trHDD = self.read_transferRateSSD, self.read_transferRateHDD
-        else:
-            trSSD, trHDD = self.write_transferRateSSD, self.write_transferRateHDD
-    
-        if tier == 'RAM':
-            transferDuration = 10  # ns for RAM hit
-            arrived_time = self.env.now
-            yield self.env.timeout(int(transferDuration))
-            returned_time = self.env.now
-            served_time_ns = returned_time - arrived_time
-            global READS_RAM, WRITES_RAM, RAM_SERVED_TIME
-            RAM_SERVED_TIME += served_time_ns
-            if is_read:
-                READS_RAM += 1
-            else:
-                WRITES_RAM += 1
-            locationSelected = 'RAM'
-        elif tier == 'SSD':
-            transferDuration = int((size_file / float(trSSD)) * self.second_to_nanosecond)
-            locationSelected = 'SSD'
-            with self.concurrent_access_ssd.request() as req:
-                arrived_time = self.env.now
-                yield req
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time_ns = returned_time - arrived_time
-                global SSD_SERVED_TIME, READS_SSD, WRITES_SSD
-                SSD_SERVED_TIME += served_time_ns
-                if is_read:
-                    READS_SSD += 1
-                else:
-                    WRITES_SSD += 1
-        else:
-            transferDuration = int((size_file / float(trHDD)) * self.second_to_nanosecond)
-            locationSelected = 'HDD'
-            with self.concurrent_access_hdd.request() as req:
-                arrived_time = self.env.now
-                yield req
-                yield self.env.timeout(transferDuration)
-                returned_time = self.env.now
-                served_time_ns = returned_time - arrived_time
-                global HDD_SERVED_TIME, READS_HDD, WRITES_HDD
-                HDD_SERVED_TIME += served_time_ns
-                if is_read:
-                    READS_HDD += 1
-                else:
-                    WRITES_HDD += 1
+        arrived_time, started_time, returned_time = yield from self.tier_transfer(
+            tier, file_id, size_file, is_read, is_seq)
+        served_time_ns = self.record_request(tier, file_id, size_file, is_read,
+                                             arrived_time, started_time, returned_time)
     
         # Update tier tracking
-        size_b = int(size_file)
-        if tier == 'SSD':
-            self.check_ssd_capacity(file_id, size_b)
-        elif tier == 'RAM':
-            self.check_ram_capacity(file_id, size_b)
+        if tier in self.tier_stores:
+            self.admit(tier, file_id, int(size_file))
     
         # Update agent with outcome
-        self.rl.set_last_tier(str(file_id), locationSelected)
+        self.rl.set_last_tier(str(file_id), tier)
         
         # CRITICAL: Provide RL reward for learning
         # The RL agent will compute reward internally from latency_s
@@ -628,164 +793,34 @@ class Trace:
             next_is_seq=False,  # Not available in this path, default to False
             next_inter_arrival_s=0.0,  # Not available in this path
             ssd_used=self.ssd_used_bytes,
-            ssd_cap=settings.SSD_CAPACITY_BYTES,
+            ssd_cap=self.config.SSD_CAPACITY_BYTES,
             ram_used=self.ram_used_bytes,
-            ram_cap=settings.RAM_CAPACITY_BYTES,
+            ram_cap=self.config.RAM_CAPACITY_BYTES,
             file_id=str(file_id),
             done=False)
-    
-        # Emit CSV output (ms units)
-        arrived_ms = int(arrived_time * self.nanosecond_to_millisecond)
-        returned_ms = int(returned_time * self.nanosecond_to_millisecond)
-        served_ms = int(served_time_ns * self.nanosecond_to_millisecond)
-        print(f"{file_id},{locationSelected}")
         
         # NEW: Track for migration agent system
-        self.agent_system.track_io_request(
-            file_id=int(file_id),
-            tier=locationSelected,
-            latency_ns=served_time_ns,
-            size_bytes=size_file,
-            is_read=is_read
-        )
-        
-        # NEW: Periodic migration check (every 50 requests)
-        self.agent_check_counter += 1
-        if self.agent_check_counter % 50 == 0:
-            self.agent_system.periodic_update(
-                ssd_usage=self.ssd_used_bytes,
-                ram_usage=self.ram_used_bytes
-            )
-
-    def transfer_with_all_ram(self, file_id, size_file, is_read):
-        """All data stored in RAM tier only."""
-        transferDuration = 10  # ns for RAM hit
-        arrived_time = self.env.now
-        yield self.env.timeout(int(transferDuration))
-        returned_time = self.env.now
-        served_time_ns = returned_time - arrived_time
-        
-        global READS_RAM, WRITES_RAM, RAM_SERVED_TIME
-        RAM_SERVED_TIME += served_time_ns
-        if is_read:
-            READS_RAM += 1
-        else:
-            WRITES_RAM += 1
-        
-        locationSelected = 'RAM'
-        
-        # Track capacity
-        size_b = int(size_file)
-        self.check_ram_capacity(file_id, size_b)
-        
-        # Emit CSV output (ms units)
-        arrived_ms = int(arrived_time * self.nanosecond_to_millisecond)
-        returned_ms = int(returned_time * self.nanosecond_to_millisecond)
-        served_ms = int(served_time_ns * self.nanosecond_to_millisecond)
-        print(f"{file_id},{arrived_ms},{returned_ms},{served_ms},{locationSelected}")
-        
-        # NEW: Track for unified agent system
-        self.agent_system.track_io_request(
-            file_id=int(file_id),
-            tier=locationSelected,
-            latency_ns=served_time_ns,
-            size_bytes=size_file,
-            is_read=is_read
-        )
-        
-        # NEW: Periodic migration check (every 50 requests)
-        self.agent_check_counter += 1
-        if self.agent_check_counter % 50 == 0:
-            self.agent_system.periodic_update(
-                ssd_usage=self.ssd_used_bytes,
-                ram_usage=self.ram_used_bytes
-            )
+        self.track_request(tier, file_id, size_file, is_read, served_time_ns)
 
-    def transfer_with_all_ssd(self, file_id, size_file, is_read):
-        """All data stored in SSD tier only."""
-        if is_read:
-            trSSD = self.read_transferRateSSD
-        else:
-            trSSD = self.write_transferRateSSD
-        
-        transferDuration = int((size_file / float(trSSD)) * self.second_to_nanosecond)
-        locationSelected = 'SSD'
-        
-        with self.concurrent_access_ssd.request() as req:
-            arrived_time = self.env.now
-            yield req
-            yield self.env.timeout(transferDuration)
-            returned_time = self.env.now
-            served_time_ns = returned_time - arrived_time
-            
-            global SSD_SERVED_TIME, READS_SSD, WRITES_SSD
-            SSD_SERVED_TIME += served_time_ns
-            if is_read:
-                READS_SSD += 1
-            else:
-                WRITES_SSD += 1
+    def transfer_with_all_tier(self, tier, file_id, size_file, is_read, is_seq=False):
+        """All data stored in one tier only (all_ram, all_ssd, all_hdd, all_<tier>)."""
+        arrived_time, started_time, returned_time = yield from self.tier_transfer(
+            tier, file_id, size_file, is_read, is_seq)
+        served_time_ns = self.record_request(tier, file_id, size_file, is_read,
+                                             arrived_time, started_time, returned_time)
         
         # Track capacity
-        size_b = int(size_file)
-        self.check_ssd_capacity(file_id, size_b)
-        
-        # Emit CSV output (ms units)
-        arrived_ms = int(arrived_time * self.nanosecond_to_millisecond)
-        returned_ms = int(returned_time * self.nanosecond_to_millisecond)
-        served_ms = int(served_time_ns * self.nanosecond_to_millisecond)
-        print(f"{file_id},{arrived_ms},{returned_ms},{served_ms},{locationSelected}")
+        if tier in self.tier_stores:
+            self.admit(tier, file_id, int(size_file))
         
         # NEW: Track for unified agent system
-        self.agent_system.track_io_request(
-            file_id=int(file_id),
-            tier=locationSelected,
-            latency_ns=served_time_ns,
-            size_bytes=size_file,
-            is_read=is_read
-        )
-        
-        # NEW: Periodic migration check (every 50 requests)
-        self.agent_check_counter += 1
-        if self.agent_check_counter % 50 == 0:
-            self.agent_system.periodic_update(
-                ssd_usage=self.ssd_used_bytes,
-                ram_usage=self.ram_used_bytes
-            )
+        self.track_request(tier, file_id, size_file, is_read, served_time_ns)
 
-    def transfer_with_all_hdd(self, file_id, size_file, is_read):
-        """All data stored in HDD tier only."""
-        if is_read:
-            trHDD = self.read_transferRateHDD
-        else:
-            trHDD = self.write_transferRateHDD
-        
-        transferDuration = int((size_file / float(trHDD)) * self.second_to_nanosecond)
-        locationSelected = 'HDD'
-        
-        with self.concurrent_access_hdd.request() as req:
-            arrived_time = self.env.now
-            yield req
-            yield self.env.timeout(transferDuration)
-            returned_time = self.env.now
-            served_time_ns = returned_time - arrived_time
-            
-            global HDD_SERVED_TIME, READS_HDD, WRITES_HDD
-            HDD_SERVED_TIME += served_time_ns
-            if is_read:
-                READS_HDD += 1
-            else:
-                WRITES_HDD += 1
-        
-        # Emit CSV output (ms units)
-        arrived_ms = int(arrived_time * self.nanosecond_to_millisecond)
-        returned_ms = int(returned_time * self.nanosecond_to_millisecond)
-        served_ms = int(served_time_ns * self.nanosecond_to_millisecond)
-        print(f"{file_id},{arrived_ms},{returned_ms},{served_ms},{locationSelected}")
-        
-        # NEW: Track for unified agent system
+    def track_request(self, tier, file_id, size_file, is_read, served_time_ns):
+        """Feed a served request to the migration agent system, with a migration check every 50 requests."""
         self.agent_system.track_io_request(
             file_id=int(file_id),
-            tier=locationSelected,
+            tier=tier,
             latency_ns=served_time_ns,
             size_bytes=size_file,
             is_read=is_read
@@ -794,117 +829,66 @@ class Trace:
         # NEW: Periodic migration check (every 50 requests)
         self.agent_check_counter += 1
         if self.agent_check_counter % 50 == 0:
-            self.agent_system.periodic_update(
-                ssd_usage=self.ssd_used_bytes,
-                ram_usage=self.ram_used_bytes
-            )
+            self.agent_system.periodic_update(tier_usage=self.tier_usage())
 
     def timedelta_total_seconds(self, timedelta):
         return (timedelta.microseconds + 0.0 +(timedelta.seconds + timedelta.days * 24 * 3600) * 10 ** 6) / 10 ** 6
 
 
-    # NEW: Check if file fits in SSD and handle overflow
-    def check_ssd_capacity(self, file_id, file_size):
-        """Check if file fits in SSD, evict if needed"""
-        # Don't re-add file if already tracked
-        if file_id in self.ssd_stored_files:
+    # NEW: Check if file fits in a tier and handle overflow
+    def admit(self, tier, file_id, file_size):
+        """Track a file stored in a capacity-limited tier, evicting by its policy if it does not fit (a hit if stored)"""
+        store = self.tier_stores[tier]
+        if store.lookup(file_id) is not None:
             return
+        evicted_count, bytes_freed = store.admit(file_id, file_size)
         
-        available_space = settings.SSD_CAPACITY_BYTES - self.ssd_used_bytes
-        
-        if file_size > available_space:
-            bytes_needed = file_size - available_space
-            self.evict_from_ssd(bytes_needed)
-        
-        # Add file to SSD tracking
-        self.ssd_stored_files[file_id] = file_size
-        self.ssd_used_bytes += file_size
-        self.access_order.append(file_id)
-        
-        # Debug output
-        ssd_percent = (self.ssd_used_bytes / float(settings.SSD_CAPACITY_BYTES)) * 100
-        # print(f"[SSD] File {file_id} stored ({file_size} bytes). Usage: {ssd_percent:.2f}% ({self.ssd_used_bytes}/{settings.SSD_CAPACITY_BYTES} bytes) at time {self.env.now}")
+        # Debug output (nothing is formatted unless DEBUG is enabled)
+        if logger.isEnabledFor(logging.DEBUG):
+            if evicted_count > 0:
+                logger.debug(f"[{tier} EVICTION] Evicted {evicted_count} files ({bytes_freed} bytes) at time {self.env.now}")
+            logger.debug(f"[{tier}] File {file_id} stored ({file_size} bytes). Usage: {store.percent():.2f}% ({store.used_bytes}/{store.capacity_bytes} bytes) at time {self.env.now}")
+
+    def check_ssd_capacity(self, file_id, file_size):
+        """Check if file fits in SSD, evict if needed"""
+        self.admit(TIER_NAMES[SSD], file_id, file_size)
     
-    # NEW: Check if file fits in RAM and handle overflow
     def check_ram_capacity(self, file_id, file_size):
         """Check if file fits in RAM, evict if needed"""
-        # Don't re-add file if already tracked
-        if file_id in self.ram_stored_files:
-            return
-        
-        available_space = settings.RAM_CAPACITY_BYTES - self.ram_used_bytes
-        
-        if file_size > available_space:
-            bytes_needed = file_size - available_space
-            self.evict_from_ram(bytes_needed)
-        
-        # Add file to RAM tracking
-        self.ram_stored_files[file_id] = file_size
-        self.ram_used_bytes += file_size
-        
-        # Debug output
-        ram_percent = (self.ram_used_bytes / float(settings.RAM_CAPACITY_BYTES)) * 100
-        print(f"[RAM] File {file_id} stored ({file_size} bytes). Usage: {ram_percent:.2f}% ({self.ram_used_bytes}/{settings.RAM_CAPACITY_BYTES} bytes) at time {self.env.now}")
-    
-    # NEW: Evict files from SSD based on policy
-    def evict_from_ssd(self, bytes_to_free):
-        """Remove files from SSD until enough space is freed"""
-        evicted_count = 0
-        bytes_freed = 0
-        
-        while bytes_to_free > 0 and len(self.access_order) > 0:
-            # Get oldest file (FIFO)
-            oldest_file = self.access_order.pop(0)
-            if oldest_file in self.ssd_stored_files:
-                file_size = self.ssd_stored_files.pop(oldest_file)
-                self.ssd_used_bytes -= file_size
-                bytes_to_free -= file_size
-                bytes_freed += file_size
-                evicted_count += 1
-        
-        if evicted_count > 0:
-            ssd_percent = (self.ssd_used_bytes / float(settings.SSD_CAPACITY_BYTES)) * 100
-            print(f"[SSD EVICTION] Evicted {evicted_count} files ({bytes_freed} bytes). New usage: {ssd_percent:.2f}% ({self.ssd_used_bytes}/{settings.SSD_CAPACITY_BYTES} bytes) at time {self.env.now}")
-    
-    # NEW: Evict files from RAM based on policy
-    def evict_from_ram(self, bytes_to_free):
-        """Remove files from RAM until enough space is freed"""
-        evicted_count = 0
-        bytes_freed = 0
-        ram_access_order = list(self.ram_stored_files.keys())
-        
-        while bytes_to_free > 0 and len(ram_access_order) > 0:
-            # Get oldest file (FIFO)
-            oldest_file = ram_access_order.pop(0)
-            if oldest_file in self.ram_stored_files:
-                file_size = self.ram_stored_files.pop(oldest_file)
-                self.ram_used_bytes -= file_size
-                bytes_to_free -= file_size
-                bytes_freed += file_size
-                evicted_count += 1
-        
-        if evicted_count > 0:
-            ram_percent = (self.ram_used_bytes / float(settings.RAM_CAPACITY_BYTES)) * 100
-            print(f"[RAM EVICTION] Evicted {evicted_count} files ({bytes_freed} bytes). New usage: {ram_percent:.2f}% ({self.ram_used_bytes}/{settings.RAM_CAPACITY_BYTES} bytes) at time {self.env.now}")
+        self.admit(TIER_NAMES[RAM], file_id, file_size)
     
+    def cache_stats(self):
+        """eviction.EvictionEngine.stats() of every tier store and cache that was looked up.
+
+        Tier stores by tier name; the ssd_caching / f4 caches as 'SSD cache' / 'RAM cache'.
+        A cache that served requests replaces its tier's store, which only shadows the
+        files the cache admitted (check_ssd_capacity / check_ram_capacity).
+        """
+        caches = {}
+        if self.solidStateDrive is not None:
+            caches[TIER_NAMES[SSD]] = ('SSD cache', self.solidStateDrive.stats())
+        if self.ram is not None:
+            caches[TIER_NAMES[RAM]] = ('RAM cache', self.ram.cache.stats())
+        caches = {tier: cache for tier, cache in caches.items() if cache[1]['hits'] + cache[1]['misses'] > 0}
+        stats = {name: store.stats() for name, store in self.tier_stores.items() if name not in caches}
+        stats.update(caches.values())
+        return {name: stats for name, stats in stats.items() if stats['hits'] + stats['misses'] > 0}
+
     # NEW: Get storage usage statistics
     def get_storage_stats(self):
-        """Return current storage utilization"""
-        ssd_percent = (self.ssd_used_bytes / float(settings.SSD_CAPACITY_BYTES)) * 100 if settings.SSD_CAPACITY_BYTES > 0 else 0
-        ram_percent = (self.ram_used_bytes / float(settings.RAM_CAPACITY_BYTES)) * 100 if settings.RAM_CAPACITY_BYTES > 0 else 0
-        return {
-            'ssd_used': self.ssd_used_bytes,
-            'ssd_capacity': settings.SSD_CAPACITY_BYTES,
-            'ssd_percent': ssd_percent,
-            'ssd_files': len(self.ssd_stored_files),
-            'ram_used': self.ram_used_bytes,
-            'ram_capacity': settings.RAM_CAPACITY_BYTES,
-            'ram_percent': ram_percent,
-            'ram_files': len(self.ram_stored_files)
-        }
+        """Return current storage utilization: <tier>_used, _capacity, _percent and _files per tier with a capacity"""
+        stats = {}
+        for name, store in self.tier_stores.items():
+            prefix = name.lower()
+            stats[f'{prefix}_used'] = store.used_bytes
+            stats[f'{prefix}_capacity'] = store.capacity_bytes
+            stats[f'{prefix}_percent'] = store.percent()
+            stats[f'{prefix}_files'] = len(store.files)
+        return stats
     
     # NEW: Print storage status
     def print_storage_status(self):
         """Print current storage utilization"""
-        stats = self.get_storage_stats()
-        print(f"[Storage Status at {self.env.now}] SSD: {stats['ssd_percent']:.2f}% ({stats['ssd_files']} files) | RAM: {stats['ram_percent']:.2f}% ({stats['ram_files']} files)")
+        status = ' | '.join(f"{name}: {store.percent():.2f}% ({len(store.files)} files)"
+                            for name, store in self.tier_stores.items())
+        logger.info(f"[Storage Status at {self.env.now}] {status}")
@@ -0,0 +1,187 @@
+"""admission.py
+
+W-TinyLFU admission in front of the ssd_caching SSD cache (settings.SSD_ADMISSION).
+
+Without it every HDD miss is written to the SSD cache, so one-hit-wonder LBAs evict
+useful files and cost SSD write endurance. With SSD_ADMISSION = 'tinylfu':
+
+  window     a small LRU (ADMISSION_WINDOW_RATIO of the SSD cache bytes) that takes
+             every missed file, so new files get a chance to build up hits
+  sketch     a count-min sketch of 4 rows of 4-bit-range counters (one byte each,
+             saturating at 15) estimating every LBA's recent access frequency. It
+             costs 4 * ADMISSION_SKETCH_WIDTH bytes however many distinct LBAs the
+             trace has. It ages by halving all counters every
+             ADMISSION_SAMPLE_SIZE recorded accesses (default 10 * width)
+  doorkeeper a Bloom filter in front of the sketch: a first access only sets its
+             bits, so one-hit wonders never reach the counters; cleared when the
+             sketch ages
+
+A file pushed out of the window is a candidate for the main cache. It is admitted
+if the cache has room for it, or if its estimated frequency is higher than that of
+the cache's next victim (eviction.EvictionEngine.victim()); otherwise it is dropped.
+
+    admission = TinyLFUAdmission(window_bytes=capacity // 100)
+    admission.record(file_id)                       # on every lookup
+    admission.offer(cache, file_id, size_bytes)     # on a miss, instead of cache.admit
+"""
+
+from __future__ import annotations
+
+import zlib
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+
+try:
+    from settings import ADMISSION_WINDOW_RATIO, ADMISSION_SKETCH_WIDTH
+except ImportError:
+    ADMISSION_WINDOW_RATIO = 0.01
+    ADMISSION_SKETCH_WIDTH = 1 << 20
+
+ADMISSION_POLICIES = (None, 'tinylfu')
+
+SKETCH_DEPTH = 4
+COUNTER_MAX = 15
+# Odd 64-bit multipliers of the multiply-shift hash of each sketch row, then of the doorkeeper
+_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+          0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53)
+_MASK64 = (1 << 64) - 1
+
+
+def _key_hash(key: Hashable) -> int:
+    """Stable 32-bit hash of a file id (the same in every process, unlike hash() of a str)."""
+    return zlib.crc32(str(key).encode())
+
+
+class FrequencySketch:
+    """Count-min sketch with conservative update, periodic halving and a doorkeeper."""
+
+    def __init__(self, width: int = ADMISSION_SKETCH_WIDTH, sample_size: Optional[int] = None) -> None:
+        # Power-of-two width, so a row index is the top bits of a multiply-shift hash
+        self.width = 1 << max(int(width) - 1, 1).bit_length()
+        self.shift = 64 - (self.width.bit_length() - 1)
+        self.counters = bytearray(SKETCH_DEPTH * self.width)
+        self.doorkeeper = bytearray(self.width)   # 8 * width bits
+        self.door_shift = 64 - (8 * self.width).bit_length() + 1
+        self.sample_size = int(sample_size) if sample_size else 10 * self.width
+        self.additions = 0
+        self.resets = 0
+
+    def _indexes(self, h: int):
+        width, shift = self.width, self.shift
+        return [row * width + (((h * _SEEDS[row]) & _MASK64) >> shift) for row in range(SKETCH_DEPTH)]
+
+    def _door_bits(self, h: int):
+        return [((h * seed) & _MASK64) >> self.door_shift for seed in _SEEDS[SKETCH_DEPTH:]]
+
+    def _in_door(self, bits) -> bool:
+        door = self.doorkeeper
+        return all(door[bit >> 3] & (1 << (bit & 7)) for bit in bits)
+
+    def record(self, key: Hashable) -> None:
+        """Count one access of key."""
+        h = _key_hash(key)
+        bits = self._door_bits(h)
+        if not self._in_door(bits):
+            door = self.doorkeeper
+            for bit in bits:
+                door[bit >> 3] |= 1 << (bit & 7)
+        else:
+            counters = self.counters
+            indexes = self._indexes(h)
+            low = min(counters[i] for i in indexes)
+            if low < COUNTER_MAX:
+                # Conservative update: only the counters at the minimum grow
+                for i in indexes:
+                    if counters[i] == low:
+                        counters[i] = low + 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.age()
+
+    def estimate(self, key: Hashable) -> int:
+        """Estimated recent accesses of key (never below the true count since the last aging)."""
+        h = _key_hash(key)
+        counters = self.counters
+        return min(counters[i] for i in self._indexes(h)) + (1 if self._in_door(self._door_bits(h)) else 0)
+
+    def age(self) -> None:
+        """Halve every counter and clear the doorkeeper, so old popularity fades."""
+        view = np.frombuffer(self.counters, dtype=np.uint8)
+        view >>= 1
+        self.doorkeeper[:] = bytes(len(self.doorkeeper))
+        self.additions //= 2
+        self.resets += 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.counters) + len(self.doorkeeper)
+
+
+class TinyLFUAdmission:
+    """Admission window plus frequency sketch deciding which files enter a cache."""
+
+    def __init__(self, window_bytes: int, sketch_width: int = ADMISSION_SKETCH_WIDTH,
+                 sample_size: Optional[int] = None) -> None:
+        self.window_bytes = window_bytes
+        self.window: OrderedDict = OrderedDict()   # file_id -> size_bytes, LRU first
+        self.window_used = 0
+        self.sketch = FrequencySketch(sketch_width, sample_size)
+        self.hits = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def record(self, file_id: Hashable) -> None:
+        self.sketch.record(file_id)
+
+    def lookup(self, file_id: Hashable) -> Optional[int]:
+        """Size of a file held by the window (a window hit), or None."""
+        size = self.window.get(file_id)
+        if size is not None:
+            self.window.move_to_end(file_id)
+            self.hits += 1
+        return size
+
+    def offer(self, cache, file_id: Hashable, size_bytes: int) -> None:
+        """Put a missed file in the window; files it pushes out compete for cache (an EvictionEngine)."""
+        if file_id in self.window:
+            return
+        self.window[file_id] = size_bytes
+        self.window_used += size_bytes
+        while self.window_used > self.window_bytes and self.window:
+            candidate, size = self.window.popitem(last=False)
+            self.window_used -= size
+            if self.allow(cache, candidate, size):
+                cache.admit(candidate, size)
+                self.admitted += 1
+            else:
+                self.rejected += 1
+
+    def allow(self, cache, candidate: Hashable, size_bytes: int) -> bool:
+        """True if candidate may enter cache: it fits, or it is more popular than the next victim."""
+        if candidate in cache or cache.used_bytes + size_bytes <= cache.capacity_bytes:
+            return True
+        victim = cache.victim()
+        return victim is None or self.sketch.estimate(candidate) > self.sketch.estimate(victim)
+
+    def stats(self) -> Dict:
+        """Window occupancy and hits, admission decisions and sketch size."""
+        return {'window_hits': self.hits, 'window_files': len(self.window), 'window_bytes': self.window_used,
+                'admitted': self.admitted, 'rejected': self.rejected, 'sketch_bytes': self.sketch.nbytes,
+                'sketch_resets': self.sketch.resets}
+
+
+def make_admission(policy: Optional[str], capacity_bytes: int, config=None) -> Optional[TinyLFUAdmission]:
+    """Admission layer of a cache of capacity_bytes for settings.SSD_ADMISSION (None: admit everything)."""
+    if policy is not None:
+        policy = str(policy).lower()
+    if policy not in ADMISSION_POLICIES:
+        raise ValueError(f"Unknown SSD_ADMISSION '{policy}' (expected None or "
+                         f"{', '.join(p for p in ADMISSION_POLICIES if p)})")
+    if policy is None:
+        return None
+    ratio = getattr(config, 'ADMISSION_WINDOW_RATIO', ADMISSION_WINDOW_RATIO)
+    return TinyLFUAdmission(int(capacity_bytes * ratio),
+                            getattr(config, 'ADMISSION_SKETCH_WIDTH', ADMISSION_SKETCH_WIDTH),
+                            getattr(config, 'ADMISSION_SAMPLE_SIZE', None))
@@ -0,0 +1,274 @@
+"""analytic.py
+
+Closed-form replay for the policies whose tier choice does not depend on the
+simulation: all_ram, all_ssd, all_hdd and hashed.
+
+For these policies every request's tier and transfer duration is known up front,
+so the event simulation reduces to arrays: arrivals are the running sum of the
+trace inter-arrival delays, and each tier is a k-server FIFO queue whose start
+times follow the Lindley-style recursion
+
+    start[i]  = max(arrival[i], earliest time one of the k servers is free)
+    finish[i] = start[i] + duration[i]
+
+When no request would ever find all k servers busy (checked vectorized, the usual
+case with thousands of devices) start == arrival and the whole tier is computed
+with NumPy; otherwise the recursion runs over a heap of server free times.
+Arithmetic and the order in which served times are summed follow the event
+simulation, so the tier counters and served times are identical to a
+multi-tier-simulator.py run.
+
+The migration agent runs on wall-clock time in a background thread and is not
+reproduced here; results['migration'] is None.
+
+Enable with SIM_MODE = 'analytic' in settings.py, or directly:
+
+    results = analytic.run_analytic(simulation.make_config(REPLACEMENT_POLICY='all_hdd'))
+"""
+
+from __future__ import annotations
+
+import heapq
+import io
+from typing import Dict, Tuple
+
+import numpy as np
+
+import trace_cache
+import trace_parser
+from metrics import SimulationMetrics, RAM, SSD, HDD, READ, WRITE
+
+ANALYTIC_POLICIES = ('all_ram', 'all_ssd', 'all_hdd', 'hashed')
+
+SECOND_TO_NANOSECOND = 1000 * 1000 * 1000
+MB_TO_BYTE = 1024 * 1024
+RAM_TRANSFER_NS = 10   # fixed RAM access time of the RAM tier (tiers.RAM_LATENCY_NS)
+
+_TIMESTAMP_NS_FACTOR = {'s': 1000 * 1000 * 1000, 'ms': 1000 * 1000, 'us': 1000, 'ns': 1}
+_SIZE_B_FACTOR = {'GB': 1024 * 1024 * 1024, 'MB': 1024 * 1024, 'KB': 1024, 'B': 1}
+
+
+def supports(config) -> bool:
+    """True if config's policy can be replayed analytically."""
+    policy = config.REPLACEMENT_POLICY.lower()
+    if getattr(config, 'TIERS', None):
+        # Closed forms are written for the RAM / SSD / HDD hierarchy (tiers.py)
+        return False
+    if getattr(config, 'HDD_MODEL', 'flat') != 'flat' and policy in ('all_hdd', 'hashed'):
+        # Seek and rotation depend on the drive's request order (hdd_model.py)
+        return False
+    if getattr(config, 'SSD_MODEL', 'flat') != 'flat' and policy in ('all_ssd', 'hashed'):
+        # GC stalls depend on the write history (ssd_model.py)
+        return False
+    if getattr(config, 'DEVICE_QUEUES', False) and policy != 'all_ram':
+        # Per-device queues and split requests (devices.py)
+        return False
+    return policy in ANALYTIC_POLICIES
+
+
+# ============================================================================
+# Queueing
+# ============================================================================
+
+def fifo_queue(arrival: np.ndarray, duration: np.ndarray, servers: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and finish times of requests on a FIFO queue with ``servers`` servers.
+
+    ``arrival`` must be non-decreasing (trace order). A server freed at the same
+    instant a request arrives is available to it, as in the event simulation.
+    """
+    n = len(arrival)
+    finish = arrival + duration
+    if n == 0:
+        return arrival.copy(), finish
+    # Contention-free check: requests in service when request i arrives, assuming
+    # nobody waits, is i minus those already finished (zero-length requests may be
+    # counted as finished before they arrive, so they are added back conservatively)
+    finished = np.searchsorted(np.sort(finish), arrival, side='right')
+    in_service = np.arange(n) - finished + int(np.count_nonzero(duration == 0))
+    if in_service.max() < servers:
+        return arrival.copy(), finish
+
+    start = np.empty(n, dtype=np.float64)
+    arrival_l = arrival.tolist()
+    duration_l = duration.tolist()
+    free = []   # heap of server free times, at most `servers` entries
+    for i in range(n):
+        a = arrival_l[i]
+        if len(free) < servers:
+            s = a
+            heapq.heappush(free, s + duration_l[i])
+        else:
+            s = free[0]
+            if s < a:
+                s = a
+            heapq.heapreplace(free, s + duration_l[i])
+        start[i] = s
+    return start, start + duration
+
+
+def _served_sum(arrival: np.ndarray, finish: np.ndarray) -> float:
+    """Sum of finish - arrival, added in completion order like the simulation does."""
+    if len(arrival) == 0:
+        return 0
+    order = np.argsort(finish, kind='stable')
+    return float(np.cumsum((finish - arrival)[order])[-1])
+
+
+def _byte_sum(size: np.ndarray):
+    """Sum of request sizes, int when the sizes are whole bytes (as the simulation adds them)."""
+    if len(size) == 0:
+        return 0
+    total = float(np.cumsum(size)[-1])
+    return int(total) if total.is_integer() else total
+
+
+def _record_tier(metrics: SimulationMetrics, tier: int, is_read: np.ndarray, size: np.ndarray,
+                 arrival: np.ndarray, start: np.ndarray, finish: np.ndarray) -> None:
+    reads = int(np.count_nonzero(is_read))
+    metrics.reads[tier] += reads
+    metrics.writes[tier] += len(is_read) - reads
+    metrics.bytes[tier] += _byte_sum(size)
+    metrics.served_time[tier] += _served_sum(arrival, finish)
+    for op, mask in ((READ, is_read), (WRITE, ~is_read)):
+        metrics.latency[tier][op].record_many(finish[mask] - arrival[mask])
+        metrics.wait[tier][op].record_many(start[mask] - arrival[mask])
+        metrics.service[tier][op].record_many(finish[mask] - start[mask])
+
+
+# ============================================================================
+# Trace loading
+# ============================================================================
+
+def _load_rl_records(config) -> np.ndarray:
+    """TRACE_DTYPE rows of the 8-column trace, as source_trace_rl replays them."""
+    path = config.FILE_PATH
+    cache = None
+    if trace_cache.is_cache(path) or (getattr(config, 'TRACE_CACHE', False) and path not in (None, '-')):
+        cache = trace_cache.load_cache(path, build=getattr(config, 'TRACE_CACHE', False))
+    if cache is not None:
+        return next(cache.iter_chunks(max(len(cache), 1)), np.empty(0, dtype=trace_parser.TRACE_DTYPE))
+    workers = getattr(config, 'TRACE_PARSE_WORKERS', 1)
+    if workers > 1 and path not in (None, '-'):
+        return trace_parser.parse_file_parallel(path, workers)[0]
+    chunks = list(trace_parser.iter_trace(path))
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=trace_parser.TRACE_DTYPE)
+
+
+def _rl_arrivals(records: np.ndarray) -> np.ndarray:
+    """Arrival times (ns): the first request arrives at 0, then inter_arrival apart."""
+    delays = records['inter_arrival'] * SECOND_TO_NANOSECOND
+    if len(delays):
+        delays[0] = 0
+    return np.cumsum(delays)
+
+
+def _load_legacy(config) -> Tuple[np.ndarray, list, np.ndarray, np.ndarray]:
+    """(arrival ns, file ids, size bytes, is_read) as source_trace replays the legacy format."""
+    ts_factor = _TIMESTAMP_NS_FACTOR.get(config.TIMESTAMP_UNIT, 1)
+    size_factor = _SIZE_B_FACTOR.get(config.SIZE_FILE_UNIT, 1)
+    path = config.FILE_PATH
+    if trace_cache.is_cache(path):
+        cache = trace_cache.TraceCache(path)
+        timestamps = np.asarray(cache['timestamp'], dtype=np.float64)
+        file_ids = [str(lba) for lba in cache['lba'].tolist()]
+        sizes = np.asarray(cache['block_size'], dtype=np.float64) * size_factor
+        is_read = np.asarray(cache['is_read'], dtype=bool)
+    else:
+        timestamps, file_ids, sizes, is_read = [], [], [], []
+        default_size = config.DEFAULT_SIZE_FILE * size_factor
+        with io.TextIOWrapper(trace_parser.open_trace(path)) as lines:
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                campos = line.split(config.DELIMITER)
+                timestamps.append(float(campos[config.COLUMN_TIMESTAMP]))
+                file_ids.append(campos[config.COLUMN_ID])
+                if config.COLUMN_SIZE_FILE == '-':
+                    sizes.append(default_size)
+                else:
+                    sizes.append(int(float(campos[config.COLUMN_SIZE_FILE])) * size_factor)
+                if config.COLUMN_TYPE_REQUEST == '-':
+                    is_read.append(True)
+                else:
+                    is_read.append(campos[config.COLUMN_TYPE_REQUEST].lower() == 'read')
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        is_read = np.asarray(is_read, dtype=bool)
+    delays = np.diff(timestamps, prepend=timestamps[:1]) * ts_factor
+    np.maximum(delays, 0, out=delays)
+    return np.cumsum(delays), file_ids, sizes, is_read
+
+
+def _transfer_ns(size: np.ndarray, is_read: np.ndarray, read_rate: float, write_rate: float) -> np.ndarray:
+    """int((size / rate) * 1e9) per request, rates in MB/s."""
+    rate = np.where(is_read, float(read_rate * MB_TO_BYTE), float(write_rate * MB_TO_BYTE))
+    return ((size / rate) * SECOND_TO_NANOSECOND).astype(np.int64).astype(np.float64)
+
+
+# ============================================================================
+# Replay
+# ============================================================================
+
+def run_analytic(config) -> Dict:
+    """Replay config's trace analytically; same result layout as simulation.run_simulation()."""
+    policy = config.REPLACEMENT_POLICY.lower()
+    if policy not in ANALYTIC_POLICIES:
+        raise ValueError(f"Policy '{policy}' cannot be replayed analytically "
+                         f"(supported: {', '.join(ANALYTIC_POLICIES)})")
+    metrics = SimulationMetrics()
+    sim_time = 0
+
+    if policy == 'hashed':
+        arrival, file_ids, sizes, is_read = _load_legacy(config)
+        on_ssd = np.fromiter((hash(f) & 1 for f in file_ids), dtype=bool, count=len(file_ids))
+        tiers = ((SSD, on_ssd, config.NUMBER_SSD, config.READ_DATA_TRANSFER_RATE_SSD,
+                  config.WRITE_DATA_TRANSFER_RATE_SSD),
+                 (HDD, ~on_ssd, config.NUMBER_HDD, config.READ_DATA_TRANSFER_RATE_HDD,
+                  config.WRITE_DATA_TRANSFER_RATE_HDD))
+        for tier, mask, servers, read_rate, write_rate in tiers:
+            duration = _transfer_ns(sizes[mask], is_read[mask], read_rate, write_rate)
+            start, finish = fifo_queue(arrival[mask], duration, servers)
+            _record_tier(metrics, tier, is_read[mask], sizes[mask], arrival[mask], start, finish)
+            if len(finish):
+                sim_time = max(sim_time, finish.max())
+        if len(arrival):
+            sim_time = max(sim_time, arrival[-1])
+    else:
+        records = _load_rl_records(config)
+        arrival = _rl_arrivals(records)
+        is_read = records['is_read'].astype(bool)
+        sizes = records['block_size'].astype(np.float64)
+        if policy == 'all_ram':
+            finish = arrival + RAM_TRANSFER_NS
+            _record_tier(metrics, RAM, is_read, sizes, arrival, arrival, finish)
+        else:
+            if policy == 'all_ssd':
+                tier, servers = SSD, config.NUMBER_SSD
+                rates = (config.READ_DATA_TRANSFER_RATE_SSD, config.WRITE_DATA_TRANSFER_RATE_SSD)
+            else:
+                tier, servers = HDD, config.NUMBER_HDD
+                rates = (config.READ_DATA_TRANSFER_RATE_HDD, config.WRITE_DATA_TRANSFER_RATE_HDD)
+            duration = _transfer_ns(sizes, is_read, *rates)
+            start, finish = fifo_queue(arrival, duration, servers)
+            _record_tier(metrics, tier, is_read, sizes, arrival, start, finish)
+        if len(finish):
+            sim_time = finish.max()
+
+    return {
+        'policy': policy,
+        'sim_time': float(sim_time),
+        'metrics': metrics.as_dict(),
+        'latency': metrics.latency_summary(),
+        'storage': None,
+        'migration': None,
+        'timeseries': None,
+        'profile': None,
+        'checkpoints': [],
+        'tiers': None,
+        'hdd': None,
+        'ssd': None,
+        'models': None,
+        'caches': None,
+        'devices': None,
+    }
@@ -0,0 +1,181 @@
+"""belady.py
+
+Bélády's MIN, the offline optimal cache: on eviction it drops the file whose next
+request is farthest in the future. No online policy (eviction.py, admission.py) can
+hit more often at the same capacity, so a run with it is an upper bound to compare
+the others against:
+
+  REPLACEMENT_POLICY = 'belady'      ssd_caching with a MIN SSD cache
+  REPLACEMENT_POLICY = 'f4_belady'   f4 with a MIN RAM cache
+
+The future is read from the trace before the simulation starts: next_use() maps
+every request to the index of the next request of the same file, in one vectorized
+pass over the file ids. BeladyEviction keeps its files in a max-heap on that index
+and follows each file through the trace with a cursor advanced on every lookup, so
+the cache is used exactly like the online engines (one lookup per request).
+
+Files have different sizes, where exact MIN is NP-hard; the engine is the usual
+greedy generalization. It evicts the farthest next uses until the new file fits, and
+bypasses the cache (the file is not stored) when that would evict a file needed
+sooner than the new one, or when the new file is never requested again.
+
+    future = load_future(config)                    # settings FILE_PATH / DELIMITER / COLUMN_ID
+    cache = BeladyEviction(capacity_bytes, future)
+"""
+
+from __future__ import annotations
+
+import io
+from heapq import heapify, heappop, heappush
+from itertools import count
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+import eviction
+import trace_cache
+import trace_parser
+
+# REPLACEMENT_POLICY -> the legacy policy it replays with a MIN cache
+ORACLE_POLICIES = {'belady': 'ssd_caching', 'f4_belady': 'f4'}
+
+
+def next_use(ids: np.ndarray) -> np.ndarray:
+    """Index of the next request of the same id for every request (len(ids): never again).
+
+    Requests are grouped by id with a stable sort, so within a group they stay in trace
+    order and each one's successor is its next use.
+    """
+    n = len(ids)
+    result = np.full(n, n, dtype=np.int64)
+    if n < 2:
+        return result
+    _, codes = np.unique(ids, return_inverse=True)
+    order = np.argsort(codes, kind='stable')
+    same = codes[order[1:]] == codes[order[:-1]]
+    result[order[:-1][same]] = order[1:][same]
+    return result
+
+
+class Future:
+    """The next-use index of every request of a trace and the first request of every file."""
+
+    def __init__(self, ids) -> None:
+        ids = np.asarray(ids)
+        self.next_use = next_use(ids)
+        self.never = len(ids)
+        first = np.ones(self.never, dtype=bool)
+        first[self.next_use[self.next_use < self.never]] = False
+        keys = ids[first].tolist()
+        if ids.dtype.kind != 'U':
+            keys = [str(key) for key in keys]   # source_trace_cached dispatches str(lba)
+        self.first: Dict = dict(zip(keys, np.flatnonzero(first).tolist()))
+
+    def __len__(self) -> int:
+        return self.never
+
+    def after(self, index: int) -> int:
+        """Index of the next request of the file requested at index (never: len)."""
+        return int(self.next_use[index]) if index < self.never else self.never
+
+
+def trace_ids(file_path: Optional[str], delimiter: str, column_id: int) -> np.ndarray:
+    """File id of every request of a legacy trace, as Trace.source_trace dispatches them."""
+    if trace_cache.is_cache(file_path):
+        return np.asarray(trace_cache.TraceCache(file_path).columns['lba'])
+    if file_path is None:
+        raise ValueError("Bélády's MIN needs the whole trace up front; set FILE_PATH instead of reading stdin")
+    with io.TextIOWrapper(trace_parser.open_trace(file_path)) as lines:
+        ids = [line.split(delimiter)[column_id] for line in (raw.strip() for raw in lines) if line]
+    return np.array(ids)
+
+
+def load_future(config) -> Future:
+    """Future of the trace a legacy policy run of config replays."""
+    return Future(trace_ids(config.FILE_PATH, config.DELIMITER, config.COLUMN_ID))
+
+
+class BeladyEviction(eviction.EvictionEngine):
+    """Offline MIN: evicts the file requested again farthest in the future."""
+
+    name = 'MIN'
+
+    def __init__(self, capacity_bytes: int, future: Future) -> None:
+        super().__init__(capacity_bytes)
+        self.future = future
+        self.upcoming: Dict = {}   # file_id -> index of its next request (set by lookup)
+        self.due: Dict = {}        # stored file_id -> (next request index, heap token)
+        self.heap = []             # (-next request index, token, file_id); stale tokens skipped
+        self.tokens = count()
+        self.bypassed = 0
+
+    def lookup(self, file_id: Hashable) -> Optional[int]:
+        # The request being served is this file's upcoming one; the next after it is now due
+        index = self.upcoming.get(file_id)
+        if index is None:
+            index = self.future.first.get(file_id, self.future.never)
+        self.upcoming[file_id] = self.future.after(index)
+        return super().lookup(file_id)
+
+    def admit(self, file_id: Hashable, size_bytes: int) -> Tuple[int, int]:
+        if file_id not in self.files:
+            bytes_to_free = size_bytes - (self.capacity_bytes - self.used_bytes)
+            if bytes_to_free > 0 and not self._displaces(self.upcoming.get(file_id, self.future.never),
+                                                         bytes_to_free):
+                self.bypassed += 1
+                return 0, 0
+        return super().admit(file_id, size_bytes)
+
+    def _displaces(self, due: int, bytes_to_free: int) -> bool:
+        """True if bytes_to_free can be freed evicting only files needed later than due."""
+        popped = []
+        freed = 0
+        while freed < bytes_to_free:
+            victim = self.victim()
+            if victim is None or self.due[victim][0] <= due:
+                break
+            popped.append(heappop(self.heap))
+            freed += self.files[victim]
+        for entry in popped:
+            heappush(self.heap, entry)
+        return freed >= bytes_to_free
+
+    def victim(self):
+        heap, due = self.heap, self.due
+        while heap:
+            _, token, file_id = heap[0]
+            entry = due.get(file_id)
+            if entry is not None and entry[1] == token:
+                return file_id
+            heappop(heap)
+        return None
+
+    def _schedule(self, file_id) -> None:
+        index = self.upcoming.get(file_id, self.future.never)
+        token = next(self.tokens)
+        self.due[file_id] = (index, token)
+        heappush(self.heap, (-index, token, file_id))
+        # Hits leave stale entries; compact once they outnumber the live ones
+        if len(self.heap) > 2 * len(self.due) + 1024:
+            self.heap = [(-index, token, f) for f, (index, token) in self.due.items()]
+            heapify(self.heap)
+
+    def _insert(self, file_id) -> None:
+        self._schedule(file_id)
+
+    def _hit(self, file_id) -> None:
+        self._schedule(file_id)
+
+    def _pop_victim(self):
+        file_id = self.victim()
+        heappop(self.heap)
+        del self.due[file_id]
+        return file_id
+
+    def _discard(self, file_id) -> None:
+        del self.due[file_id]
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats['bypassed'] = self.bypassed
+        return stats
@@ -0,0 +1,262 @@
+"""benchmarks/bench.py
+
+Simulator throughput benchmarks: every REPLACEMENT_POLICY on the bundled trace and
+on generated traces of several sizes (workload_gen.py, fixed seed).
+
+Each point runs in a fresh interpreter, so imports, caches and peak RSS do not
+leak between points, and reports:
+  requests      requests completed (SimulationMetrics.total_operations)
+  wall_s        wall time of run_simulation()
+  req_per_s     simulated requests per wall-second
+  ttfe_s        time to first event: wall time until the first request completed
+                (trace opening, normalization pre-scan, agent construction)
+  peak_rss_mb   peak resident set size of the point's process
+
+Legacy policies (hashed, ssd_caching and its belady bound) replay the MSRC traces through their
+columnar cache (trace_cache.py), which is built before timing starts; f4 is left out,
+the MSRC traces have no zone column for its hot / cold split. Generated
+traces are written once to benchmarks/data/ and reused.
+
+The default matrix is what finishes within POINT_TIMEOUT on one core: the 10M trace
+and rl_c51 on 1M requests (it trains on every request, a few hundred per second) run
+only when asked for with --sizes. benchmarks/baseline.json is a stored default run.
+
+Results are written as JSON. Given a baseline file (an earlier results file), points
+whose req_per_s dropped, or whose peak RSS grew, by more than --threshold are
+reported as regressions and the exit status is 1.
+
+Usage:
+  python benchmarks/bench.py                                         # default matrix -> benchmarks/results.json
+  python benchmarks/bench.py --sizes 10000000 --policies all_hdd hashed
+  python benchmarks/bench.py --sizes 10000 1000000 --policies all_hdd rl_c51
+  python benchmarks/bench.py --baseline benchmarks/baseline.json --threshold 0.1
+  python benchmarks/bench.py --set SIM_ENGINE=heap --out heap.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from time import perf_counter
+from typing import Dict, List, Optional
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+import request_log  # noqa: E402
+
+POLICIES = ('all_ram', 'all_ssd', 'all_hdd', 'hashed', 'ssd_caching', 'rl_c51')
+LEGACY_POLICIES = ('hashed', 'ssd_caching', 'belady')
+SIZES = (10_000, 1_000_000)
+ALL_SIZES = (10_000, 1_000_000, 10_000_000)
+POLICY_MAX_SIZE = {'rl_c51': 10_000}   # default matrix only; --sizes runs every listed size
+BUNDLED_TRACE = os.path.join(REPO, 'wdev_3.revised')
+DATA_DIR = os.path.join(REPO, 'benchmarks', 'data')
+RESULTS_PATH = os.path.join(REPO, 'benchmarks', 'results.json')
+WORKLOAD_SEED = 42
+POINT_TIMEOUT = 3600          # seconds per point
+RESULT_PREFIX = 'BENCH_RESULT '
+
+
+# ============================================================================
+# Traces
+# ============================================================================
+
+def generated_trace(size: int, data_dir: str = DATA_DIR) -> str:
+    """Path of the generated trace with ``size`` requests, written on first use."""
+    import workload_gen
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'gen_{size}.revised')
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        workload_gen.generate_trace(tmp, workload_gen.WorkloadSpec(n_requests=size, seed=WORKLOAD_SEED))
+        os.replace(tmp, path)
+    return path
+
+
+def trace_for(policy: str, path: str) -> str:
+    """Legacy policies read the MSRC columns through the trace cache."""
+    if policy not in LEGACY_POLICIES:
+        return path
+    import trace_cache
+    return trace_cache.load_cache(path, build=True).path
+
+
+def bench_cases(policies, sizes, bundled: bool = True, data_dir: str = DATA_DIR,
+                max_size: Optional[Dict[str, int]] = None) -> List[Dict]:
+    max_size = max_size or {}
+    traces = []
+    if bundled and os.path.exists(BUNDLED_TRACE):
+        traces.append(('wdev_3', BUNDLED_TRACE, 0))
+    traces.extend((f'gen_{size}', generated_trace(size, data_dir), size) for size in sizes)
+    return [{'trace': name, 'policy': policy, 'path': trace_for(policy, path)}
+            for name, path, size in traces for policy in policies
+            if size <= max_size.get(policy, size)]
+
+
+# ============================================================================
+# One point (child process)
+# ============================================================================
+
+class FirstEventLog(request_log.RequestLog):
+    """Discards requests but remembers when the first one completed."""
+
+    def __init__(self) -> None:
+        self.first = None
+
+    def write(self, file_id, arrived: float, finished: float, served: float, tier: str) -> None:
+        if self.first is None:
+            self.first = perf_counter()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_point(case: Dict, overrides: Optional[Dict] = None) -> Dict:
+    """Run one benchmark point in this process."""
+    from simulation import run_simulation
+    first_event = FirstEventLog()
+    config = {'REPLACEMENT_POLICY': case['policy'], 'FILE_PATH': case['path'],
+              'REQUEST_LOG': first_event, 'LOG_LEVEL': 'WARNING', 'RL_DEVICE': 'cpu'}
+    if case['policy'] in LEGACY_POLICIES:
+        # MSRC timestamps are seconds and block sizes are used as bytes
+        config.update(TIMESTAMP_UNIT='s', SIZE_FILE_UNIT='B')
+    config.update(overrides or {})
+    start = perf_counter()
+    results = run_simulation(None, **config)
+    wall = perf_counter() - start
+    requests = results['metrics']['total_operations']
+    return {
+        'requests': requests,
+        'wall_s': round(wall, 4),
+        'req_per_s': round(requests / wall, 1) if wall > 0 else None,
+        'ttfe_s': round(first_event.first - start, 4) if first_event.first is not None else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def run_isolated(case: Dict, overrides: Optional[Dict] = None, timeout: float = POINT_TIMEOUT) -> Dict:
+    """Run one point in a fresh interpreter and return its result row."""
+    row = {'trace': case['trace'], 'policy': case['policy']}
+    cmd = [sys.executable, os.path.abspath(__file__), '--point', json.dumps(case)]
+    if overrides:
+        cmd += ['--set'] + [f'{k}={json.dumps(v)}' for k, v in overrides.items()]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, cwd=REPO)
+    except subprocess.TimeoutExpired:
+        row['error'] = f'timeout after {timeout:g}s'
+        return row
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            row.update(json.loads(line[len(RESULT_PREFIX):]))
+            return row
+    err = proc.stderr.strip().splitlines()
+    row['error'] = err[-1] if err else f'exit status {proc.returncode}'
+    return row
+
+
+# ============================================================================
+# Baseline comparison
+# ============================================================================
+
+def compare(rows: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    """Regressions of ``rows`` against ``baseline`` rows with the same trace and policy."""
+    base = {(r['trace'], r['policy']): r for r in baseline if 'error' not in r}
+    regressions = []
+    for row in rows:
+        ref = base.get((row['trace'], row['policy']))
+        if ref is None:
+            continue
+        key = f"{row['trace']}/{row['policy']}"
+        if 'error' in row:
+            regressions.append(f"{key}: failed ({row['error']}), baseline ran")
+            continue
+        if ref.get('req_per_s') and row['req_per_s'] < ref['req_per_s'] * (1 - threshold):
+            regressions.append(f"{key}: {row['req_per_s']:.0f} req/s vs baseline {ref['req_per_s']:.0f} "
+                               f"({row['req_per_s'] / ref['req_per_s'] - 1:+.1%})")
+        if ref.get('peak_rss_mb') and row['peak_rss_mb'] > ref['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{key}: peak RSS {row['peak_rss_mb']:.0f} MB vs baseline {ref['peak_rss_mb']:.0f} MB "
+                               f"({row['peak_rss_mb'] / ref['peak_rss_mb'] - 1:+.1%})")
+    return regressions
+
+
+def _parse_overrides(items: Optional[List[str]]) -> Dict:
+    """KEY=VALUE pairs; values are JSON when they parse as JSON, strings otherwise."""
+    out = {}
+    for item in items or []:
+        key, _, value = item.partition('=')
+        try:
+            out[key] = json.loads(value)
+        except ValueError:
+            out[key] = value
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Simulator throughput benchmarks')
+    parser.add_argument('--policies', nargs='+', default=list(POLICIES))
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        help=f'generated trace sizes (default {list(SIZES)}; also {ALL_SIZES[-1]})')
+    parser.add_argument('--no-bundled', action='store_true', help='skip the bundled wdev_3 trace')
+    parser.add_argument('--set', nargs='+', metavar='KEY=VALUE', help='settings overrides for every point')
+    parser.add_argument('--out', default=RESULTS_PATH)
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed relative regression')
+    parser.add_argument('--timeout', type=float, default=POINT_TIMEOUT, help='seconds per point')
+    parser.add_argument('--point', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    overrides = _parse_overrides(args.set)
+
+    if args.point:
+        result = run_point(json.loads(args.point), overrides)
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return 0
+
+    if args.sizes is None:
+        cases = bench_cases(args.policies, SIZES, bundled=not args.no_bundled, max_size=POLICY_MAX_SIZE)
+    else:
+        cases = bench_cases(args.policies, args.sizes, bundled=not args.no_bundled)
+    rows = []
+    for case in cases:
+        row = run_isolated(case, overrides, args.timeout)
+        rows.append(row)
+        if 'error' in row:
+            print(f"{row['trace']:>14} {row['policy']:<12} ERROR {row['error']}")
+        else:
+            print(f"{row['trace']:>14} {row['policy']:<12} {row['requests']:>10} req "
+                  f"{row['req_per_s']:>12.0f} req/s  ttfe {row['ttfe_s'] if row['ttfe_s'] is not None else '-':>8}s "
+                  f"rss {row['peak_rss_mb']:>8.1f} MB")
+
+    report = {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpus': os.cpu_count(), 'overrides': overrides},
+        'results': rows,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}: {len(rows)} points")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(rows, baseline.get('results', []), args.threshold)
+        for line in regressions:
+            print('REGRESSION ' + line)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
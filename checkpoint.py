@@ -0,0 +1,175 @@
+"""checkpoint.py
+
+Checkpoint and resume of long simulations (8-column trace policies: rl_c51, all_*).
+
+Event-simulation processes are live generators and cannot be saved, so a checkpoint
+is taken by the trace source between two requests at an instant when nothing is in
+flight (the event queue is empty). Under sustained queueing such an instant may never
+come; once a checkpoint is a whole CHECKPOINT_EVERY interval overdue, the source stops
+dispatching until the requests in flight finish (with a warning), which delays the
+rest of the trace by that drain time. The whole simulation state is then plain data:
+
+  row, now       trace rows already dispatched and the simulated clock (ns)
+  trace          Trace.checkpoint_state(): tier maps and used bytes, storage devices,
+                 metrics, the RL placement (C51Agent networks, optimizer, replay buffer)
+                 and the migration agent system (LBA hotness tracker, queue, counters)
+  rng            states of the random, NumPy and torch generators
+
+It is pickled to CHECKPOINT_DIR/ckpt_<row>.pkl once at least CHECKPOINT_EVERY requests
+have been dispatched since the previous one, keeping the newest CHECKPOINT_KEEP files.
+With RESUME_FROM (a checkpoint path, or 'latest' for the newest in CHECKPOINT_DIR) a
+run restores that state, starts the clock at its time and continues with the next
+trace row; the trace is re-read up to that row without simulating it.
+
+Forking what-if runs from one warmed-up state is the same operation with different
+settings, e.g.
+
+    base = run_simulation(make_config(CHECKPOINT_EVERY=10**6, ...))
+    fork = run_simulation(make_config(RESUME_FROM='checkpoints/ckpt_000001000000.pkl',
+                                      NUMBER_SSD=8, CHECKPOINT_EVERY=0))
+
+Transfer rates, device counts and capacities come from the new settings; the
+replacement policy must be the one the checkpoint was taken with. Per-request output
+starts afresh in the resumed run.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import pickle
+import random
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from request_log import get_logger
+
+CHECKPOINT_VERSION = 3
+CHECKPOINT_PATTERN = 'ckpt_*.pkl'
+
+logger = get_logger('checkpoint')
+
+
+def _rng_state() -> Dict:
+    state = {'random': random.getstate(), 'numpy': np.random.get_state()}
+    try:
+        import torch
+        state['torch'] = torch.get_rng_state()
+    except ImportError:
+        pass
+    return state
+
+
+def _set_rng_state(state: Dict) -> None:
+    random.setstate(state['random'])
+    np.random.set_state(state['numpy'])
+    if 'torch' in state:
+        import torch
+        torch.set_rng_state(state['torch'])
+
+
+class Checkpointer:
+    """Decides when the trace source checkpoints and writes the files."""
+
+    def __init__(self, config) -> None:
+        self.config = config
+        self.every = max(int(getattr(config, 'CHECKPOINT_EVERY', 0) or 0), 0)
+        self.directory = getattr(config, 'CHECKPOINT_DIR', 'checkpoints')
+        self.keep = max(int(getattr(config, 'CHECKPOINT_KEEP', 2)), 1)
+        self.next_row = self.every if self.every else float('inf')
+        self.saved = []
+
+    def resumed_at(self, row: int) -> None:
+        """Count the interval from the row a resumed run starts at."""
+        if self.every:
+            self.next_row = row + self.every
+
+    def overdue(self, row: int) -> bool:
+        """True when trace row ``row`` is a whole interval past the due row, so the source drains."""
+        if row < self.next_row + self.every:
+            return False
+        logger.warning("[CHECKPOINT] Requests in flight at every row since row %d; "
+                       "holding row %d until they finish", self.next_row, row)
+        return True
+
+    def save(self, trace, row: int) -> str:
+        """Write the state of ``trace`` before trace row ``row`` is dispatched."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'ckpt_{row:012d}.pkl')
+        executor = trace.agent_system.migration_executor
+        executor.stop()      # no tracker updates from the migration thread while pickling
+        if trace.profiler is not None:
+            trace.profiler.detach()
+        try:
+            state = {
+                'version': CHECKPOINT_VERSION,
+                'created': time.time(),
+                'policy': trace.replacement_policy,
+                'file_path': getattr(self.config, 'FILE_PATH', None),
+                'row': row,
+                'now': trace.env.now,
+                'rng': _rng_state(),
+                'trace': trace.checkpoint_state(),
+            }
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        finally:
+            if trace.profiler is not None:
+                trace.instrument_phases()
+            executor.start()
+        self.saved.append(path)
+        for old in sorted(glob.glob(os.path.join(self.directory, CHECKPOINT_PATTERN)))[:-self.keep]:
+            os.remove(old)
+        self.next_row = row + self.every
+        logger.info("[CHECKPOINT] Row %d at %.3f s simulated written to %s", row, trace.env.now / 1e9, path)
+        return path
+
+
+def latest_checkpoint(directory: str) -> Optional[str]:
+    """Newest checkpoint file in ``directory`` (None if there is none)."""
+    paths = sorted(glob.glob(os.path.join(directory, CHECKPOINT_PATTERN)))
+    return paths[-1] if paths else None
+
+
+def load_checkpoint(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint '{path}' has format version {state.get('version')}, "
+                         f"expected {CHECKPOINT_VERSION}")
+    return state
+
+
+def resume_state(config) -> Optional[Dict]:
+    """Checkpoint selected by config.RESUME_FROM, loaded and checked against config (None if unset)."""
+    source = getattr(config, 'RESUME_FROM', None)
+    if not source:
+        return None
+    path = source
+    if source == 'latest':
+        path = latest_checkpoint(getattr(config, 'CHECKPOINT_DIR', 'checkpoints'))
+        if path is None:
+            logger.warning("[CHECKPOINT] RESUME_FROM = 'latest' but no checkpoint found, starting from the beginning")
+            return None
+    state = load_checkpoint(path)
+    policy = config.REPLACEMENT_POLICY.lower()
+    if state['policy'] != policy:
+        raise ValueError(f"Checkpoint '{path}' was taken with policy '{state['policy']}', not '{policy}'")
+    if state['file_path'] != getattr(config, 'FILE_PATH', None):
+        logger.warning("[CHECKPOINT] Checkpoint trace %s differs from FILE_PATH %s",
+                       state['file_path'], getattr(config, 'FILE_PATH', None))
+    logger.info("[CHECKPOINT] Resuming from %s at row %d (%.3f s simulated)", path, state['row'], state['now'] / 1e9)
+    return state
+
+
+def restore(trace, state: Dict) -> None:
+    """Apply a loaded checkpoint to a freshly built Trace (whose env starts at state['now'])."""
+    trace.restore_checkpoint_state(state['trace'])
+    trace.resume_row = state['row']
+    if trace.checkpointer is not None:
+        trace.checkpointer.resumed_at(state['row'])
+    _set_rng_state(state['rng'])
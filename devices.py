@@ -0,0 +1,196 @@
+"""devices.py
+
+Per-device routing of a tier's requests: LBA layout, per-device queues and the
+device load report.
+
+DeviceLayout maps a request (LBA in 512-byte sectors, size in bytes) to the devices
+holding it:
+
+  linear   device (lba // device_sectors) % n at offset lba % device_sectors; the
+           request stays on one device
+  stripe   RAID-0: stripe unit u = lba // STRIPE_UNIT_BYTES goes to device u % n at
+           offset (u // n) * unit; a request crossing unit boundaries is split into
+           one part per unit, parts that are contiguous on one device are merged
+  hash     as stripe, with units placed on device hash(u) % n, so regular strides
+           do not all land on the same device
+
+DeviceQueues is the flat (size / transfer rate) service time with a queue per device,
+or per group of DEVICE_GROUP_SIZE devices, instead of one shared Resource for the
+tier, so load imbalance and hot spots show up as queueing. The mechanical HDD and the
+internal SSD models (hdd_model.py, ssd_model.py) serve parts the same way.
+
+A split request finishes with its last part; its start is the earliest part start.
+
+    layout = DeviceLayout(n_devices=8, scheme='stripe', stripe_bytes=65536)
+    queues = DeviceQueues(env, Resource, 8, read_rate, write_rate)
+    arrived, started, finished = yield from layout.route(env, queues.serve, lba, size, is_read, is_seq, fullness)
+
+Every tier's serve(device, offset, bytes, is_read, is_seq, fullness) takes the same
+arguments; each model uses the ones it needs.
+"""
+
+from __future__ import annotations
+
+import math
+import zlib
+from typing import Dict, List, Tuple
+
+try:
+    from settings import DEVICE_LAYOUT, STRIPE_UNIT_BYTES, DEVICE_GROUP_SIZE
+except ImportError:
+    DEVICE_LAYOUT = 'stripe'
+    STRIPE_UNIT_BYTES = 65536
+    DEVICE_GROUP_SIZE = 1
+
+SECTOR_BYTES = 512
+SECOND_TO_NANOSECOND = 1000 * 1000 * 1000
+
+LAYOUTS = ('linear', 'stripe', 'hash')
+
+
+class DeviceLayout:
+    """LBA -> (device, device offset) placement of one tier."""
+
+    def __init__(self, n_devices: int, scheme: str = DEVICE_LAYOUT, stripe_bytes: int = STRIPE_UNIT_BYTES,
+                 device_bytes: int = 4 * 1024 ** 4) -> None:
+        if scheme not in LAYOUTS:
+            raise ValueError(f"Unknown DEVICE_LAYOUT '{scheme}' (expected one of {', '.join(LAYOUTS)})")
+        self.n_devices = max(int(n_devices), 1)
+        self.scheme = scheme
+        self.unit = max(int(stripe_bytes) // SECTOR_BYTES, 1)
+        self.device_sectors = max(int(device_bytes) // SECTOR_BYTES, 1)
+
+    def _device(self, stripe: int) -> int:
+        if self.scheme == 'hash':
+            return zlib.crc32(stripe.to_bytes(8, 'little')) % self.n_devices
+        return stripe % self.n_devices
+
+    def split(self, lba: int, size_bytes: float) -> List[Tuple[int, int, float]]:
+        """Parts of a request as (device, device offset, bytes)."""
+        if self.scheme == 'linear':
+            return [((lba // self.device_sectors) % self.n_devices, lba % self.device_sectors, size_bytes)]
+        unit, n = self.unit, self.n_devices
+        end = lba + max(int(math.ceil(size_bytes / SECTOR_BYTES)), 1)
+        if lba // unit == (end - 1) // unit:
+            stripe = lba // unit
+            return [(self._device(stripe), (stripe // n) * unit + lba % unit, size_bytes)]
+        parts: List[List] = []
+        pos, remaining = lba, size_bytes
+        while pos < end:
+            stripe = pos // unit
+            take = min(unit - pos % unit, end - pos)
+            nbytes = min(remaining, take * SECTOR_BYTES) if pos + take < end else remaining
+            device, offset = self._device(stripe), (stripe // n) * unit + pos % unit
+            for part in parts:
+                if part[0] == device and part[1] + math.ceil(part[2] / SECTOR_BYTES) == offset:
+                    part[2] += nbytes
+                    break
+            else:
+                parts.append([device, offset, nbytes])
+            pos += take
+            remaining -= nbytes
+        return [tuple(part) for part in parts]
+
+    def route(self, env, serve, lba: int, size_bytes: float, *args):
+        """Serve a request by its parts with ``serve(device, offset, bytes, *args)``, a generator
+        returning (arrived, started, finished); returns the same for the whole request."""
+        parts = self.split(lba, size_bytes)
+        if len(parts) == 1:
+            device, offset, nbytes = parts[0]
+            return (yield from serve(device, offset, nbytes, *args))
+        arrived = env.now
+        done = env.event()
+        starts = []
+
+        def part(device, offset, nbytes):
+            _, started, _ = yield from serve(device, offset, nbytes, *args)
+            starts.append(started)
+            if len(starts) == len(parts):
+                done.succeed()
+
+        for device, offset, nbytes in parts:
+            env.process(part(device, offset, nbytes))
+        yield done
+        return arrived, min(starts), env.now
+
+
+class DeviceQueues:
+    """Flat service time (latency + bytes / transfer rate) with one queue per device group."""
+
+    def __init__(self, env, resource_class, n_devices: int, read_rate: float, write_rate: float,
+                 group_size: int = DEVICE_GROUP_SIZE, latency_ns: float = 0.0) -> None:
+        self.env = env
+        self.latency_ns = latency_ns
+        self.resource_class = resource_class
+        self.n_devices = max(int(n_devices), 1)
+        self.group_size = max(int(group_size), 1)
+        self.read_rate = read_rate
+        self.write_rate = write_rate
+        self.groups: Dict[int, object] = {}
+        self.requests: Dict[int, int] = {}
+        self.busy_ns: Dict[int, float] = {}
+
+    @property
+    def queued(self) -> int:
+        return sum(len(group.queue) for group in self.groups.values())
+
+    @property
+    def busy(self) -> int:
+        return sum(group.count for group in self.groups.values())
+
+    def stats(self) -> Dict:
+        return {'devices_used': len(self.requests), 'served': sum(self.requests.values())}
+
+    def device_load(self) -> Dict[int, Tuple[int, float]]:
+        """{device: (requests, busy ns)}; a group's load is charged to its first device."""
+        return {device: (count, self.busy_ns[device]) for device, count in self.requests.items()}
+
+    def serve(self, device: int, offset: int, size_bytes: float, is_read: bool, is_seq: bool = False,
+              fullness: float = 0.0):
+        env = self.env
+        group = device // self.group_size
+        resource = self.groups.get(group)
+        if resource is None:
+            members = min(self.group_size, self.n_devices - group * self.group_size)
+            resource = self.groups[group] = self.resource_class(env, capacity=max(members, 1))
+        duration = int(self.latency_ns
+                       + (size_bytes / float(self.read_rate if is_read else self.write_rate)) * SECOND_TO_NANOSECOND)
+        with resource.request() as req:
+            arrived = env.now
+            yield req
+            started = env.now
+            yield env.timeout(duration)
+        key = group * self.group_size
+        self.requests[key] = self.requests.get(key, 0) + 1
+        self.busy_ns[key] = self.busy_ns.get(key, 0.0) + duration
+        return arrived, started, env.now
+
+    # Checkpoints: only the load counters; queues are empty between requests
+    def device_state(self):
+        return self.requests, self.busy_ns
+
+    def restore_devices(self, state) -> None:
+        self.requests, self.busy_ns = state
+
+
+def load_summary(load: Dict[int, Tuple[int, float]], n_devices: int, sim_time: float, servers: int = 1) -> Dict:
+    """Per-device utilization and imbalance of a tier.
+
+    ``load`` is {device: (requests, busy ns)}; ``servers`` divides the busy time of
+    devices that serve several requests at once (dies of an SSD). Utilization is busy
+    time over the simulated time; imbalance is the busiest device's utilization over
+    the mean of all n_devices (1.0 = perfectly even).
+    """
+    util = {device: busy / servers / sim_time if sim_time > 0 else 0.0 for device, (_, busy) in load.items()}
+    mean = sum(util.values()) / max(n_devices, 1)
+    busiest = max(util, key=util.get) if util else None
+    return {
+        'devices': n_devices,
+        'devices_used': len(load),
+        'requests': sum(count for count, _ in load.values()),
+        'mean_utilization': mean,
+        'max_utilization': util[busiest] if busiest is not None else 0.0,
+        'imbalance': util[busiest] / mean if busiest is not None and mean > 0 else 0.0,
+        'busiest': busiest,
+        'per_device': {device: {'requests': load[device][0], 'utilization': util[device]} for device in sorted(load)},
+    }
@@ -0,0 +1,287 @@
+"""engine.py
+
+Minimal heapq-based discrete-event core, a drop-in for the parts of SimPy the
+simulator uses: Environment.now/timeout/process/run and a FIFO multi-server
+Resource whose request() is used as ``with res.request() as req: yield req``.
+
+Events are ordered exactly as in SimPy 4, by (time, priority, insertion id): a
+process starts through an URGENT event at its creation time, timeouts and granted
+requests are NORMAL events, and a released slot is handed to the next waiter when
+the release event is processed. Results are therefore identical to a SimPy run;
+the speed-up comes from slotted events, no condition/bound-class machinery, heap
+entries that call process starts and releases directly instead of allocating an
+event for them, and no completion event for processes nobody waits on.
+
+Select the backend with settings.SIM_ENGINE ('simpy', the default, or 'heap'):
+
+    Environment, Resource = engine.get_backend('heap')
+    env = Environment()
+    hdd = Resource(env, capacity=4)
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from functools import partial
+from heapq import heappop, heappush
+from itertools import count
+from typing import Any, Generator, Optional, Tuple
+
+try:
+    from settings import SIM_ENGINE
+except ImportError:
+    SIM_ENGINE = 'simpy'
+
+URGENT = 0
+NORMAL = 1
+
+
+class Event:
+    """An event that processes can wait on; triggered once, processed once."""
+
+    __slots__ = ('env', 'callbacks', '_value', '_ok', 'triggered')
+
+    def __init__(self, env: 'Environment') -> None:
+        self.env = env
+        self.callbacks: Optional[list] = []
+        self._value: Any = None
+        self._ok = True
+        self.triggered = False
+
+    @property
+    def processed(self) -> bool:
+        return self.callbacks is None
+
+    @property
+    def value(self) -> Any:
+        return self._value
+
+    @property
+    def ok(self) -> bool:
+        return self._ok
+
+    def succeed(self, value: Any = None) -> 'Event':
+        if self.triggered:
+            raise RuntimeError(f'{self!r} has already been triggered')
+        self.triggered = True
+        self._value = value
+        self.env.schedule(self)
+        return self
+
+    def fail(self, exception: BaseException) -> 'Event':
+        if self.triggered:
+            raise RuntimeError(f'{self!r} has already been triggered')
+        self.triggered = True
+        self._ok = False
+        self._value = exception
+        self.env.schedule(self)
+        return self
+
+
+# Value sent into a generator when its process starts
+_STARTED = Event(None)
+_STARTED.triggered = True
+_STARTED.callbacks = None
+
+
+class Timeout(Event):
+    """Event processed ``delay`` time units after its creation."""
+
+    __slots__ = ()
+
+    def __init__(self, env: 'Environment', delay: float = 0, value: Any = None) -> None:
+        if delay < 0:
+            raise ValueError(f'Negative delay {delay}')
+        self.env = env
+        self.callbacks = []
+        self._value = value
+        self._ok = True
+        self.triggered = True
+        heappush(env._queue, (env._now + delay, NORMAL, next(env._eid), self, None))
+
+
+class Process(Event):
+    """Runs a generator; each yielded event suspends it until that event is processed.
+
+    The process itself is an event that triggers when the generator returns. Unlike
+    SimPy, the completion is only scheduled when someone is waiting on it; a process
+    waited on after it finished resumes its waiter immediately.
+    """
+
+    __slots__ = ('_generator', '_send', '_resume_cb')
+
+    def __init__(self, env: 'Environment', generator: Generator) -> None:
+        if not hasattr(generator, 'send'):
+            raise ValueError(f'{generator!r} is not a generator')
+        super().__init__(env)
+        self._generator = generator
+        self._send = generator.send
+        self._resume_cb = self._resume
+        heappush(env._queue, (env._now, URGENT, next(env._eid), _STARTED, self._resume_cb))
+
+    @property
+    def is_alive(self) -> bool:
+        return not self.triggered
+
+    def _resume(self, event: Event) -> None:
+        env = self.env
+        env.active_process = self
+        while True:
+            try:
+                if event._ok:
+                    event = self._send(event._value)
+                else:
+                    event = self._generator.throw(event._value)
+            except StopIteration as e:
+                self.triggered = True
+                self._value = e.value
+                if self.callbacks:
+                    env.schedule(self)
+                else:
+                    self.callbacks = None
+                break
+            try:
+                callbacks = event.callbacks
+            except AttributeError:
+                raise RuntimeError(f'Invalid yield value "{event}"') from None
+            if callbacks is not None:
+                callbacks.append(self._resume_cb)
+                break
+            # Already processed: continue with its value right away
+        env.active_process = None
+
+
+class Request(Event):
+    """Usage request for a Resource slot; releases the slot when its ``with`` block exits."""
+
+    __slots__ = ('resource', 'usage_since')
+
+    def __init__(self, resource: 'Resource') -> None:
+        self.env = resource.env
+        self.callbacks = []
+        self._value = None
+        self._ok = True
+        self.triggered = False
+        self.resource = resource
+        self.usage_since: Optional[float] = None
+        resource.queue.append(self)
+        resource._trigger_put()
+
+    def __enter__(self) -> 'Request':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if not self.triggered:
+            try:
+                self.resource.queue.remove(self)
+            except ValueError:
+                pass
+        # As in SimPy, generator cleanup (GeneratorExit) does not release
+        if exc_type is not GeneratorExit:
+            self.resource.release(self)
+
+
+class Resource:
+    """FIFO resource with ``capacity`` identical servers (SimPy Resource semantics).
+
+    ``queue`` holds the waiting requests in arrival order, ``users`` the granted ones.
+    """
+
+    __slots__ = ('env', 'capacity', 'users', 'queue', 'request', '_trigger_cb')
+
+    def __init__(self, env: 'Environment', capacity: int = 1) -> None:
+        if capacity <= 0:
+            raise ValueError('"capacity" must be > 0.')
+        self.env = env
+        self.capacity = capacity
+        self.users = set()
+        self.queue: deque = deque()
+        self._trigger_cb = self._trigger_put
+        self.request = partial(Request, self)
+
+    @property
+    def count(self) -> int:
+        return len(self.users)
+
+    def release(self, request: Request) -> None:
+        """Free the slot of ``request``; the next waiter is granted when the release is processed."""
+        self.users.discard(request)
+        env = self.env
+        heappush(env._queue, (env._now, NORMAL, next(env._eid), None, self._trigger_cb))
+
+    def _trigger_put(self, event: Optional[Event] = None) -> None:
+        # Only the head of the queue is considered, like SimPy's Resource
+        if self.queue and len(self.users) < self.capacity:
+            request = self.queue.popleft()
+            self.users.add(request)
+            request.usage_since = self.env._now
+            request.succeed()
+
+
+class Environment:
+    """Event loop: a heap of (time, priority, id, event, action) entries.
+
+    An entry with an action calls ``action(event)`` (process start, slot release);
+    otherwise the event is processed, i.e. its callbacks are run.
+    """
+
+    def __init__(self, initial_time: float = 0) -> None:
+        self._now = initial_time
+        self._queue: list = []
+        self._eid = count()
+        self.active_process: Optional[Process] = None
+        # Hot constructors bound once: env.timeout(d) creates the Timeout without an extra call frame
+        self.timeout = partial(Timeout, self)
+        self.process = partial(Process, self)
+
+    @property
+    def now(self) -> float:
+        return self._now
+
+    def schedule(self, event: Event, priority: int = NORMAL, delay: float = 0) -> None:
+        heappush(self._queue, (self._now + delay, priority, next(self._eid), event, None))
+
+    def peek(self) -> float:
+        """Time of the next scheduled event (inf if none)."""
+        return self._queue[0][0] if self._queue else float('inf')
+
+    def event(self) -> Event:
+        return Event(self)
+
+    def step(self) -> None:
+        self._now, _, _, event, action = heappop(self._queue)
+        if action is not None:
+            action(event)
+            return
+        callbacks, event.callbacks = event.callbacks, None
+        for callback in callbacks:
+            callback(event)
+
+    def run(self, until: Optional[float] = None) -> None:
+        """Process events until none are left, or until simulated time ``until``."""
+        queue = self._queue
+        if until is not None and until <= self._now:
+            raise ValueError(f'until ({until}) must be greater than the current time')
+        while queue:
+            if until is not None and queue[0][0] >= until:
+                break
+            self._now, _, _, event, action = heappop(queue)
+            if action is not None:
+                action(event)
+                continue
+            callbacks, event.callbacks = event.callbacks, None
+            for callback in callbacks:
+                callback(event)
+        if until is not None:
+            self._now = until
+
+
+def get_backend(name: Optional[str] = None) -> Tuple[type, type]:
+    """(Environment, Resource) classes of the 'heap' (this module) or 'simpy' engine."""
+    name = (name or SIM_ENGINE).lower()
+    if name == 'heap':
+        return Environment, Resource
+    if name == 'simpy':
+        import simpy
+        return simpy.Environment, simpy.Resource
+    raise ValueError(f"Unknown SIM_ENGINE '{name}' (expected 'heap' or 'simpy')")
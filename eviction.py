@@ -0,0 +1,517 @@
+"""eviction.py
+
+Byte-capacity caches with pluggable victim selection, shared by the capacity-limited
+tiers of Trace (tiers.py) and by storageDevice.SolidStateDrive / Ram.
+
+An engine maps file_id -> size in bytes. Admitting a file that does not fit evicts
+victims until it does; a lookup or re-admission of a stored file is a hit. The
+victim is chosen by settings.EVICTION_POLICY (per tier with the 'eviction' key of
+settings.TIERS):
+
+  'LRU'   least recently used: OrderedDict in recency order, hits move to the end
+  'FIFO'  first in, first out: OrderedDict in admission order, hits change nothing
+  'LFU'   least frequently used, oldest first among equals: one OrderedDict bucket
+          per access count, the buckets linked in count order
+  'ARC'   Adaptive Replacement Cache (Megiddo & Modha): files seen once (T1) and
+          seen again (T2), plus ghost lists of their recent victims (B1, B2). A miss
+          on a ghost moves the T1 byte target toward recency or frequency, so the
+          cache follows the trace between scan and hot-spot phases, and a scan only
+          ever flushes T1
+  'S3FIFO' S3-FIFO (Yang et al., SOSP'23): new files enter a small FIFO (10% of the
+          bytes); those re-accessed there move to the main FIFO, the others leave
+          through a ghost FIFO that sends them straight to main if they come back.
+          The main FIFO reinserts files with a non-zero access count (CLOCK). A hit
+          only increments a 2-bit counter, nothing is reordered
+
+Bélády's offline MIN (belady.py) has the same interface but needs the future of the
+trace, so it is selected with REPLACEMENT_POLICY = 'belady' / 'f4_belady' instead.
+
+Every operation is O(1) (amortized), whatever the number of stored files.
+lookup() counts hits and misses for the hit ratio (stats()).
+
+    cache = make_eviction('LRU', capacity_bytes=10 * 2**30)
+    evicted, freed = cache.admit(file_id, size_bytes)
+    size = cache.lookup(file_id)    # None on a miss
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class EvictionEngine:
+    """file_id -> size cache of capacity_bytes; subclasses choose the victims."""
+
+    name = ''
+
+    def __init__(self, capacity_bytes: int) -> None:
+        self.capacity_bytes = capacity_bytes
+        self.used_bytes = 0
+        self.files: Dict = {}   # file_id -> size_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, file_id: Hashable) -> bool:
+        return file_id in self.files
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def lookup(self, file_id: Hashable) -> Optional[int]:
+        """Size of a stored file (a hit), or None (a miss)."""
+        size = self.files.get(file_id)
+        if size is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._hit(file_id)
+        return size
+
+    def admit(self, file_id: Hashable, size_bytes: int) -> Tuple[int, int]:
+        """Store a file, evicting victims until it fits; returns (evicted files, bytes freed).
+
+        A stored file counts as a hit instead. A file larger than the whole capacity
+        empties the cache and is stored anyway.
+        """
+        if file_id in self.files:
+            self._hit(file_id)
+            return 0, 0
+        evicted = freed = 0
+        bytes_to_free = size_bytes - (self.capacity_bytes - self.used_bytes)
+        while bytes_to_free > 0 and self.files:
+            size = self.files.pop(self._pop_victim())
+            self.used_bytes -= size
+            bytes_to_free -= size
+            freed += size
+            evicted += 1
+        self.files[file_id] = size_bytes
+        self.used_bytes += size_bytes
+        self._insert(file_id)
+        return evicted, freed
+
+    def remove(self, file_id: Hashable) -> Optional[int]:
+        """Drop a file without eviction; returns its size, or None if it was not stored."""
+        size = self.files.pop(file_id, None)
+        if size is not None:
+            self.used_bytes -= size
+            self._discard(file_id)
+        return size
+
+    def percent(self) -> float:
+        return (self.used_bytes / float(self.capacity_bytes)) * 100 if self.capacity_bytes > 0 else 0
+
+    def victim(self):
+        """The file the next eviction would start with (None if empty), without evicting it."""
+        raise NotImplementedError
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+    def stats(self) -> Dict:
+        """Policy, lookups, hit ratio and occupancy."""
+        return {'policy': self.name, 'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hit_ratio(),
+                'files': len(self.files), 'used_bytes': self.used_bytes, 'capacity_bytes': self.capacity_bytes}
+
+    # Victim selection: files already holds (or no longer holds) the file when these run
+    def _insert(self, file_id) -> None:
+        raise NotImplementedError
+
+    def _hit(self, file_id) -> None:
+        raise NotImplementedError
+
+    def _pop_victim(self):
+        raise NotImplementedError
+
+    def _discard(self, file_id) -> None:
+        raise NotImplementedError
+
+
+class FIFOEviction(EvictionEngine):
+    """Evicts in admission order; files is an OrderedDict kept in that order."""
+
+    name = 'FIFO'
+
+    def __init__(self, capacity_bytes: int) -> None:
+        super().__init__(capacity_bytes)
+        self.files = OrderedDict()
+
+    def _insert(self, file_id) -> None:
+        pass
+
+    def _hit(self, file_id) -> None:
+        pass
+
+    def victim(self):
+        return next(iter(self.files), None)
+
+    def _pop_victim(self):
+        return next(iter(self.files))
+
+    def _discard(self, file_id) -> None:
+        pass
+
+
+class LRUEviction(FIFOEviction):
+    """Evicts the least recently used file; hits move a file to the end of files."""
+
+    name = 'LRU'
+
+    def _hit(self, file_id) -> None:
+        self.files.move_to_end(file_id)
+
+
+class LFUEviction(EvictionEngine):
+    """Evicts the least frequently used file, the oldest of its access count first.
+
+    Non-empty count buckets form a linked list in count order (prev_count /
+    next_count), headed by min_freq, so the next minimum is known without a search.
+    """
+
+    name = 'LFU'
+
+    def __init__(self, capacity_bytes: int) -> None:
+        super().__init__(capacity_bytes)
+        self.freq: Dict = {}                        # file_id -> access count
+        self.buckets: Dict[int, OrderedDict] = {}   # access count -> files, oldest first
+        self.prev_count: Dict[int, Optional[int]] = {}
+        self.next_count: Dict[int, Optional[int]] = {}
+        self.min_freq = 0                           # 0: empty
+
+    def _link(self, count: int, after: Optional[int]) -> None:
+        """New empty bucket for count, right after bucket ``after`` (None: at the head)."""
+        following = self.next_count[after] if after is not None else (self.min_freq or None)
+        self.prev_count[count] = after
+        self.next_count[count] = following
+        if after is None:
+            self.min_freq = count
+        else:
+            self.next_count[after] = count
+        if following is not None:
+            self.prev_count[following] = count
+        self.buckets[count] = OrderedDict()
+
+    def _take(self, file_id, count: int) -> None:
+        """Remove a file from its bucket, unlinking the bucket once empty."""
+        bucket = self.buckets[count]
+        del bucket[file_id]
+        if bucket:
+            return
+        del self.buckets[count]
+        before, following = self.prev_count.pop(count), self.next_count.pop(count)
+        if before is None:
+            self.min_freq = following or 0
+        else:
+            self.next_count[before] = following
+        if following is not None:
+            self.prev_count[following] = before
+
+    def _insert(self, file_id) -> None:
+        if 1 not in self.buckets:
+            self._link(1, None)
+        self.freq[file_id] = 1
+        self.buckets[1][file_id] = None
+
+    def _hit(self, file_id) -> None:
+        count = self.freq[file_id]
+        if count + 1 not in self.buckets:
+            self._link(count + 1, count)
+        self._take(file_id, count)
+        self.freq[file_id] = count + 1
+        self.buckets[count + 1][file_id] = None
+
+    def victim(self):
+        return next(iter(self.buckets[self.min_freq])) if self.files else None
+
+    def _pop_victim(self):
+        file_id = next(iter(self.buckets[self.min_freq]))
+        self._take(file_id, self.freq.pop(file_id))
+        return file_id
+
+    def _discard(self, file_id) -> None:
+        self._take(file_id, self.freq.pop(file_id))
+
+
+class ARCEviction(EvictionEngine):
+    """Adaptive Replacement Cache over byte-sized files.
+
+    T1 / T2 hold the resident files seen once / more than once, B1 / B2 the ghosts
+    (file_id -> size, no data) of files evicted from them, all in LRU order. target
+    is the byte size T1 aims for: a miss that finds its ghost in B1 grows it (recency
+    pays), one in B2 shrinks it (frequency pays). Ghosts are trimmed so that T1 + B1
+    and T2 + B2 stay within the capacity.
+    """
+
+    name = 'ARC'
+
+    def __init__(self, capacity_bytes: int) -> None:
+        super().__init__(capacity_bytes)
+        self.t1: OrderedDict = OrderedDict()
+        self.t2: OrderedDict = OrderedDict()
+        self.b1: OrderedDict = OrderedDict()
+        self.b2: OrderedDict = OrderedDict()
+        self.t1_bytes = self.t2_bytes = self.b1_bytes = self.b2_bytes = 0
+        self.target = 0.0   # T1 target (bytes)
+
+    def admit(self, file_id: Hashable, size_bytes: int) -> Tuple[int, int]:
+        if file_id in self.files:
+            self._hit(file_id)
+            return 0, 0
+        capacity = self.capacity_bytes
+        from_ghost = False
+        if file_id in self.b1:
+            # Evicted from T1 too early: favour recency, by the ghost-list size ratio
+            self.target = min(capacity, self.target + size_bytes * max(1.0, self.b2_bytes / float(self.b1_bytes)))
+            self.b1_bytes -= self.b1.pop(file_id)
+            from_ghost = True
+            evicted, freed = self._replace(size_bytes, False)
+        elif file_id in self.b2:
+            # Evicted from T2 too early: favour frequency
+            self.target = max(0.0, self.target - size_bytes * max(1.0, self.b1_bytes / float(self.b2_bytes)))
+            self.b2_bytes -= self.b2.pop(file_id)
+            from_ghost = True
+            evicted, freed = self._replace(size_bytes, True)
+        else:
+            evicted, freed = self._replace(size_bytes, False)
+        # A file back from a ghost list has been seen twice
+        if from_ghost:
+            self.t2[file_id] = size_bytes
+            self.t2_bytes += size_bytes
+        else:
+            self.t1[file_id] = size_bytes
+            self.t1_bytes += size_bytes
+        self.files[file_id] = size_bytes
+        self.used_bytes += size_bytes
+        self._trim_ghosts()
+        return evicted, freed
+
+    def victim(self):
+        if self.t1 and (self.t1_bytes > self.target or not self.t2):
+            return next(iter(self.t1))
+        return next(iter(self.t2), None)
+
+    def _replace(self, size_bytes: int, in_b2: bool) -> Tuple[int, int]:
+        """Evict LRU files of T1 (above its target) or T2 into their ghost lists until size_bytes fits."""
+        evicted = freed = 0
+        while self.files and self.used_bytes + size_bytes > self.capacity_bytes:
+            if self.t1 and (self.t1_bytes > self.target or (in_b2 and self.t1_bytes >= self.target)
+                            or not self.t2):
+                file_id, size = self.t1.popitem(last=False)
+                self.t1_bytes -= size
+                self.b1[file_id] = size
+                self.b1_bytes += size
+            else:
+                file_id, size = self.t2.popitem(last=False)
+                self.t2_bytes -= size
+                self.b2[file_id] = size
+                self.b2_bytes += size
+            del self.files[file_id]
+            self.used_bytes -= size
+            freed += size
+            evicted += 1
+        return evicted, freed
+
+    def _trim_ghosts(self) -> None:
+        capacity = self.capacity_bytes
+        while self.b1 and self.t1_bytes + self.b1_bytes > capacity:
+            self.b1_bytes -= self.b1.popitem(last=False)[1]
+        while self.b2 and self.t2_bytes + self.b2_bytes > capacity:
+            self.b2_bytes -= self.b2.popitem(last=False)[1]
+
+    def _hit(self, file_id) -> None:
+        size = self.t1.pop(file_id, None)
+        if size is not None:
+            self.t1_bytes -= size
+        else:
+            size = self.t2.pop(file_id)
+            self.t2_bytes -= size
+        self.t2[file_id] = size
+        self.t2_bytes += size
+
+    def _discard(self, file_id) -> None:
+        size = self.t1.pop(file_id, None)
+        if size is not None:
+            self.t1_bytes -= size
+        else:
+            self.t2_bytes -= self.t2.pop(file_id)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update(recency_bytes=self.t1_bytes, frequency_bytes=self.t2_bytes, recency_target_bytes=self.target)
+        return stats
+
+
+# S3-FIFO: byte share of the small queue, and the access count cap (2 bits)
+SMALL_QUEUE_RATIO = 0.1
+MAX_FREQ = 3
+
+
+class S3FIFOEviction(EvictionEngine):
+    """S3-FIFO over byte-sized files.
+
+    small, main and ghost are FIFO deques of (file_id, token) entries; meta holds each
+    resident file's [token, in main, access count]. Files dropped by remove() or
+    moved out of a queue leave stale entries behind, skipped by their token when
+    they reach the head. The ghost queue keeps at most main's capacity in bytes.
+    """
+
+    name = 'S3FIFO'
+
+    def __init__(self, capacity_bytes: int) -> None:
+        super().__init__(capacity_bytes)
+        self.small: deque = deque()
+        self.main: deque = deque()
+        self.ghost: deque = deque()
+        self.meta: Dict = {}     # file_id -> [token, in main, access count]
+        self.ghosts: Dict = {}   # file_id -> (token, size_bytes)
+        self.small_bytes = self.main_bytes = self.ghost_bytes = 0
+        self.ghost_hits = 0
+        self._token = 0
+
+    @property
+    def small_capacity(self) -> float:
+        return self.capacity_bytes * SMALL_QUEUE_RATIO
+
+    @property
+    def main_capacity(self) -> float:
+        return self.capacity_bytes - self.small_capacity
+
+    def admit(self, file_id: Hashable, size_bytes: int) -> Tuple[int, int]:
+        if file_id in self.files:
+            self._hit(file_id)
+            return 0, 0
+        evicted = freed = 0
+        while self.files and self.used_bytes + size_bytes > self.capacity_bytes:
+            count, size = self._evict()
+            evicted += count
+            freed += size
+        self._token += 1
+        ghost = self.ghosts.pop(file_id, None)
+        if ghost is not None:
+            # Evicted from small too early: back straight into main
+            self.ghost_hits += 1
+            self.ghost_bytes -= ghost[1]
+            self.meta[file_id] = [self._token, True, 0]
+            self.main.append((file_id, self._token))
+            self.main_bytes += size_bytes
+        else:
+            self.meta[file_id] = [self._token, False, 0]
+            self.small.append((file_id, self._token))
+            self.small_bytes += size_bytes
+        self.files[file_id] = size_bytes
+        self.used_bytes += size_bytes
+        return evicted, freed
+
+    def _hit(self, file_id) -> None:
+        entry = self.meta[file_id]
+        if entry[2] < MAX_FREQ:
+            entry[2] += 1
+
+    def remove(self, file_id: Hashable) -> Optional[int]:
+        size = self.files.pop(file_id, None)
+        if size is not None:
+            self.used_bytes -= size
+            if self.meta.pop(file_id)[1]:
+                self.main_bytes -= size
+            else:
+                self.small_bytes -= size
+        return size
+
+    def victim(self):
+        # The head of the queue the next round starts with; a re-accessed small head may
+        # still move to main instead
+        queue = self.small if self.small_bytes >= self.small_capacity or not self.main_bytes else self.main
+        for file_id, token in queue:
+            if self._live(file_id, token):
+                return file_id
+        return None
+
+    def _live(self, file_id, token) -> bool:
+        entry = self.meta.get(file_id)
+        return entry is not None and entry[0] == token
+
+    def _evict(self) -> Tuple[int, int]:
+        """One eviction round: from small once it holds its share (or main is empty), else from main."""
+        if self.small_bytes >= self.small_capacity or not self.main_bytes:
+            count, size = self._evict_small()
+            if count:
+                return count, size
+        return self._evict_main()
+
+    def _evict_small(self) -> Tuple[int, int]:
+        """Move re-accessed files at the head of small to main until one leaves the cache into ghost."""
+        evicted = freed = 0
+        while self.small and not evicted:
+            file_id, token = self.small.popleft()
+            if not self._live(file_id, token):
+                continue
+            entry = self.meta[file_id]
+            size = self.files[file_id]
+            self.small_bytes -= size
+            if entry[2] > 0:
+                entry[1], entry[2] = True, 0
+                self.main.append((file_id, token))
+                self.main_bytes += size
+                while self.main_bytes > self.main_capacity and not evicted:
+                    evicted, freed = self._evict_main()
+            else:
+                self._drop(file_id, size)
+                self.ghosts[file_id] = (token, size)
+                self.ghost.append((file_id, token))
+                self.ghost_bytes += size
+                self._trim_ghost()
+                evicted, freed = 1, size
+        return evicted, freed
+
+    def _evict_main(self) -> Tuple[int, int]:
+        """CLOCK over main: reinsert files with a non-zero count (decremented), evict the first at zero."""
+        while self.main:
+            file_id, token = self.main.popleft()
+            if not self._live(file_id, token):
+                continue
+            entry = self.meta[file_id]
+            if entry[2] > 0:
+                entry[2] -= 1
+                self.main.append((file_id, token))
+                continue
+            size = self.files[file_id]
+            self.main_bytes -= size
+            self._drop(file_id, size)
+            return 1, size
+        return 0, 0
+
+    def _drop(self, file_id, size: int) -> None:
+        del self.files[file_id]
+        del self.meta[file_id]
+        self.used_bytes -= size
+
+    def _trim_ghost(self) -> None:
+        ghosts = self.ghosts
+        while self.ghost and self.ghost_bytes > self.main_capacity:
+            file_id, token = self.ghost.popleft()
+            ghost = ghosts.get(file_id)
+            if ghost is not None and ghost[0] == token:
+                del ghosts[file_id]
+                self.ghost_bytes -= ghost[1]
+        # Ghost hits leave stale entries; compact once they outnumber the live ones
+        if len(self.ghost) > 2 * len(ghosts) + 1024:
+            self.ghost = deque(entry for entry in self.ghost
+                               if entry[0] in ghosts and ghosts[entry[0]][0] == entry[1])
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update(small_bytes=self.small_bytes, main_bytes=self.main_bytes, ghost_hits=self.ghost_hits)
+        return stats
+
+
+EVICTION_ENGINES = {engine.name: engine
+                    for engine in (LRUEviction, FIFOEviction, LFUEviction, ARCEviction, S3FIFOEviction)}
+
+
+def make_eviction(policy: str, capacity_bytes: int) -> EvictionEngine:
+    """Empty engine of an EVICTION_POLICY name (case-insensitive)."""
+    engine = EVICTION_ENGINES.get(str(policy).upper())
+    if engine is None:
+        raise ValueError(f"Unknown EVICTION_POLICY '{policy}' (expected one of {', '.join(EVICTION_ENGINES)})")
+    return engine(capacity_bytes)
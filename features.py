@@ -11,6 +11,9 @@ State Vector (7 dimensions):
   5  last_tier_SSD     1 if last access was served from SSD
   6  last_tier_HDD     1 if last access was served from HDD
 
+With another storage hierarchy (settings.TIERS, see tiers.py) there is one last-tier
+column per tier, in hierarchy order: 4 + number of tiers dimensions.
+
 Trace format (from FILE_PATH):
   Space-separated: timestamp, operation(WS/RS), LBA, block_size, seq/rand, inter_arrival, service_time, idle_time
   Only used: operation, LBA, block_size, service_time
@@ -31,11 +34,32 @@ from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 
+import trace_cache
+import trace_parser
+from metrics import TIER_NAMES
+from trace_parser import CHUNK_LINES
+
 try:
     from settings import FILE_PATH
 except ImportError:
     FILE_PATH = 'converted_trace.txt'
 
+try:
+    from settings import TRACE_CACHE
+except ImportError:
+    TRACE_CACHE = False
+
+try:
+    from settings import FEATURE_NORMALIZATION, STREAMING_LOOKAHEAD
+except ImportError:
+    FEATURE_NORMALIZATION = 'prescan'
+    STREAMING_LOOKAHEAD = 1024
+
+try:
+    from settings import TRACE_PARSE_WORKERS
+except ImportError:
+    TRACE_PARSE_WORKERS = 1
+
 
 @dataclass
 class FeatureStats:
@@ -53,8 +77,18 @@ class FeatureStats:
             self.max_service = service
 
 
+@dataclass
+class StateBatch:
+    """A chunk of trace rows and their state vectors (the simulator's batch cursor)."""
+    records: np.ndarray   # trace_parser.TRACE_DTYPE rows
+    states: np.ndarray    # (N, 4 + tiers) float32, last-tier columns zero
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
 class FeatureExtractor:
-    """Extracts 7-dim RL state vectors from trace file.
+    """Extracts 7-dim (4 + tiers) RL state vectors from trace file.
     
     Usage:
         fe = FeatureExtractor(FILE_PATH)
@@ -63,72 +97,151 @@ class FeatureExtractor:
             # raw: dict with original trace values
             action = agent.act(state)
             fe.set_last_tier(raw['file_id'], tier_name)
+
+        # vectorized: 64K-row chunks, states normalized per chunk
+        for batch in fe.iter_batches():
+            for i in range(len(batch)):
+                action = agent.act(fe.state_at(batch, i))
+
+        # single pass, running maxima, works on pipes/stdin (file_path=None or '-')
+        fe = FeatureExtractor(None, streaming=True, lookahead=1024)
+
+        # last-tier columns for another hierarchy
+        fe = FeatureExtractor(FILE_PATH, tier_names=('NVME', 'QLC', 'HDD', 'OBJECT'))
     """
 
-    def __init__(self, file_path: str, pre_scan: bool = True) -> None:
+    def __init__(self, file_path: Optional[str], pre_scan: bool = True,
+                 use_cache: Optional[bool] = None, streaming: Optional[bool] = None,
+                 lookahead: Optional[int] = None, parse_workers: Optional[int] = None,
+                 tier_names: Tuple[str, ...] = TIER_NAMES) -> None:
         self.file_path = file_path
         self.stats = FeatureStats()
         self.last_tier: Dict[int, str] = {}
-        if pre_scan:
+        self.tier_names = tuple(tier_names)
+        self.tier_column = {name: 4 + i for i, name in enumerate(self.tier_names)}
+        # Streaming mode: single pass with running maxima (default: settings.FEATURE_NORMALIZATION).
+        # stdin cannot be scanned twice, so it is always streamed.
+        if streaming is None:
+            streaming = FEATURE_NORMALIZATION == 'streaming'
+        self.streaming = bool(streaming) or file_path in (None, '-')
+        self.lookahead = STREAMING_LOOKAHEAD if lookahead is None else max(int(lookahead), 0)
+        # Columnar cache: always used when file_path is a .tcache directory,
+        # built/reused next to a text trace when use_cache (default: settings.TRACE_CACHE)
+        if use_cache is None:
+            use_cache = TRACE_CACHE
+        self.cache: Optional[trace_cache.TraceCache] = None
+        if trace_cache.is_cache(file_path) or (use_cache and file_path not in (None, '-')):
+            self.cache = trace_cache.load_cache(file_path, build=use_cache)
+        # Parallel ingestion: whole file parsed up front by worker processes, which also
+        # return the column maxima (default: settings.TRACE_PARSE_WORKERS)
+        if parse_workers is None:
+            parse_workers = TRACE_PARSE_WORKERS
+        self.records: Optional[np.ndarray] = None
+        if self.cache is not None:
+            self._set_stats(self.cache.header['stats'])
+        elif parse_workers > 1 and not self.streaming and os.path.isfile(file_path):
+            self.records, column_stats = trace_parser.parse_file_parallel(file_path, parse_workers)
+            self._set_stats(column_stats)
+        elif pre_scan and not self.streaming:
             self._scan_file()
 
+    def iter_batches(self, chunk_lines: int = CHUNK_LINES) -> Iterator[StateBatch]:
+        """Stream StateBatch chunks: parsed rows plus their (N, 4 + tiers) state matrix.
+
+        Rows come from the columnar cache when available, otherwise from the text
+        trace via the vectorized chunk parser. Columns 0-3 are normalized for the whole
+        chunk at once; the last-tier columns are filled per row by state_at().
+        """
+        if self.cache is not None:
+            chunks = self.cache.iter_chunks(chunk_lines)
+        elif self.records is not None:
+            chunks = (self.records[i:i + chunk_lines] for i in range(0, len(self.records), chunk_lines))
+        else:
+            chunks = trace_parser.iter_trace(self.file_path, chunk_lines)
+        if self.streaming and self.cache is None and self.records is None:
+            yield from self._iter_streaming_batches(chunks)
+            return
+        for records in chunks:
+            states = self._build_states(records, self.stats.max_lba, self.stats.max_block,
+                                        self.stats.max_service, len(self.tier_names))
+            yield StateBatch(records, states)
+
+    def _iter_streaming_batches(self, chunks: Iterator[np.ndarray]) -> Iterator[StateBatch]:
+        """Streaming normalization with running maxima and a bounded lookahead.
+
+        Row i is normalized with the maxima of every row up to i + lookahead, so the
+        last `lookahead` rows of a chunk are held back until the next chunk arrives.
+        Time-to-first-batch is bounded by one chunk, not the trace length.
+        """
+        seen = np.zeros(3)            # maxima of rows already emitted
+        pending = np.empty(0, dtype=trace_parser.TRACE_DTYPE)
+        for records in chunks:
+            buf = np.concatenate((pending, records)) if len(pending) else records
+            ready = len(buf) - self.lookahead
+            if ready <= 0:
+                pending = buf
+                continue
+            seen = yield from self._emit_streaming(buf, ready, seen)
+            pending = buf[ready:]
+        if len(pending):
+            yield from self._emit_streaming(pending, len(pending), seen)
+
+    def _emit_streaming(self, buf: np.ndarray, ready: int, seen: np.ndarray):
+        cols = (buf['lba'], buf['block_size'], buf['service'])
+        prefix = [np.maximum(np.maximum.accumulate(c.astype(np.float64)), m)
+                  for c, m in zip(cols, seen)]
+        ahead = np.minimum(np.arange(ready) + self.lookahead, len(buf) - 1)
+        self.stats.update(prefix[0][-1], prefix[1][-1], prefix[2][-1])
+        records = buf[:ready]
+        states = self._build_states(records, prefix[0][ahead], prefix[1][ahead], prefix[2][ahead],
+                                    len(self.tier_names))
+        yield StateBatch(records, states)
+        return np.array([p[ready - 1] for p in prefix])
+
+    def state_at(self, batch: StateBatch, i: int) -> np.ndarray:
+        """State vector of row i, with last-tier one-hot from set_last_tier()."""
+        state = batch.states[i]
+        if self.last_tier:
+            last = self.last_tier.get(int(batch.records['lba'][i]))
+            if last is not None:
+                state = state.copy()
+                state[self.tier_column[last]] = 1.0
+        return state
+
     def iter_states(self) -> Iterator[Tuple[np.ndarray, Dict]]:
         """Stream (state_vector, raw_dict) pairs from trace file.
         
         Reads space-separated raw trace format:
         timestamp, operation(WS/RS), LBA, block_size, seq/rand, inter_arrival, service_time, idle_time
+
+        Per-row convenience wrapper over iter_batches().
         """
-        with open(self.file_path, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                # Parse space-separated format (raw trace data)
-                parts = line.split()
-                if len(parts) < 8:
-                    continue
-                
-                try:
-                    timestamp = float(parts[0])
-                    op_raw = parts[1].lower()      # WS or RS
-                    lba = float(parts[2])
-                    block_size = float(parts[3])
-                    seq_rand = parts[4].lower()    # 'seq' or 'rand', not used
-                    inter = float(parts[5])         # inter_arrival not used for reward
-                    service = float(parts[6])       # service_time only used for reward
-                    idle = float(parts[7])          # idle_time not used
-                except (ValueError, IndexError):
-                    continue
-                
-                # Map operation codes: WS/write=write, RS/read=read
-                is_read = 1.0 if op_raw in ('read', 'r', 'rs', 'rr') else 0.0
-                file_id = int(lba)
-                
-                state_vec = self._build_state(is_read, lba, block_size, service, file_id)
+        for batch in self.iter_batches():
+            rec = batch.records
+            rows = zip(rec['is_read'].tolist(), rec['lba'].tolist(), rec['block_size'].tolist(),
+                       rec['inter_arrival'].tolist(), rec['service'].tolist(), rec['idle'].tolist())
+            for i, (is_read, lba, block_size, inter, service, idle) in enumerate(rows):
                 raw = {
-                    'is_read': is_read,
-                    'lba': lba,
-                    'block_size': block_size,
+                    'is_read': float(is_read),
+                    'lba': float(lba),
+                    'block_size': float(block_size),
                     'inter': inter,
                     'service': service,
                     'idle': idle,
-                    'file_id': file_id,
+                    'file_id': int(lba),
                 }
-                yield state_vec, raw
+                yield self.state_at(batch, i).copy(), raw
 
     def build_state_matrix(self) -> np.ndarray:
-        """Materialize all states into (N, 7) array."""
-        states = []
-        for s, _ in self.iter_states():
-            states.append(s)
+        """Materialize all states into (N, 4 + tiers) array."""
+        states = [batch.states for batch in self.iter_batches()]
         if states:
             return np.vstack(states)
-        return np.empty((0, 7), dtype=np.float32)
+        return np.empty((0, 4 + len(self.tier_names)), dtype=np.float32)
 
     def set_last_tier(self, file_id: int, tier: str) -> None:
         """Update last tier for a file (call after placement decision)."""
-        if tier in {'RAM', 'SSD', 'HDD'}:
+        if tier in self.tier_column:
             self.last_tier[file_id] = tier
 
     def _scan_file(self) -> None:
@@ -136,26 +249,9 @@ class FeatureExtractor:
         if not os.path.exists(self.file_path):
             return
         
-        with open(self.file_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                parts = line.split()
-                if len(parts) < 8:
-                    continue
-                
-                try:
-                    # Space-separated format:
-                    # timestamp(0), op(1), lba(2), block_size(3), seq/rand(4), inter(5), service(6), idle(7)
-                    lba = float(parts[2])
-                    block_size = float(parts[3])
-                    service = float(parts[6])
-                except (ValueError, IndexError):
-                    continue
-                
-                self.stats.update(lba, block_size, service)
+        for records in trace_parser.iter_trace(self.file_path):
+            self.stats.update(float(records['lba'].max()), float(records['block_size'].max()),
+                              float(records['service'].max()))
         
         # Ensure no division by zero
         if self.stats.max_lba <= 0:
@@ -165,6 +261,35 @@ class FeatureExtractor:
         if self.stats.max_service <= 0:
             self.stats.max_service = 1.0
 
+    def _set_stats(self, column_stats: Dict) -> None:
+        """Take normalization maxima from precomputed column stats instead of scanning.
+
+        column_stats: trace_parser.column_stats() layout, as stored in the cache header.
+        """
+        def col_max(name: str) -> float:
+            v = column_stats[name]['max']
+            return max(float(v), 0.0) if v is not None else 0.0
+        self.stats.max_lba = col_max('lba') or 1.0
+        self.stats.max_block = col_max('block_size') or 1.0
+        self.stats.max_service = col_max('service') or 1.0
+
+    @staticmethod
+    def _build_states(records: np.ndarray, max_lba, max_block, max_service, n_tiers: int = 3) -> np.ndarray:
+        """Vectorized _build_state for a chunk; maxima may be scalars or per-row arrays.
+
+        Last-tier columns are left at 0 (see state_at).
+        """
+        max_lba = np.where(max_lba > 0, max_lba, 1.0)
+        max_block = np.where(max_block > 0, max_block, 1.0)
+        max_service = np.where(max_service > 0, max_service, 1.0)
+        service = records['service']
+        states = np.zeros((len(records), 4 + n_tiers), dtype=np.float32)
+        states[:, 0] = records['is_read']
+        states[:, 1] = np.clip(records['lba'] / max_lba, 0.0, 1.0)
+        states[:, 2] = np.clip(records['block_size'] / max_block, 0.0, 1.0)
+        states[:, 3] = np.where(service > 0, np.log1p(np.maximum(service, 0.0)) / np.log1p(max_service), 0.0)
+        return states
+
     def _norm_linear(self, value: float, max_v: float) -> float:
         """Linear normalization to [0, 1]."""
         return min(max(value / max_v, 0.0), 1.0)
@@ -177,24 +302,21 @@ class FeatureExtractor:
 
     def _build_state(self, is_read: float, lba: float, block_size: float,
                      service: float, file_id: int) -> np.ndarray:
-        """Build 7-dim state vector."""
-        lba_bin = self._norm_linear(lba, self.stats.max_lba)
-        block_bin = self._norm_linear(block_size, self.stats.max_block)
-        service_bin = self._norm_log(service, self.stats.max_service)
+        """Build 7-dim (4 + tiers) state vector."""
+        # Running maxima (streaming mode) may still be 0 for the first rows
+        lba_bin = self._norm_linear(lba, self.stats.max_lba or 1.0)
+        block_bin = self._norm_linear(block_size, self.stats.max_block or 1.0)
+        service_bin = self._norm_log(service, self.stats.max_service or 1.0)
         
         last = self.last_tier.get(file_id)
-        last_ram = 1.0 if last == 'RAM' else 0.0
-        last_ssd = 1.0 if last == 'SSD' else 0.0
-        last_hdd = 1.0 if last == 'HDD' else 0.0
+        last_tiers = [1.0 if last == name else 0.0 for name in self.tier_names]
         
         state = np.array([
             is_read,
             lba_bin,
             block_bin,
             service_bin,
-            last_ram,
-            last_ssd,
-            last_hdd
+            *last_tiers
         ], dtype=np.float32)
         return state
 
@@ -205,9 +327,9 @@ def reward_from_latency(latency_s: float) -> float:
     return min(max(r, 0.0), 10.0)
 
 
-def create_feature_extractor() -> FeatureExtractor:
-    """Factory to create extractor from settings.FILE_PATH."""
-    return FeatureExtractor(FILE_PATH)
+def create_feature_extractor(file_path: Optional[str] = None) -> FeatureExtractor:
+    """Factory to create extractor from file_path (default: settings.FILE_PATH)."""
+    return FeatureExtractor(file_path if file_path is not None else FILE_PATH)
 
 
 # ============================================================================
@@ -217,6 +339,11 @@ def create_feature_extractor() -> FeatureExtractor:
 ACTION_TO_TIER = {0: "RAM", 1: "SSD", 2: "HDD"}
 TIER_TO_ACTION = {v: k for k, v in ACTION_TO_TIER.items()}
 
+
+def action_to_tier(tier_names: Tuple[str, ...] = TIER_NAMES) -> Dict[int, str]:
+    """RL action -> tier name for a hierarchy (ACTION_TO_TIER for RAM / SSD / HDD)."""
+    return dict(enumerate(tier_names))
+
 _global_extractor: Optional[FeatureExtractor] = None
 
 def _get_global_extractor() -> FeatureExtractor:
@@ -229,17 +356,23 @@ def _get_global_extractor() -> FeatureExtractor:
 
 def make_state(is_read: bool, size_kb: float, is_seq: bool, inter_arrival_s: float,
                access_freq: int, ssd_used: int, ssd_cap: int, ram_used: int,
-               ram_cap: int, last_tier: str) -> np.ndarray:
+               ram_cap: int, last_tier: str,
+               fe: Optional[FeatureExtractor] = None,
+               tier_names: Optional[Tuple[str, ...]] = None) -> np.ndarray:
     """Backward-compat wrapper: old signature -> new 7-dim state.
     
     Returns state with indices:
       [is_read, lba_bin, block_bin, service_bin, last_tier_RAM, last_tier_SSD, last_tier_HDD]
+
+    fe: extractor whose normalization stats to use (default: lazily built global one)
+    tier_names: hierarchy of the last-tier columns (default: fe's)
     """
-    fe = _get_global_extractor()
+    if fe is None:
+        fe = _get_global_extractor()
+    if tier_names is None:
+        tier_names = fe.tier_names
     
-    last_ram = 1.0 if last_tier == 'RAM' else 0.0
-    last_ssd = 1.0 if last_tier == 'SSD' else 0.0
-    last_hdd = 1.0 if last_tier == 'HDD' else 0.0
+    last_tiers = [1.0 if last_tier == name else 0.0 for name in tier_names]
     
     size_bin = fe._norm_linear(size_kb, fe.stats.max_block) if fe.stats.max_block > 0 else 0.0
     lba_bin = fe._norm_linear(float(ssd_used), fe.stats.max_lba) if fe.stats.max_lba > 0 else 0.0
@@ -250,9 +383,7 @@ def make_state(is_read: bool, size_kb: float, is_seq: bool, inter_arrival_s: flo
         lba_bin,
         size_bin,
         service_bin,
-        last_ram,
-        last_ssd,
-        last_hdd
+        *last_tiers
     ], dtype=np.float32)
     return state
 
@@ -0,0 +1,250 @@
+"""hdd_model.py
+
+Mechanical HDD model (HDD_MODEL = 'mechanical'), used by Trace instead of the flat
+size / transfer-rate service time of the HDD tier.
+
+The tier is NUMBER_HDD drives, each with one head and its own request queue; requests
+are placed on the drives (split across stripe units) by DEVICE_LAYOUT (devices.py).
+A request's service time on its drive is
+
+  positioning + size / transfer rate
+
+where positioning is zero for a sequential request and otherwise
+
+  seek(d)      HDD_SEEK_MIN_MS + (HDD_SEEK_MAX_MS - HDD_SEEK_MIN_MS) * sqrt(d / disk_tracks)
+               for a head movement of d tracks of HDD_SECTORS_PER_TRACK sectors (0 on
+               the same track); over random distances the mean is about
+               min + 0.53 * (max - min)
+  rotation     time until the target sector passes under the head after the seek: the
+               platter angle is (time mod revolution) and the sector's angle is
+               (offset mod HDD_SECTORS_PER_TRACK) / HDD_SECTORS_PER_TRACK, so the
+               latency averages half a revolution (4.2 ms at 7200 RPM) and is
+               deterministic
+
+A request is sequential if the trace marks it 'seq' or if the stream detector sees it
+continue one of the drive's HDD_SEQ_STREAMS most recent streams, i.e. it starts at
+most HDD_SEQ_WINDOW sectors past the end of one.
+
+Each drive serves one request at a time. Waiting requests are taken in arrival order
+(HDD_SCHEDULER = 'fifo') or by the elevator ('elevator', C-LOOK): the nearest LBA at
+or past the head, sweeping upwards and wrapping to the lowest waiting LBA. Sweeping in
+one direction only keeps requests on the same track in rotational order (a downward
+sweep would wait almost a full revolution for each) and bounds the wait of requests
+just behind the head. The queue is kept sorted by LBA, so picking is a binary search.
+
+    hdd = HDDArray(env, config)
+    arrived, started, finished = yield from layout.route(env, hdd.serve, lba, size_bytes, is_read, is_seq)
+"""
+
+from __future__ import annotations
+
+import math
+import zlib
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from typing import Dict, List, Tuple
+
+try:
+    from settings import (HDD_SCHEDULER, HDD_RPM, HDD_SEEK_MIN_MS, HDD_SEEK_MAX_MS, HDD_SECTORS_PER_TRACK,
+                          HDD_CAPACITY_BYTES, HDD_SEQ_STREAMS, HDD_SEQ_WINDOW)
+except ImportError:
+    HDD_SCHEDULER = 'fifo'
+    HDD_RPM = 7200
+    HDD_SEEK_MIN_MS = 0.6
+    HDD_SEEK_MAX_MS = 15.0
+    HDD_SECTORS_PER_TRACK = 1000
+    HDD_CAPACITY_BYTES = 4 * 1024 ** 4
+    HDD_SEQ_STREAMS = 4
+    HDD_SEQ_WINDOW = 128
+
+SECTOR_BYTES = 512
+SECOND_TO_NANOSECOND = 1000 * 1000 * 1000
+MILLISECOND_TO_NANOSECOND = 1000 * 1000
+
+HDD_MODELS = ('flat', 'mechanical')
+SCHEDULERS = ('fifo', 'elevator')
+
+
+def lba_of(file_id) -> int:
+    """LBA of a request id: the id itself when numeric (MSRC traces), else a stable hash."""
+    try:
+        return int(file_id)
+    except (TypeError, ValueError):
+        return zlib.crc32(str(file_id).encode())
+
+
+class HDDRequest:
+    __slots__ = ('offset', 'sectors', 'size', 'is_read', 'is_seq', 'arrived', 'started', 'done')
+
+    def __init__(self, offset: int, sectors: int, size: float, is_read: bool, is_seq: bool,
+                 arrived: float, done) -> None:
+        self.offset = offset
+        self.sectors = sectors
+        self.size = size
+        self.is_read = is_read
+        self.is_seq = is_seq
+        self.arrived = arrived
+        self.started = arrived
+        self.done = done
+
+
+class HDDDevice:
+    """Head position, stream table and queue of one drive."""
+
+    def __init__(self, elevator: bool = False) -> None:
+        self.head = 0              # sector offset under the head after the last request
+        self.streams: OrderedDict = OrderedDict()   # stream end offset -> None, oldest first
+        # FIFO: deque of requests; elevator: list of (offset, arrival number, request) sorted by LBA
+        self.pending = [] if elevator else deque()
+        self.arrivals = 0
+        self.busy = False
+        self.served = 0
+        self.seq_served = 0
+        self.busy_ns = 0.0
+
+    # Checkpoints are taken with no request in flight; only the mechanical state is kept
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pending'] = type(self.pending)()
+        state['busy'] = False
+        return state
+
+
+class HDDArray:
+    """NUMBER_HDD drives with per-drive queues; drives are created on first access."""
+
+    def __init__(self, env, config, n_devices: int = None, read_rate: float = None, write_rate: float = None) -> None:
+        # n_devices and the rates (bytes/s) of another tier than the HDD one (tiers.py)
+        self.env = env
+        self.n_devices = max(int(config.NUMBER_HDD if n_devices is None else n_devices), 1)
+        self.scheduler = getattr(config, 'HDD_SCHEDULER', HDD_SCHEDULER)
+        if self.scheduler not in SCHEDULERS:
+            raise ValueError(f"Unknown HDD_SCHEDULER '{self.scheduler}' (expected one of {', '.join(SCHEDULERS)})")
+        self.disk_sectors = max(int(getattr(config, 'HDD_CAPACITY_BYTES', HDD_CAPACITY_BYTES)) // SECTOR_BYTES, 1)
+        self.revolution_ns = 60 * SECOND_TO_NANOSECOND / float(getattr(config, 'HDD_RPM', HDD_RPM))
+        self.sectors_per_track = max(int(getattr(config, 'HDD_SECTORS_PER_TRACK', HDD_SECTORS_PER_TRACK)), 1)
+        self.disk_tracks = max(self.disk_sectors // self.sectors_per_track, 1)
+        self.seek_min_ns = getattr(config, 'HDD_SEEK_MIN_MS', HDD_SEEK_MIN_MS) * MILLISECOND_TO_NANOSECOND
+        self.seek_max_ns = getattr(config, 'HDD_SEEK_MAX_MS', HDD_SEEK_MAX_MS) * MILLISECOND_TO_NANOSECOND
+        self.seq_streams = max(int(getattr(config, 'HDD_SEQ_STREAMS', HDD_SEQ_STREAMS)), 1)
+        self.seq_window = int(getattr(config, 'HDD_SEQ_WINDOW', HDD_SEQ_WINDOW))
+        mb_to_byte = 1024 * 1024
+        self.read_rate = config.READ_DATA_TRANSFER_RATE_HDD * mb_to_byte if read_rate is None else read_rate
+        self.write_rate = config.WRITE_DATA_TRANSFER_RATE_HDD * mb_to_byte if write_rate is None else write_rate
+        self.devices: Dict[int, HDDDevice] = {}
+
+    # ------------------------------------------------------------------
+    # Queue state (sampler)
+    # ------------------------------------------------------------------
+
+    @property
+    def queued(self) -> int:
+        return sum(len(d.pending) for d in self.devices.values())
+
+    @property
+    def busy(self) -> int:
+        return sum(1 for d in self.devices.values() if d.busy)
+
+    def stats(self) -> Dict:
+        served = sum(d.served for d in self.devices.values())
+        seq = sum(d.seq_served for d in self.devices.values())
+        return {'devices_used': len(self.devices), 'served': served, 'sequential': seq,
+                'sequential_ratio': seq / served if served else 0.0}
+
+    def device_state(self) -> Dict[int, HDDDevice]:
+        return self.devices
+
+    def restore_devices(self, devices: Dict[int, HDDDevice]) -> None:
+        self.devices = devices
+
+    def device_load(self) -> Dict[int, Tuple[int, float]]:
+        return {index: (d.served, d.busy_ns) for index, d in self.devices.items()}
+
+    # ------------------------------------------------------------------
+    # Service time
+    # ------------------------------------------------------------------
+
+    def seek_ns(self, tracks: int) -> float:
+        """Seek time over a head movement of ``tracks`` tracks."""
+        if tracks == 0:
+            return 0.0
+        return self.seek_min_ns + (self.seek_max_ns - self.seek_min_ns) * math.sqrt(min(tracks / self.disk_tracks, 1.0))
+
+    def rotation_ns(self, at: float, offset: int) -> float:
+        """Wait at time ``at`` (ns) until sector ``offset`` reaches the head."""
+        rev = self.revolution_ns
+        platter = (at % rev) / rev
+        sector = (offset % self.sectors_per_track) / self.sectors_per_track
+        return ((sector - platter) % 1.0) * rev
+
+    def _stream_end(self, dev: HDDDevice, offset: int):
+        """Stream detector: end of the recent stream of ``dev`` that ``offset`` continues, or None."""
+        window = self.seq_window
+        for end in dev.streams:
+            if 0 <= offset - end <= window:
+                return end
+        return None
+
+    def service_ns(self, dev: HDDDevice, req: HDDRequest, now: float) -> Tuple[float, bool]:
+        """Service time of ``req`` starting at ``now`` and whether it was sequential."""
+        stream = self._stream_end(dev, req.offset)
+        if stream is not None:
+            del dev.streams[stream]
+        transfer = req.size / float(self.read_rate if req.is_read else self.write_rate) * SECOND_TO_NANOSECOND
+        if req.is_seq or stream is not None:
+            return transfer, True
+        spt = self.sectors_per_track
+        seek = self.seek_ns(abs(req.offset // spt - dev.head // spt))
+        return seek + self.rotation_ns(now + seek, req.offset) + transfer, False
+
+    # ------------------------------------------------------------------
+    # Queueing
+    # ------------------------------------------------------------------
+
+    def _next(self, dev: HDDDevice) -> HDDRequest:
+        pending = dev.pending
+        if self.scheduler == 'fifo':
+            return pending.popleft()
+        # C-LOOK: nearest request at or past the head, wrapping to the lowest LBA
+        i = bisect_left(pending, (dev.head,))
+        if i == len(pending):
+            i = 0
+        return pending.pop(i)[2]
+
+    def _serve(self, dev: HDDDevice):
+        env = self.env
+        while dev.pending:
+            req = self._next(dev)
+            req.started = env.now
+            service, sequential = self.service_ns(dev, req, env.now)
+            yield env.timeout(int(service))
+            dev.head = end = req.offset + req.sectors
+            dev.streams[end] = None
+            if len(dev.streams) > self.seq_streams:
+                dev.streams.popitem(last=False)
+            dev.served += 1
+            dev.seq_served += sequential
+            dev.busy_ns += int(service)
+            req.done.succeed()
+        dev.busy = False
+
+    def serve(self, device: int, offset: int, size_bytes: float, is_read: bool, is_seq: bool = False,
+              fullness: float = 0.0):
+        """Queue one request on drive ``device`` at sector ``offset``; a generator returning
+        (arrived, started, finished)."""
+        env = self.env
+        dev = self.devices.get(device)
+        if dev is None:
+            dev = self.devices[device] = HDDDevice(elevator=self.scheduler == 'elevator')
+        sectors = max(int(math.ceil(size_bytes / SECTOR_BYTES)), 1)
+        req = HDDRequest(offset % self.disk_sectors, sectors, size_bytes, is_read, is_seq, env.now, env.event())
+        if self.scheduler == 'fifo':
+            dev.pending.append(req)
+        else:
+            dev.arrivals += 1
+            insort(dev.pending, (req.offset, dev.arrivals, req))
+        if not dev.busy:
+            dev.busy = True
+            env.process(self._serve(dev))
+        yield req.done
+        return req.arrived, req.started, env.now
@@ -0,0 +1,188 @@
+"""metrics.py
+
+Per-run simulation counters.
+
+Each Trace owns one SimulationMetrics, so several simulations can run in the same
+process (threads, sweeps) without sharing state. Counters are per-tier lists indexed
+by the tier constants below:
+
+    m = SimulationMetrics()
+    m.reads[SSD] += 1
+    m.served_time[SSD] += served_time_ns
+
+Latency distributions are kept in LatencyHistogram objects, one per tier and op type
+for the total latency, the queue wait and the service time:
+
+    m.observe(SSD, is_read, size_bytes, arrived_ns, started_ns, finished_ns)
+    m.latency[SSD][READ].percentile(99.9)
+"""
+
+from __future__ import annotations
+
+from math import frexp, ldexp
+from typing import Dict, Sequence
+
+import numpy as np
+
+TIER_NAMES = ('RAM', 'SSD', 'HDD')
+RAM, SSD, HDD = 0, 1, 2
+
+OP_NAMES = ('read', 'write')
+READ, WRITE = 0, 1
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+# Log-bucketed histogram layout: values below SUB_BUCKETS are counted exactly, every
+# power of two above is split into SUB_BUCKETS linear buckets (<= 1/64 = 1.6% relative
+# error). Values from 2**64 ns (about 585 years) on share the last bucket.
+SUB_BUCKETS = 64
+_SUB_BITS = 6
+_MAX_EXPONENT = 64
+N_BUCKETS = (_MAX_EXPONENT - _SUB_BITS + 1) * SUB_BUCKETS
+
+
+def bucket_index(value: float) -> int:
+    """Histogram bucket of a non-negative value."""
+    if value < SUB_BUCKETS:
+        return int(value) if value > 0 else 0
+    m, e = frexp(value)
+    i = (e - _SUB_BITS) * SUB_BUCKETS + int((m * 2 - 1) * SUB_BUCKETS)
+    return i if i < N_BUCKETS else N_BUCKETS - 1
+
+
+def bucket_upper(index: int) -> float:
+    """Highest value that falls into bucket ``index`` (the exact value below SUB_BUCKETS)."""
+    if index < SUB_BUCKETS:
+        return float(index)
+    e, sub = divmod(index, SUB_BUCKETS)
+    return ldexp(1 + (sub + 1) / SUB_BUCKETS, e + _SUB_BITS - 1)
+
+
+class LatencyHistogram:
+    """HDR-style histogram: O(1) time and fixed memory per recorded value."""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self) -> None:
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value < self.min:
+            self.min = value
+
+    def record_many(self, values: np.ndarray) -> None:
+        """Vectorized record() of a whole array."""
+        v = np.asarray(values, dtype=np.float64)
+        if not len(v):
+            return
+        idx = np.empty(len(v), dtype=np.int64)
+        small = v < SUB_BUCKETS
+        idx[small] = np.maximum(v[small], 0).astype(np.int64)
+        m, e = np.frexp(v[~small])
+        idx[~small] = (e - _SUB_BITS) * SUB_BUCKETS + ((m * 2 - 1) * SUB_BUCKETS).astype(np.int64)
+        np.minimum(idx, N_BUCKETS - 1, out=idx)
+        self.counts = (np.asarray(self.counts) + np.bincount(idx, minlength=N_BUCKETS)).tolist()
+        self.count += len(v)
+        self.total += float(v.sum())
+        self.max = max(self.max, float(v.max()))
+        self.min = min(self.min, float(v.min()))
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.min = min(self.min, other.min)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Value at percentile ``p`` (0-100), reported as its bucket's upper bound."""
+        if not self.count:
+            return 0.0
+        rank = max(int(-(-p * self.count // 100)), 1)   # ceil(p% of count)
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(bucket_upper(i), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        """count, mean, p50/p90/p99/p99.9 and max."""
+        out = {'count': self.count, 'mean': self.mean()}
+        for p in PERCENTILES:
+            out[f'p{p:g}'] = self.percentile(p)
+        out['max'] = self.max
+        return out
+
+
+class SimulationMetrics:
+    """Read/write counts, bytes and accumulated served time (ns) per tier."""
+
+    __slots__ = ('tier_names', 'tier_index', 'reads', 'writes', 'served_time', 'bytes',
+                 'latency', 'wait', 'service')
+
+    def __init__(self, tier_names: Sequence[str] = TIER_NAMES) -> None:
+        self.tier_names = tuple(tier_names)
+        self.tier_index = {name: i for i, name in enumerate(self.tier_names)}
+        n = len(self.tier_names)
+        self.reads = [0] * n
+        self.writes = [0] * n
+        self.served_time = [0] * n
+        self.bytes = [0] * n
+        # [tier][READ/WRITE] histograms: arrival->finish, arrival->start, start->finish
+        self.latency = [[LatencyHistogram() for _ in OP_NAMES] for _ in range(n)]
+        self.wait = [[LatencyHistogram() for _ in OP_NAMES] for _ in range(n)]
+        self.service = [[LatencyHistogram() for _ in OP_NAMES] for _ in range(n)]
+
+    def observe(self, tier: int, is_read: bool, size: float, arrived: float, started: float,
+                finished: float) -> None:
+        """Record one request's size and its latency split into queue wait and service time."""
+        self.bytes[tier] += size
+        op = READ if is_read else WRITE
+        self.latency[tier][op].record(finished - arrived)
+        self.wait[tier][op].record(started - arrived)
+        self.service[tier][op].record(finished - started)
+
+    def latency_summary(self) -> Dict:
+        """{tier: {op: {'latency': .., 'wait': .., 'service': ..}}} histogram summaries (ns),
+        for the tier/op pairs that saw requests."""
+        out = {}
+        for i, name in enumerate(self.tier_names):
+            for op, op_name in enumerate(OP_NAMES):
+                if self.latency[i][op].count:
+                    out.setdefault(name, {})[op_name] = {
+                        'latency': self.latency[i][op].summary(),
+                        'wait': self.wait[i][op].summary(),
+                        'service': self.service[i][op].summary(),
+                    }
+        return out
+
+    def operations(self, tier: int) -> int:
+        return self.reads[tier] + self.writes[tier]
+
+    def total_operations(self) -> int:
+        return sum(self.reads) + sum(self.writes)
+
+    def as_dict(self) -> Dict:
+        """Flat counters, e.g. {'reads_ssd': .., 'writes_ssd': .., 'ssd_served_time': ..}."""
+        out = {}
+        for i, name in enumerate(self.tier_names):
+            key = name.lower()
+            out['reads_' + key] = self.reads[i]
+            out['writes_' + key] = self.writes[i]
+            out[key + '_served_time'] = self.served_time[i]
+            out['bytes_' + key] = self.bytes[i]
+        out['total_operations'] = self.total_operations()
+        return out
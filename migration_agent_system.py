@@ -41,13 +41,19 @@ Integration with Trace.py:
     trace.agent_system.shutdown()
 """
 
+import logging
 import threading
 import time
 from collections import defaultdict, deque
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from heapq import heapify, heappop, heappush
+from typing import Dict, List, Optional, Sequence, Tuple
 import numpy as np
 
+from request_log import get_logger
+
+logger = get_logger('migration')
+
 
 @dataclass
 class MigrationCandidate:
@@ -64,6 +70,10 @@ class LBAHotnessTracker:
     Tracks hotness of LBAs (Logical Block Addresses) for migration decisions.
     LBA-level granularity instead of page-level.
     Hotness = access frequency
+
+    Hot LBAs are also kept in one max-heap per tier on (access count, first access),
+    updated on every access, so the hottest migration candidates are found without
+    scanning every tracked LBA. Outdated entries are skipped and compacted away.
     """
     
     HOTNESS_THRESHOLD_HOT = 5      # Classify as hot (access >= 5)
@@ -72,8 +82,26 @@ class LBAHotnessTracker:
     def __init__(self):
         self.lbas: Dict[int, Dict] = {}  # LBA -> access info
         self.lba_migrations: Dict[int, int] = {}  # LBA -> migration count
+        self.hot: Dict[str, List] = defaultdict(list)  # tier -> heap of (-access_count, seq, LBA)
+        self.hot_lbas = 0
         self.lock = threading.Lock()
-    
+
+    # Checkpoints (checkpoint.py): locks are not picklable, a fresh one is made on load
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        if 'hot' not in state:
+            # Checkpoints from before the hot heaps: rebuild them in first-access order
+            for seq, info in enumerate(self.lbas.values()):
+                info['seq'] = seq
+            self.hot = defaultdict(list)
+            self._compact_hot()
+
     def track_access(self, lba: int, current_time: float, 
                     tier: str, latency_ns: float, size_bytes: int) -> None:
         """Track LBA access for hotness calculation"""
@@ -86,7 +114,8 @@ class LBAHotnessTracker:
                     'first_access': current_time,
                     'last_access': current_time,
                     'size_bytes': size_bytes,
-                    'access_times': deque(maxlen=100)
+                    'access_times': deque(maxlen=100),
+                    'seq': len(self.lbas)
                 }
                 self.lba_migrations[lba] = 0
             
@@ -96,6 +125,56 @@ class LBAHotnessTracker:
             lba_info['total_latency'] += latency_ns
             lba_info['last_access'] = current_time
             lba_info['access_times'].append(current_time)
+
+            count = lba_info['access_count']
+            if count >= self.HOTNESS_THRESHOLD_HOT:
+                if count == self.HOTNESS_THRESHOLD_HOT:
+                    self.hot_lbas += 1
+                heappush(self.hot[tier], (-count, lba_info['seq'], lba))
+                # Every access of a hot LBA outdates its previous entry
+                if sum(len(heap) for heap in self.hot.values()) > 2 * self.hot_lbas + 1024:
+                    self._compact_hot()
+
+    def _current(self, entry, tier: str) -> bool:
+        neg_count, _, lba = entry
+        info = self.lbas[lba]
+        return info['access_count'] == -neg_count and info['tier'] == tier
+
+    def _compact_hot(self) -> None:
+        """Rebuild the hot heaps with one entry per hot LBA (caller holds the lock)."""
+        hot = defaultdict(list)
+        for lba, info in self.lbas.items():
+            if info['access_count'] >= self.HOTNESS_THRESHOLD_HOT:
+                hot[info['tier']].append((-info['access_count'], info['seq'], lba))
+        for heap in hot.values():
+            heapify(heap)
+        self.hot = hot
+        self.hot_lbas = sum(len(heap) for heap in hot.values())
+
+    def hot_tiers(self) -> List[str]:
+        """Tiers that hold at least one hot LBA."""
+        with self.lock:
+            return [tier for tier, heap in self.hot.items() if heap]
+
+    def hottest(self, tiers: Sequence[str], n: int) -> List[Tuple[int, str, int]]:
+        """
+        The n hottest LBAs currently on any of tiers, as (LBA, tier, access count),
+        by access count and then first access.
+        """
+        found = []
+        with self.lock:
+            for tier in tiers:
+                heap = self.hot.get(tier)
+                popped = []
+                while heap and len(popped) < n:
+                    entry = heappop(heap)
+                    if self._current(entry, tier):
+                        popped.append(entry)
+                for entry in popped:
+                    heappush(heap, entry)
+                found.extend((entry, tier) for entry in popped)
+        found.sort()
+        return [(lba, tier, -neg_count) for (neg_count, _, lba), tier in found[:n]]
     
     def get_hotness_score(self, lba: int, current_time: float) -> float:
         """
@@ -163,7 +242,17 @@ class MigrationQueue:
     def __init__(self):
         self.queue = deque(maxlen=self.MAX_SIZE)
         self.lock = threading.Lock()
-    
+
+    # Checkpoints (checkpoint.py): locks are not picklable, a fresh one is made on load
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
     def enqueue(self, candidate: MigrationCandidate) -> bool:
         with self.lock:
             if len(self.queue) < self.MAX_SIZE:
@@ -200,6 +289,18 @@ class MigrationExecutor:
         self.thread = None
         self.migrations_completed = 0
         self.lock = threading.Lock()
+
+    # Checkpoints: the thread is not saved; a loaded executor is stopped until start()
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        state['thread'] = None
+        state['is_running'] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
     
     def start(self) -> None:
         if not self.is_running:
@@ -259,7 +360,8 @@ class MigrationAgentSystem:
     REWARD_WINDOW_SIZE = 50            # Use N requests for reward calculation
     
     def __init__(self, ssd_capacity_bytes: int, ram_capacity_bytes: int,
-                 env=None, placement_agent=None):
+                 env=None, placement_agent=None,
+                 hierarchy: Optional[Sequence[Tuple[str, Optional[int]]]] = None):
         """
         Initialize the unified agent system.
         
@@ -268,9 +370,13 @@ class MigrationAgentSystem:
             ram_capacity_bytes: RAM capacity
             env: SimPy environment (for timing)
             placement_agent: Existing RL placement agent (optional)
+            hierarchy: (tier name, capacity bytes or None) fastest first (tiers.py);
+                default RAM / SSD / HDD with the capacities above
         """
-        self.ssd_capacity = ssd_capacity_bytes
-        self.ram_capacity = ram_capacity_bytes
+        if hierarchy is None:
+            hierarchy = (('RAM', ram_capacity_bytes), ('SSD', ssd_capacity_bytes), ('HDD', None))
+        self.device_hierarchy = [name for name, _ in hierarchy]
+        self.tier_capacity = dict(hierarchy)
         self.env = env
         
         # Initialize components (placement_agent not used - Trace.py handles placement)
@@ -294,6 +400,18 @@ class MigrationAgentSystem:
         
         # Start migration executor
         self.migration_executor.start()
+
+    # Checkpoints: the SimPy environment and the lock are not saved; the restoring
+    # Trace sets env to its own environment and restarts the executor
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        state['env'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
     
     def track_io_request(self, file_id: int, tier: str, latency_ns: float, 
                         size_bytes: int, is_read: bool) -> None:
@@ -328,14 +446,18 @@ class MigrationAgentSystem:
             self.latency_window.append(latency_ns)
             self.request_count += 1
     
-    def periodic_update(self, ssd_usage: int, ram_usage: int) -> None:
+    def periodic_update(self, ssd_usage: int = 0, ram_usage: int = 0,
+                        tier_usage: Optional[Dict[str, int]] = None) -> None:
         """
         Call periodically (every ~50 requests) to trigger migration decisions.
         
         Args:
             ssd_usage: Current SSD usage in bytes
             ram_usage: Current RAM usage in bytes
+            tier_usage: Current usage in bytes by tier name (instead of ssd/ram_usage)
         """
+        if tier_usage is None:
+            tier_usage = {'SSD': ssd_usage, 'RAM': ram_usage}
         with self.lock:
             # Step 1: Track completed migrations in current window
             current_completed = self.migration_executor.get_completed_count()
@@ -344,72 +466,64 @@ class MigrationAgentSystem:
             self.migration_window.append(migrations_since_last)
             
             # Step 2: Identify migration candidates
-            candidates = self._identify_migration_candidates(ssd_usage, ram_usage)
+            candidates = self._identify_migration_candidates(tier_usage)
             
             # Step 3: Enqueue migrations
             if candidates:
                 enqueued = self._enqueue_migrations(candidates)
-                if enqueued > 0:
-                    print(f"[{self.env.now if self.env else time.time():.2f}s] "
-                          f"Enqueued {enqueued} migrations")
+                if enqueued > 0 and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"[{self.env.now if self.env else time.time():.2f}s] "
+                                 f"Enqueued {enqueued} migrations")
                     for c in candidates[:3]:
-                        print(f"  Page {c.file_id}: {c.current_tier} → "
-                              f"{c.target_tier} (score: {c.hotness_score:.2f})")
+                        logger.debug(f"  Page {c.file_id}: {c.current_tier} → "
+                                     f"{c.target_tier} (score: {c.hotness_score:.2f})")
             
             # Step 4: Calculate delayed reward
             reward, stats = self._calculate_delayed_reward()
-            if stats and 'avg_latency' in stats:
-                print(f"[{self.env.now if self.env else time.time():.2f}s] "
-                      f"Migration reward: {reward:.2f}, "
-                      f"Migrations: {stats['migrations_in_window']}, "
-                      f"Penalty: {stats['penalty']:.2f}, "
-                      f"Avg latency: {stats['avg_latency']:.0f}ns")
-    
-    def _identify_migration_candidates(self, ssd_usage: int, ram_usage: int) -> List[MigrationCandidate]:
+            if stats and 'avg_latency' in stats and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"[{self.env.now if self.env else time.time():.2f}s] "
+                             f"Migration reward: {reward:.2f}, "
+                             f"Migrations: {stats['migrations_in_window']}, "
+                             f"Penalty: {stats['penalty']:.2f}, "
+                             f"Avg latency: {stats['avg_latency']:.0f}ns")
+    
+    def _identify_migration_candidates(self, tier_usage: Dict[str, int]) -> List[MigrationCandidate]:
         """Identify LBAs that should be migrated based on access frequency"""
-        candidates = []
         current_time = time.time()
-        all_lbas = self.hotness_tracker.get_all_lbas()
         
-        for lba, lba_info in all_lbas.items():
-            current_tier = lba_info['tier']
-            hotness = self.hotness_tracker.get_hotness_score(lba, current_time)
-            classification = self.hotness_tracker.classify_lba(lba, current_time)
-            access_count = lba_info['access_count']
-            
-            target_tier = self._select_target_tier(
-                current_tier, classification, hotness, ssd_usage, ram_usage
-            )
-            
-            # Only suggest migration if target differs from current and LBA is hot
-            if target_tier != current_tier and access_count >= 5:
-                candidate = MigrationCandidate(
-                    file_id=lba,  # Use LBA as file_id
-                    current_tier=current_tier,
-                    target_tier=target_tier,
-                    hotness_score=hotness,
-                    identified_at=current_time
-                )
-                candidates.append(candidate)
+        # Only hot LBAs are migrated, and where a hot LBA goes depends only on its tier
+        targets = {}
+        for tier in self.hotness_tracker.hot_tiers():
+            target_tier = self._select_target_tier(tier, 'hot', 0.0, tier_usage)
+            if target_tier != tier:
+                targets[tier] = target_tier
         
-        # Sort by hotness score (access frequency) and return top candidates
-        candidates.sort(key=lambda c: c.hotness_score, reverse=True)
-        return candidates[:10]  # Max 10 candidates
+        # Hottest first (access frequency, then first access), max 10 candidates
+        return [
+            MigrationCandidate(
+                file_id=lba,  # Use LBA as file_id
+                current_tier=tier,
+                target_tier=targets[tier],
+                hotness_score=float(access_count),
+                identified_at=current_time
+            )
+            for lba, tier, access_count in self.hotness_tracker.hottest(list(targets), 10)
+        ]
     
     def _select_target_tier(self, current_tier: str, classification: str, 
-                           hotness: float, ssd_usage: int, ram_usage: int) -> str:
+                           hotness: float, tier_usage: Dict[str, int]) -> str:
         """Select target tier for an LBA based on hotness and capacity"""
-        device_hierarchy = ['RAM', 'SSD', 'HDD']
-        current_idx = device_hierarchy.index(current_tier) if current_tier in device_hierarchy else 1
+        device_hierarchy = self.device_hierarchy
+        current_idx = device_hierarchy.index(current_tier) if current_tier in device_hierarchy \
+            else min(1, len(device_hierarchy) - 1)
         
         if classification == 'hot':
-            # Move hot data to faster tier
+            # Move hot data to a faster tier with room (unbounded tiers always have room)
             for i in range(current_idx - 1, -1, -1):
                 tier = device_hierarchy[i]
-                if tier == 'RAM' and ram_usage < self.ram_capacity * 0.9:
-                    return 'RAM'
-                elif tier == 'SSD' and ssd_usage < self.ssd_capacity * 0.9:
-                    return 'SSD'
+                capacity = self.tier_capacity[tier]
+                if capacity is None or tier_usage.get(tier, 0) < capacity * 0.9:
+                    return tier
         
         elif classification == 'cold':
             # Move cold data to slower tier
@@ -523,23 +637,23 @@ class MigrationAgentSystem:
     
     def shutdown(self) -> None:
         """Gracefully shutdown the agent system"""
-        print("\n[SHUTDOWN] Unified Agent System stopping...")
+        logger.info("\n[SHUTDOWN] Unified Agent System stopping...")
         self.migration_executor.stop()
         
         stats = self.get_statistics()
-        print("Final Statistics (LBA-level):")
-        print(f"  Total LBAs tracked: {stats['total_lbas_tracked']}")
-        print(f"  Hot LBAs (access >= 5): {stats['hot_lbas']}")
-        print(f"  Cold LBAs (access <= 1): {stats['cold_lbas']}")
-        print(f"  Total LBA operations: {stats['total_lba_operations']}")
-        print(f"  Total I/O requests: {stats['total_requests']}")
-        print(f"  LBAs migrated: {stats['lbas_migrated']}")
-        print(f"  Total migrations across LBAs: {stats['total_migrations_across_lbas']}")
-        print(f"  Migrations enqueued: {stats['migrations_enqueued']}")
-        print(f"  Migrations completed: {stats['migrations_completed']}")
-        print(f"  Migrations in window: {stats['migrations_in_window']}")
-        print(f"  Migration rate: {stats['migration_rate']:.2%}")
-        print(f"  Avg reward: {stats['avg_reward']:.2f}")
+        logger.info("Final Statistics (LBA-level):")
+        logger.info(f"  Total LBAs tracked: {stats['total_lbas_tracked']}")
+        logger.info(f"  Hot LBAs (access >= 5): {stats['hot_lbas']}")
+        logger.info(f"  Cold LBAs (access <= 1): {stats['cold_lbas']}")
+        logger.info(f"  Total LBA operations: {stats['total_lba_operations']}")
+        logger.info(f"  Total I/O requests: {stats['total_requests']}")
+        logger.info(f"  LBAs migrated: {stats['lbas_migrated']}")
+        logger.info(f"  Total migrations across LBAs: {stats['total_migrations_across_lbas']}")
+        logger.info(f"  Migrations enqueued: {stats['migrations_enqueued']}")
+        logger.info(f"  Migrations completed: {stats['migrations_completed']}")
+        logger.info(f"  Migrations in window: {stats['migrations_in_window']}")
+        logger.info(f"  Migration rate: {stats['migration_rate']:.2%}")
+        logger.info(f"  Avg reward: {stats['avg_reward']:.2f}")
 
 
 # ==============================================================================
@@ -569,9 +683,9 @@ def integrate_migration_agent_system(trace_instance):
     
     trace_instance.agent_check_counter = 0
     
-    print("[INIT] Migration Agent System initialized")
-    print(f"  SSD capacity: {settings.SSD_CAPACITY_BYTES / 1e9:.1f}GB")
-    print(f"  RAM capacity: {settings.RAM_CAPACITY_BYTES / 1e9:.1f}GB")
-    print(f"  Migration check interval: {MigrationAgentSystem.MIGRATION_CHECK_INTERVAL} requests")
-    print(f"  Reward window: {MigrationAgentSystem.REWARD_WINDOW_SIZE} requests")
+    logger.info("[INIT] Migration Agent System initialized")
+    logger.info(f"  SSD capacity: {settings.SSD_CAPACITY_BYTES / 1e9:.1f}GB")
+    logger.info(f"  RAM capacity: {settings.RAM_CAPACITY_BYTES / 1e9:.1f}GB")
+    logger.info(f"  Migration check interval: {MigrationAgentSystem.MIGRATION_CHECK_INTERVAL} requests")
+    logger.info(f"  Reward window: {MigrationAgentSystem.REWARD_WINDOW_SIZE} requests")
 
@@ -3,14 +3,18 @@
 
 
 from rl_c51_agent import C51Agent, C51Config
-from features import make_state, reward_from_latency, ACTION_TO_TIER, TIER_TO_ACTION
+from features import make_state, reward_from_latency, action_to_tier
+from metrics import TIER_NAMES
 import numpy as np
 
 
 class RLPlacement:
-    def __init__(self, ssd_cap, ram_cap, device="cpu"):
+    def __init__(self, ssd_cap, ram_cap, device="cpu", tier_names=TIER_NAMES):
         # Use state_dim=7: [is_read, lba_bin, block_bin, service_bin, last_tier_RAM/SSD/HDD]
-        cfg = C51Config(state_dim=7, n_actions=3, device=device)
+        # (4 + one last-tier column and one action per tier of another hierarchy, tiers.py)
+        self.tier_names = tuple(tier_names)
+        self.action_to_tier = action_to_tier(self.tier_names)
+        cfg = C51Config(state_dim=4 + len(self.tier_names), n_actions=len(self.tier_names), device=device)
         self.agent = C51Agent(cfg)
         # simple per-file stats
         self.freq = {}
@@ -19,6 +23,15 @@ class RLPlacement:
         self.ram_cap = ram_cap
         self.prev_state = None
         self.prev_action = None
+        # FeatureExtractor driving this run (normalization stats for make_state)
+        self.feature_extractor = None
+
+    # Checkpoints (checkpoint.py): the extractor holds the open trace; the resumed
+    # run attaches its own
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['feature_extractor'] = None
+        return state
 
 
     def _touch(self, fid):
@@ -37,11 +50,12 @@ class RLPlacement:
         size_kb = size_bytes / 1024.0
         state = make_state(is_read, size_kb, is_seq, inter_arrival_s,
         self.freq[file_id], ssd_used, ssd_cap, ram_used, ram_cap,
-        self.last_tier.get(file_id, "HDD"))
+        self.last_tier.get(file_id, self.tier_names[-1]), fe=self.feature_extractor,
+        tier_names=self.tier_names)
         action = self.agent.act(state)
         self.prev_state = state
         self.prev_action = action
-        return ACTION_TO_TIER[action]
+        return self.action_to_tier[action]
 
     def select_tier_from_state(self, *,
             state: np.ndarray,
@@ -53,7 +67,7 @@ class RLPlacement:
         action = self.agent.act(state)
         self.prev_state = state
         self.prev_action = action
-        return ACTION_TO_TIER[action]
+        return self.action_to_tier[action]
 
 
     def observe(self, *, latency_s: float, next_is_read: bool,
@@ -64,7 +78,8 @@ class RLPlacement:
         size_kb = next_size_bytes / 1024.0
         next_state = make_state(next_is_read, size_kb, next_is_seq, next_inter_arrival_s,
         self.freq.get(file_id,1), ssd_used, ssd_cap, ram_used, ram_cap,
-        self.last_tier.get(file_id, "HDD"))
+        self.last_tier.get(file_id, self.tier_names[-1]), fe=self.feature_extractor,
+        tier_names=self.tier_names)
         r = reward_from_latency(latency_s)
         if self.prev_state is not None:
             self.agent.push(self.prev_state, self.prev_action, r, next_state, done)
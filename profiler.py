@@ -0,0 +1,101 @@
+"""profiler.py
+
+Opt-in phase profiler: cumulative wall time (perf_counter_ns) and call counts of
+the simulator's main phases.
+
+  parse        reading and parsing the trace, feature normalization (FeatureExtractor)
+  act          C51Agent.act, the placement decision
+  learn        C51Agent.learn, the replay-buffer training step
+  migrate      MigrationAgentSystem.track_io_request and periodic_update (LBA scans)
+  bookkeeping  Trace capacity checks and evictions (Trace.admit)
+
+Nothing in the request path tests a flag: with PROFILE = True the methods above are
+replaced, on the run's own objects only, by timing wrappers (instrument()); with
+PROFILE = False the objects are untouched and the cost is zero. The remainder of the
+run time (event engine, transfer processes, logging) is reported as 'other'.
+
+PROFILE_CPROFILE = 'run.pstats' additionally runs the simulation under cProfile and
+dumps its statistics there (python -m pstats run.pstats).
+
+    prof = PhaseProfiler()
+    prof.instrument(agent, 'learn', 'learn')
+    ...
+    print(prof.format_breakdown(total_ns))
+"""
+
+from __future__ import annotations
+
+from time import perf_counter_ns
+from typing import Dict, Iterable, Iterator, Optional
+
+PHASES = ('parse', 'act', 'learn', 'migrate', 'bookkeeping')
+
+
+class PhaseProfiler:
+    """Per-phase wall-time and call counters."""
+
+    def __init__(self) -> None:
+        self.ns: Dict[str, int] = {name: 0 for name in PHASES}
+        self.calls: Dict[str, int] = {name: 0 for name in PHASES}
+        self._wrapped = []     # (obj, name) pairs replaced by instrument()
+
+    def add(self, phase: str, elapsed_ns: int, calls: int = 1) -> None:
+        self.ns[phase] = self.ns.get(phase, 0) + elapsed_ns
+        self.calls[phase] = self.calls.get(phase, 0) + calls
+
+    def instrument(self, obj, name: str, phase: str) -> None:
+        """Replace obj.name (a method) on this instance by a wrapper charging ``phase``."""
+        method = getattr(obj, name)
+        self.ns.setdefault(phase, 0)
+        self.calls.setdefault(phase, 0)
+        ns, calls = self.ns, self.calls
+
+        def timed(*args, **kwargs):
+            t0 = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                ns[phase] += perf_counter_ns() - t0
+                calls[phase] += 1
+
+        timed.__wrapped__ = method
+        setattr(obj, name, timed)
+        self._wrapped.append((obj, name))
+
+    def detach(self) -> None:
+        """Remove the wrappers set by instrument(); the counters are kept."""
+        for obj, name in reversed(self._wrapped):
+            delattr(obj, name)
+        self._wrapped = []
+
+    def iterate(self, iterable: Iterable, phase: str) -> Iterator:
+        """Yield from ``iterable``, charging the time spent producing each item to ``phase``."""
+        it = iter(iterable)
+        while True:
+            t0 = perf_counter_ns()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add(phase, perf_counter_ns() - t0, 0)
+                return
+            self.add(phase, perf_counter_ns() - t0)
+            yield item
+
+    def as_dict(self, total_ns: Optional[int] = None) -> Dict:
+        """{phase: {'calls': .., 'ns': ..}}, plus 'other' and 'total' when total_ns is given."""
+        out = {name: {'calls': self.calls[name], 'ns': self.ns[name]} for name in self.ns}
+        if total_ns is not None:
+            out['other'] = {'calls': 0, 'ns': max(total_ns - sum(self.ns.values()), 0)}
+            out['total'] = {'calls': 0, 'ns': total_ns}
+        return out
+
+    def format_breakdown(self, total_ns: int) -> str:
+        """Table of calls, total seconds, mean microseconds per call and share of the run."""
+        lines = ['# Phase profile (wall time)',
+                 f"{'phase':<12}{'calls':>10}{'total [s]':>12}{'mean [us]':>12}{'share':>8}"]
+        for name, row in self.as_dict(total_ns).items():
+            calls, ns = row['calls'], row['ns']
+            mean = f'{ns / calls / 1000:.2f}' if calls else '-'
+            share = ns / total_ns * 100 if total_ns else 0.0
+            lines.append(f"{name:<12}{calls if calls else '':>10}{ns / 1e9:>12.3f}{mean:>12}{share:>7.1f}%")
+        return '\n'.join(lines)
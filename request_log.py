@@ -0,0 +1,236 @@
+"""request_log.py
+
+Per-request output sinks and the simulator's leveled logger.
+
+Every completed request is reported to a RequestLog as
+(file_id, arrived ns, finished ns, served ns, tier). The sink is chosen with
+settings.REQUEST_LOG:
+
+  'stdout'   one "file_id,arrived,returned,served,tier" line per request (the original output):
+             whole ms, except ssd_caching (and belady), which always printed raw ns
+  'off'      nothing
+  'sampled'  1 in REQUEST_LOG_SAMPLE requests, to REQUEST_LOG_PATH (CSV) or stdout
+  'csv'      all requests to REQUEST_LOG_PATH through a REQUEST_LOG_BUFFER byte write buffer
+  'npz'      all requests as NumPy columns, one REQUEST_LOG_PATH.<n>.npz file per
+             REQUEST_LOG_CHUNK requests (ns times, tier as an index into the run's tier
+             names, saved alongside as tier_names)
+
+Diagnostics go through the 'storagesim' logger (get_logger); configure_logging()
+sets its level from settings.LOG_LEVEL. Per-store and eviction messages are DEBUG
+and are not formatted at all unless DEBUG is enabled.
+
+    log = make_request_log(config, tier_names=('RAM', 'SSD', 'HDD'))
+    log.write('1540175', 0.0, 48534.0, 48534.0, 'SSD')
+    log.close()
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from metrics import TIER_NAMES
+
+LOGGER_NAME = 'storagesim'
+NANOSECOND_TO_MILLISECOND = 1 / float(1000 * 1000)
+REQUEST_LOG_MODES = ('stdout', 'off', 'sampled', 'csv', 'npz')
+
+# Policies whose stdout lines have always been in ns rather than whole ms
+NS_STDOUT_POLICIES = ('ssd_caching', 'belady')
+
+# Record layout of the npz sink
+NPZ_COLUMNS = ('file_id', 'arrive', 'finish', 'served', 'tier')
+
+
+# ============================================================================
+# Leveled logger
+# ============================================================================
+
+def get_logger(name: str) -> logging.Logger:
+    """Child of the simulator logger, e.g. get_logger('trace') -> 'storagesim.trace'."""
+    return logging.getLogger(LOGGER_NAME + '.' + name)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at emit time, so redirect_stdout() applies."""
+
+    def __init__(self) -> None:
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value) -> None:
+        pass
+
+
+def configure_logging(level='INFO') -> logging.Logger:
+    """Send simulator messages at ``level`` and above to stdout, unadorned like print()."""
+    logger = logging.getLogger(LOGGER_NAME)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    logger.setLevel(level)
+    if not any(isinstance(h, _StdoutHandler) for h in logger.handlers):
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.propagate = False
+    return logger
+
+
+# ============================================================================
+# Request sinks
+# ============================================================================
+
+class RequestLog:
+    """Sink interface; the base class discards everything (REQUEST_LOG = 'off')."""
+
+    def write(self, file_id, arrived: float, finished: float, served: float, tier: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class StdoutLog(RequestLog):
+    """The original per-request CSV line on stdout, in whole ms or (ns=True) in ns."""
+
+    def __init__(self, ns: bool = False) -> None:
+        self.ns = ns
+
+    def write(self, file_id, arrived: float, finished: float, served: float, tier: str) -> None:
+        if self.ns:
+            print(f"{file_id},{arrived},{finished},{served},{tier}")
+        else:
+            print(f"{file_id},{int(arrived * NANOSECOND_TO_MILLISECOND)},"
+                  f"{int(finished * NANOSECOND_TO_MILLISECOND)},"
+                  f"{int(served * NANOSECOND_TO_MILLISECOND)},{tier}")
+
+
+class CsvLog(RequestLog):
+    """Same lines as StdoutLog, written to a file through a large buffer."""
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20) -> None:
+        self.path = path
+        self._f = open(path, 'w', buffering=buffer_size)
+        self._f.write('file_id,arrived_ms,returned_ms,served_ms,tier\n')
+        self._write = self._f.write
+
+    def write(self, file_id, arrived: float, finished: float, served: float, tier: str) -> None:
+        self._write(f"{file_id},{int(arrived * NANOSECOND_TO_MILLISECOND)},"
+                    f"{int(finished * NANOSECOND_TO_MILLISECOND)},"
+                    f"{int(served * NANOSECOND_TO_MILLISECOND)},{tier}\n")
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class SampledLog(RequestLog):
+    """Forwards the first of every ``every`` requests to another sink."""
+
+    def __init__(self, sink: RequestLog, every: int) -> None:
+        self.sink = sink
+        self.every = max(int(every), 1)
+        self._count = 0
+
+    def write(self, file_id, arrived: float, finished: float, served: float, tier: str) -> None:
+        if self._count % self.every == 0:
+            self.sink.write(file_id, arrived, finished, served, tier)
+        self._count += 1
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+class NpzLog(RequestLog):
+    """Binary columns, saved as ``<prefix>.<n>.npz`` every ``chunk_rows`` requests.
+
+    Times are float64 ns, tier is the index of the tier in tier_names (the run's
+    hierarchy, fastest first), which every file stores as its tier_names column;
+    file_id is int64 when every id of the chunk is an integer (LBAs), strings otherwise.
+    """
+
+    def __init__(self, prefix: str, chunk_rows: int = 65536, tier_names: Sequence[str] = TIER_NAMES) -> None:
+        self.prefix = prefix[:-4] if prefix.endswith('.npz') else prefix
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.files: List[str] = []
+        self.tier_names = tuple(tier_names)
+        self._tier_index = {name: i for i, name in enumerate(self.tier_names)}
+        self._times = np.empty((self.chunk_rows, 3), dtype=np.float64)
+        self._tiers = np.empty(self.chunk_rows, dtype=np.uint8)
+        self._ids: list = []
+
+    def write(self, file_id, arrived: float, finished: float, served: float, tier: str) -> None:
+        n = len(self._ids)
+        self._ids.append(file_id)
+        self._times[n] = (arrived, finished, served)
+        self._tiers[n] = self._tier_index[tier]
+        if n + 1 == self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        n = len(self._ids)
+        if n == 0:
+            return
+        try:
+            ids = np.array([int(i) for i in self._ids], dtype=np.int64)
+        except ValueError:
+            ids = np.array([str(i) for i in self._ids])
+        path = f"{self.prefix}.{len(self.files):05d}.npz"
+        np.savez(path, file_id=ids, arrive=self._times[:n, 0], finish=self._times[:n, 1],
+                 served=self._times[:n, 2], tier=self._tiers[:n], tier_names=np.array(self.tier_names))
+        self.files.append(path)
+        self._ids = []
+
+    def close(self) -> None:
+        self.flush()
+
+
+def load_npz_log(prefix: str) -> dict:
+    """Concatenate the chunk files written by NpzLog into one dict of columns.
+
+    Besides NPZ_COLUMNS it holds 'tier_names', to decode the tier indexes with
+    (tier_names[tier]); files written before it was stored decode with metrics.TIER_NAMES.
+    """
+    import glob
+    prefix = prefix[:-4] if prefix.endswith('.npz') else prefix
+    paths = sorted(glob.glob(glob.escape(prefix) + '.[0-9]*.npz'))
+    parts = [np.load(p) for p in paths]
+    out = {col: np.concatenate([part[col] for part in parts]) if parts else np.empty(0)
+           for col in NPZ_COLUMNS}
+    out['tier_names'] = (parts[0]['tier_names'] if parts and 'tier_names' in parts[0].files
+                         else np.array(TIER_NAMES))
+    return out
+
+
+def make_request_log(config, tier_names: Sequence[str] = TIER_NAMES) -> RequestLog:
+    """Sink selected by config.REQUEST_LOG (see module docstring), for a run over tier_names.
+
+    From Python, REQUEST_LOG may also be a RequestLog instance, which is used as is.
+    """
+    mode = getattr(config, 'REQUEST_LOG', 'stdout')
+    if isinstance(mode, RequestLog):
+        return mode
+    mode = str(mode).lower()
+    path: Optional[str] = getattr(config, 'REQUEST_LOG_PATH', None)
+    ns = str(getattr(config, 'REPLACEMENT_POLICY', '')).lower() in NS_STDOUT_POLICIES
+    if mode == 'stdout':
+        return StdoutLog(ns)
+    if mode == 'off':
+        return RequestLog()
+    if mode == 'sampled':
+        sink = CsvLog(path, getattr(config, 'REQUEST_LOG_BUFFER', 1 << 20)) if path else StdoutLog(ns)
+        return SampledLog(sink, getattr(config, 'REQUEST_LOG_SAMPLE', 1000))
+    if mode in ('csv', 'npz') and not path:
+        raise ValueError(f"REQUEST_LOG = '{mode}' needs REQUEST_LOG_PATH")
+    if mode == 'csv':
+        return CsvLog(path, getattr(config, 'REQUEST_LOG_BUFFER', 1 << 20))
+    if mode == 'npz':
+        return NpzLog(path, getattr(config, 'REQUEST_LOG_CHUNK', 65536), tier_names)
+    raise ValueError(f"Unknown REQUEST_LOG '{mode}' (expected one of {', '.join(REQUEST_LOG_MODES)})")
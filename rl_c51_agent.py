@@ -124,11 +124,12 @@ class C51Agent:
         l = b.floor().long()
         u = b.ceil().long()
         B, Z = next_dist.shape
-        m = torch.zeros(B, Z, device=self.device)
-        for i in range(B):
-            m[i].index_add_(0, l[i], next_dist[i] * (u[i].float() - b[i]))
-            m[i].index_add_(0, u[i], next_dist[i] * (b[i] - l[i].float()))
-        return m
+        # Row i of m is m.view(-1)[i * Z:(i + 1) * Z]: one index_add_ per neighbour for the whole batch
+        offset = (torch.arange(B, device=self.device) * Z).unsqueeze(1)
+        m = torch.zeros(B * Z, device=self.device)
+        m.index_add_(0, (l + offset).view(-1), (next_dist * (u.float() - b)).view(-1))
+        m.index_add_(0, (u + offset).view(-1), (next_dist * (b - l.float())).view(-1))
+        return m.view(B, Z)
 
 
     def learn(self):
@@ -140,7 +141,7 @@ class C51Agent:
         s, a, r, ns, d = self.buffer.sample(cfg.batch_size)
         s = torch.tensor(s, device=self.device)
         a = torch.tensor(a, device=self.device, dtype=torch.int64)
-        r = torch.tensor(r, device=self.device)
+        r = torch.tensor(r, device=self.device, dtype=torch.float32)
         ns = torch.tensor(ns, device=self.device)
         d = torch.tensor(d, device=self.device, dtype=torch.float32)
 
@@ -0,0 +1,143 @@
+"""sampler.py
+
+Time series of the simulation state, sampled every SAMPLER_INTERVAL seconds of
+simulated time.
+
+Each sample row holds, at the sample instant:
+  time                         simulated time (ns)
+  ssd_queue, ssd_busy          waiting requests / busy servers of the SSD resource, summed over
+                               the devices with per-device queues (busy dies with
+                               SSD_MODEL = 'internal')
+  hdd_queue, hdd_busy          same for the HDD resource
+  ram_used_bytes, ssd_used_bytes
+  ram/ssd/hdd_req_s            completed requests per second since the previous sample
+  ram/ssd/hdd_bytes_s          transferred bytes per second since the previous sample
+  migrations                   migrations completed by the migration agent so far
+
+With another hierarchy (settings.TIERS) the columns follow its tiers: <tier>_queue and
+<tier>_busy per device tier, <tier>_used_bytes per tier with a capacity, <tier>_req_s
+and <tier>_bytes_s per tier (columns(trace)).
+
+Rows go into a preallocated NumPy ring of SAMPLER_CAPACITY rows, so memory is fixed
+however long the run is; when it wraps, the oldest rows are overwritten. Sampling
+does not add events to the simulation: run() steps the environment itself and
+samples whenever the next event lies beyond a sample instant, so event order and
+the final simulated time are the same as with env.run(). Idle stretches with no
+events produce a single sample at their end instead of one per interval.
+
+    sampler = TimeSeriesSampler(env, trace, interval_ns=10**9)
+    sampler.run()
+    sampler.dump('timeseries.npz')      # np.load(...)['ssd_queue'], ...
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+try:
+    from settings import SAMPLER_INTERVAL, SAMPLER_CAPACITY
+except ImportError:
+    SAMPLER_INTERVAL = 0.001
+    SAMPLER_CAPACITY = 100000
+
+SECOND_TO_NANOSECOND = 1000 * 1000 * 1000
+
+
+
+def columns(trace) -> tuple:
+    """Column names of a Trace's samples, tiers in hierarchy order."""
+    names = [spec.name.lower() for spec in trace.tiers]
+    device_tiers = [spec.name.lower() for spec in trace.tiers if not spec.is_memory]
+    return ('time', *(f'{name}_{col}' for name in device_tiers for col in ('queue', 'busy')),
+            *(f'{name.lower()}_used_bytes' for name in trace.tier_stores),
+            *(f'{name}_req_s' for name in names), *(f'{name}_bytes_s' for name in names), 'migrations')
+
+
+class TimeSeriesSampler:
+    """Samples a Trace's resources, capacity and throughput into a ring of NumPy rows."""
+
+    def __init__(self, env, trace, interval_ns: float = SAMPLER_INTERVAL * SECOND_TO_NANOSECOND,
+                 capacity: int = SAMPLER_CAPACITY) -> None:
+        if interval_ns <= 0:
+            raise ValueError(f'Sampling interval must be > 0 (got {interval_ns})')
+        self.env = env
+        self.trace = trace
+        self.interval = interval_ns
+        self.capacity = max(int(capacity), 1)
+        self.samples = 0   # rows written, including overwritten ones
+        self.columns = columns(trace)
+        self._rows = np.zeros((self.capacity, len(self.columns)), dtype=np.float64)
+        self._last_time = env.now
+        n_tiers = len(trace.tiers)
+        self._last_ops = [0] * n_tiers
+        self._last_bytes = [0] * n_tiers
+
+    @property
+    def dropped(self) -> int:
+        """Rows lost because the ring wrapped."""
+        return max(self.samples - self.capacity, 0)
+
+    def sample(self, now: Optional[float] = None) -> None:
+        """Append one row describing the state at ``now`` (default env.now)."""
+        now = self.env.now if now is None else now
+        trace = self.trace
+        metrics = trace.metrics
+        dt = (now - self._last_time) / SECOND_TO_NANOSECOND
+        rates = []
+        byte_rates = []
+        for tier in range(len(self._last_ops)):
+            ops = metrics.reads[tier] + metrics.writes[tier]
+            moved = metrics.bytes[tier]
+            rates.append((ops - self._last_ops[tier]) / dt if dt > 0 else 0.0)
+            byte_rates.append((moved - self._last_bytes[tier]) / dt if dt > 0 else 0.0)
+            self._last_ops[tier] = ops
+            self._last_bytes[tier] = moved
+        self._last_time = now
+        row = self._rows[self.samples % self.capacity]
+        queues = []
+        for spec in trace.tiers:
+            if spec.is_memory:
+                continue
+            array = trace.tier_devices.get(spec.name)
+            if array is not None:
+                # Per-device queues (DEVICE_QUEUES, models); internal SSD model: requests
+                # waiting for a die / busy dies
+                queues += (array.queued, array.busy)
+            else:
+                resource = trace.tier_resource[spec.name]
+                queues += (len(resource.queue), resource.count)
+        row[:] = (now, *queues, *(store.used_bytes for store in trace.tier_stores.values()), *rates, *byte_rates,
+                  trace.agent_system.migration_executor.get_completed_count())
+        self.samples += 1
+
+    def run(self) -> None:
+        """Run the environment until no events are left, sampling every interval."""
+        env = self.env
+        peek, step = env.peek, env.step
+        interval = self.interval
+        next_tick = env.now + interval
+        while True:
+            t = peek()
+            if t == float('inf'):
+                break
+            if t >= next_tick:
+                # State before any event at next_tick; skip the empty ticks of an idle stretch
+                self.sample(next_tick)
+                next_tick += interval * max(1, (t - next_tick) // interval)
+                continue
+            step()
+        self.sample()
+
+    def as_arrays(self) -> Dict[str, np.ndarray]:
+        """{column: array} of the retained rows, oldest first."""
+        n = min(self.samples, self.capacity)
+        rows = self._rows[:n]
+        if self.samples > self.capacity:
+            rows = np.roll(rows, -(self.samples % self.capacity), axis=0)
+        return {name: rows[:, i].copy() for i, name in enumerate(self.columns)}
+
+    def dump(self, path: str) -> None:
+        """Save the retained rows as NumPy columns in ``path`` (.npz)."""
+        np.savez(path, **self.as_arrays())
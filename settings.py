@@ -44,6 +44,8 @@ TIMESTAMP_UNIT = 'ns'
 # REPLACEMENT_POLICY = 'ssd_caching'   # SSD caching strategy
 # REPLACEMENT_POLICY = 'hashed'        # Hashed placement
 # REPLACEMENT_POLICY = 'f4'            # F4 strategy
+# REPLACEMENT_POLICY = 'belady'        # ssd_caching with an offline-optimal (Belady MIN) SSD cache: upper bound
+# REPLACEMENT_POLICY = 'f4_belady'     # f4 with an offline-optimal (Belady MIN) RAM cache: upper bound
 REPLACEMENT_POLICY = 'rl_c51'        # RL-based placement
 # REPLACEMENT_POLICY = 'all_ram'       # All data to RAM
 # REPLACEMENT_POLICY = 'all_ssd'       # All data to SSD
@@ -63,10 +65,23 @@ RL_DEVICE = 'cuda'
 SSD_CAPACITY_BYTES = 100 * 1024 * 1024 * 1024  # 100GB
 RAM_CAPACITY_BYTES = 10 * 1024 * 1024 * 1024   # 10GB
 
-# Eviction Policy when capacity is exceeded
-# Options: 'LRU' (Least Recently Used), 'FIFO' (First In First Out), 'LFU' (Least Frequently Used)
+# Eviction Policy when capacity is exceeded, for the SSD and RAM tiers and caches (eviction.py)
+# Options: 'LRU' (Least Recently Used), 'FIFO' (First In First Out), 'LFU' (Least Frequently Used),
+# 'ARC' (Adaptive Replacement Cache: recency / frequency balance adapted with ghost lists),
+# 'S3FIFO' (small + main FIFO queues and a ghost queue: scan-resistant, a hit is a counter increment)
+# A tier of TIERS can override it with an 'eviction' key
 EVICTION_POLICY = 'LRU'
 
+# Admission of HDD misses into the ssd_caching SSD cache (admission.py): None admits every miss;
+# 'tinylfu' puts them in a window LRU of ADMISSION_WINDOW_RATIO of the SSD bytes, and a file leaving
+# the window only displaces the cache's next victim if a count-min sketch of
+# 4 * ADMISSION_SKETCH_WIDTH bytes (plus a doorkeeper Bloom filter) estimates it more popular.
+# The sketch halves its counters every ADMISSION_SAMPLE_SIZE accesses (None: 10 * width)
+SSD_ADMISSION = None
+ADMISSION_WINDOW_RATIO = 0.01
+ADMISSION_SKETCH_WIDTH = 1 << 20
+ADMISSION_SAMPLE_SIZE = None
+
 # Total of devices used in each layer to perform the simulation
 NUMBER_SSD = 4146
 NUMBER_HDD = 4146
@@ -78,3 +93,133 @@ FILE_PATH = 'data_trace/MSRC/wdev_3.revised'
 # FILE_PATH = 'data_trace/MSRC/src1_1.revised'
 
 
+
+# Columnar binary trace cache (see trace_cache.py)
+# True: the RL trace reader converts FILE_PATH once into FILE_PATH + '.tcache/' and replays
+# from the memory-mapped columns afterwards (rebuilt automatically if the trace changes).
+# FILE_PATH may also point directly at a '.tcache' directory, which works for every policy.
+TRACE_CACHE = False
+
+# Feature normalization for the RL trace reader (see features.FeatureExtractor)
+# 'prescan':   read the trace once for the maxima, then again to replay (exact, needs a seekable file)
+# 'streaming': single pass with running maxima over a bounded lookahead buffer; starts replaying
+#              immediately and also works on pipes (FILE_PATH = None reads stdin in this mode)
+FEATURE_NORMALIZATION = 'prescan'
+STREAMING_LOOKAHEAD = 1024  # rows read ahead of the replayed one to warm up the running maxima
+
+# Parse FILE_PATH with this many worker processes (mmap + shared memory, see trace_parser.py).
+# The workers also return the normalization maxima, so the pre-scan is free. 1 = single process.
+TRACE_PARSE_WORKERS = 1
+
+# Compressed traces (.gz/.bz2/.xz, detected by content) and stdin are read through a background
+# thread that decompresses the next blocks while the simulation runs. No copy is written to disk.
+TRACE_READ_AHEAD = True
+
+# Discrete-event engine (see engine.py)
+# 'simpy': the SimPy library
+# 'heap':  built-in heapq event loop, same event ordering and results as SimPy; about 1.5-1.8x
+#          faster on event-loop microbenchmarks, about 1.2x on a full all_hdd run where the
+#          tier, metrics and migration bookkeeping take most of the time
+SIM_ENGINE = 'simpy'
+
+# 'simulate': event simulation of every request
+# 'analytic': all_ram/all_ssd/all_hdd/hashed are replayed in closed form with NumPy (see analytic.py):
+#             same tier counters and served times in a fraction of the time, no migration statistics.
+#             Other policies are simulated.
+SIM_MODE = 'simulate'
+
+# Per-request output (see request_log.py)
+# 'stdout':  "file_id,arrived,returned,served,tier" per request, as before: whole ms, but ns
+#            for ssd_caching / belady (csv is always whole ms)
+# 'off':     nothing (fastest)
+# 'sampled': 1 in REQUEST_LOG_SAMPLE requests, to REQUEST_LOG_PATH if set, else stdout
+# 'csv':     every request to REQUEST_LOG_PATH, written through a REQUEST_LOG_BUFFER byte buffer
+# 'npz':     every request as binary NumPy columns (file_id, arrive, finish, served, tier),
+#            one REQUEST_LOG_PATH.<n>.npz file per REQUEST_LOG_CHUNK requests
+REQUEST_LOG = 'stdout'
+REQUEST_LOG_PATH = None
+REQUEST_LOG_SAMPLE = 1000
+REQUEST_LOG_BUFFER = 1 << 20
+REQUEST_LOG_CHUNK = 65536
+
+# Level of the simulator's diagnostic messages ('DEBUG', 'INFO', 'WARNING', ...).
+# Per-store and eviction messages and the periodic migration reports are DEBUG.
+LOG_LEVEL = 'INFO'
+
+# Time series of queue depth, busy servers, used capacity, per-tier throughput and migrations
+# (see sampler.py), one row every SAMPLER_INTERVAL seconds of simulated time, kept in a ring of
+# SAMPLER_CAPACITY rows and saved to SAMPLER_PATH (.npz) at the end of the run.
+SAMPLER = False
+SAMPLER_INTERVAL = 0.001
+SAMPLER_CAPACITY = 100000
+SAMPLER_PATH = 'timeseries.npz'
+
+# Phase profiler (see profiler.py): wall time and call counts of trace parsing, placement (act),
+# training (learn), migration agent and capacity bookkeeping, logged at the end of the run.
+# PROFILE_CPROFILE = 'run.pstats' also runs the simulation under cProfile and dumps the stats there.
+PROFILE = False
+PROFILE_CPROFILE = None
+
+# Checkpoint/resume (see checkpoint.py, 8-column trace policies only). With CHECKPOINT_EVERY > 0 the
+# simulation state is saved to CHECKPOINT_DIR about every CHECKPOINT_EVERY requests, at the next instant
+# with no request in flight (if none comes for another interval, dispatch waits for the queue to drain),
+# keeping the newest CHECKPOINT_KEEP files. RESUME_FROM = a checkpoint path
+# (or 'latest') continues that run from the saved state; other settings may differ, to fork what-if runs.
+CHECKPOINT_EVERY = 0
+CHECKPOINT_DIR = 'checkpoints'
+CHECKPOINT_KEEP = 2
+RESUME_FROM = None
+
+# HDD service model (see hdd_model.py): 'flat' = size / transfer rate on NUMBER_HDD shared servers,
+# 'mechanical' = NUMBER_HDD drives of HDD_CAPACITY_BYTES each, requests placed on them by DEVICE_LAYOUT
+# (default 'stripe', see the device queue settings), with seek time by LBA distance
+# (HDD_SEEK_MIN_MS..HDD_SEEK_MAX_MS), rotational latency at HDD_RPM, a sequential-stream detector
+# (HDD_SEQ_STREAMS streams, HDD_SEQ_WINDOW sectors) and per-drive 'fifo' or 'elevator' scheduling.
+HDD_MODEL = 'flat'
+HDD_SCHEDULER = 'fifo'
+HDD_RPM = 7200
+HDD_SEEK_MIN_MS = 0.6
+HDD_SEEK_MAX_MS = 15.0
+HDD_SECTORS_PER_TRACK = 1000
+HDD_CAPACITY_BYTES = 4 * 1024 * 1024 * 1024 * 1024   # 4TB
+HDD_SEQ_STREAMS = 4
+HDD_SEQ_WINDOW = 128
+
+# SSD service model (see ssd_model.py): 'flat' = size / transfer rate on NUMBER_SSD shared servers,
+# 'internal' = NUMBER_SSD drives sharing SSD_CAPACITY_BYTES, requests placed on them by DEVICE_LAYOUT,
+# each with SSD_CHANNELS x SSD_DIES_PER_CHANNEL dies serving SSD_PAGE_BYTES pages (read SSD_READ_US, program SSD_WRITE_US, channel SSD_CHANNEL_MBPS),
+# and garbage collection whose write amplification grows with fullness (SSD_OVERPROVISION spare area,
+# SSD_PREFILL fraction already full) and stalls writes that outpace background GC at SSD_GC_MBPS.
+SSD_MODEL = 'flat'
+SSD_CHANNELS = 8
+SSD_DIES_PER_CHANNEL = 4
+SSD_PAGE_BYTES = 16384
+SSD_READ_US = 60.0
+SSD_WRITE_US = 500.0
+SSD_CHANNEL_MBPS = 800.0
+SSD_OVERPROVISION = 0.07
+SSD_GC_MBPS = 200.0
+SSD_PREFILL = 0.0
+
+# Per-device queues (see devices.py): with DEVICE_QUEUES the flat model gives each HDD/SSD device
+# (or group of DEVICE_GROUP_SIZE devices) its own queue instead of one shared resource per tier.
+# Requests are placed on devices by DEVICE_LAYOUT ('linear', 'stripe' = RAID-0, 'hash'), split at
+# STRIPE_UNIT_BYTES boundaries; the HDD/SSD models place requests the same way. Per-device
+# utilization and imbalance are added to the summary.
+DEVICE_QUEUES = False
+DEVICE_LAYOUT = 'stripe'
+STRIPE_UNIT_BYTES = 65536
+DEVICE_GROUP_SIZE = 1
+
+# Storage hierarchy (see tiers.py): None is the RAM / SSD / HDD stack built from the settings
+# above. Otherwise a list of tiers, fastest first; the RL agent gets one action per tier,
+# migrations move along the list, all_<name> serves everything from one tier, and the summary
+# and sampler report every tier. hashed, ssd_caching and f4 need the default hierarchy. E.g.
+# TIERS = [
+#     {'name': 'NVME', 'capacity_bytes': 64 * 2**30, 'read_mbps': 3000, 'write_mbps': 2000, 'devices': 8},
+#     {'name': 'QLC', 'capacity_bytes': 2**40, 'read_mbps': 1500, 'write_mbps': 300, 'devices': 16,
+#      'model': 'internal'},
+#     {'name': 'HDD', 'read_mbps': 120, 'write_mbps': 100, 'devices': 64, 'model': 'mechanical'},
+#     {'name': 'OBJECT', 'read_mbps': 100, 'write_mbps': 80, 'latency_us': 20000, 'devices': 256},
+# ]
+TIERS = None
@@ -0,0 +1,337 @@
+"""simulation.py
+
+Programmatic entry point for one simulation run.
+
+All run state (environment, resources, Trace and its SimulationMetrics) is created
+per call, so runs can be repeated in one process or spread over threads/processes:
+
+    from simulation import make_config, run_simulation, format_summary
+    results = run_simulation(make_config(REPLACEMENT_POLICY='all_ssd', NUMBER_SSD=4))
+    print(results['metrics']['reads_ssd'])
+    print(format_summary(results))
+
+multi-tier-simulator.py is the command-line wrapper around run_simulation().
+"""
+
+from __future__ import annotations
+
+import cProfile
+from time import perf_counter_ns
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+import analytic
+import checkpoint
+import devices
+import engine
+import hdd_model
+import request_log
+import sampler
+import settings
+import ssd_model
+import Trace
+from metrics import TIER_NAMES, SSD, HDD
+
+# Policies that read the 8-column RL trace format (source_trace_rl), besides every all_<tier>
+RL_FORMAT_POLICIES = ('rl_c51', 'all_ram', 'all_ssd', 'all_hdd')
+
+logger = request_log.get_logger('simulation')
+
+
+def reads_rl_format(policy: str) -> bool:
+    """True if REPLACEMENT_POLICY policy replays the 8-column RL trace format; False for the
+    legacy policies, which read DELIMITER / COLUMN_* text."""
+    policy = policy.lower()
+    return policy in RL_FORMAT_POLICIES or policy.startswith('all_')
+
+
+def make_config(base=None, **overrides) -> SimpleNamespace:
+    """Snapshot of the settings (or of ``base``) with ``overrides`` applied.
+
+    Only upper-case names are copied. Overriding a name that does not exist in the
+    base raises ValueError, which catches typos in sweep grids early.
+    """
+    base = settings if base is None else base
+    if isinstance(base, dict):
+        values = dict(base)
+    else:
+        values = {k: getattr(base, k) for k in dir(base) if k.isupper()}
+    unknown = [k for k in overrides if k not in values]
+    if unknown:
+        raise ValueError(f"Unknown setting(s): {', '.join(sorted(unknown))}")
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def run_simulation(config=None, **overrides) -> Dict:
+    """Run one simulation and return its results.
+
+    ``config`` is the settings module, a make_config() namespace or a dict of
+    settings; ``overrides`` are applied on top. Returns a dict with:
+      policy      replacement policy name
+      sim_time    simulated time at the end of the run (ns)
+      metrics     SimulationMetrics.as_dict() counters
+      latency     SimulationMetrics.latency_summary() percentiles (ns)
+      storage     Trace.get_storage_stats()
+      migration   MigrationAgentSystem.get_statistics()
+      timeseries  sampler.TimeSeriesSampler.as_arrays() columns with SAMPLER = True, else None
+      profile     PhaseProfiler.as_dict() phase timings with PROFILE = True, else None
+      checkpoints paths of the checkpoints written (CHECKPOINT_EVERY > 0), else []
+      tiers       tiers.TierSpec.as_dict() of every tier of the hierarchy, fastest first
+      hdd         hdd_model.HDDArray.stats() with HDD_MODEL = 'mechanical', else None
+      ssd         ssd_model.SSDArray.stats() (wear, write amplification, GC) with SSD_MODEL = 'internal', else None
+      models      {tier: stats} of every tier with the mechanical or internal model (TIERS), else None
+      caches      Trace.cache_stats() hit ratio and occupancy of the tier stores and caches, else None
+      devices     {'HDD': ..., 'SSD': ...} devices.load_summary() per-device utilization and imbalance of
+                  the tiers with per-device queues (DEVICE_QUEUES or an HDD/SSD model) that served
+                  requests, else None
+    With SIM_MODE = 'analytic' the supported policies are replayed by analytic.py
+    instead; storage and migration are None there.
+    """
+    if config is None or isinstance(config, dict) or overrides:
+        config = make_config(config, **overrides)
+    request_log.configure_logging(getattr(config, 'LOG_LEVEL', 'INFO'))
+
+    if getattr(config, 'SIM_MODE', 'simulate') == 'analytic':
+        if analytic.supports(config):
+            return analytic.run_analytic(config)
+        logger.warning("[SIM_MODE] '%s' has no analytic replay, simulating instead", config.REPLACEMENT_POLICY)
+
+    policy = config.REPLACEMENT_POLICY.lower()
+    rl_format = reads_rl_format(policy)
+    resume = None
+    if rl_format:
+        resume = checkpoint.resume_state(config)
+    elif getattr(config, 'RESUME_FROM', None) or getattr(config, 'CHECKPOINT_EVERY', 0):
+        logger.warning("[CHECKPOINT] '%s' reads the legacy trace format, checkpoints are not supported",
+                       config.REPLACEMENT_POLICY)
+
+    Environment, Resource = engine.get_backend(getattr(config, 'SIM_ENGINE', None))
+    env = Environment(initial_time=resume['now']) if resume is not None else Environment()
+    concurrent_access_hdd = Resource(env, capacity=config.NUMBER_HDD)
+    concurrent_access_ssd = Resource(env, capacity=config.NUMBER_SSD)
+    trace = Trace.Trace(env, concurrent_access_hdd, concurrent_access_ssd, config=config)
+    if resume is not None:
+        checkpoint.restore(trace, resume)
+    elif not rl_format:
+        trace.checkpointer = None
+
+    # Choose trace format based on replacement policy
+    if rl_format:
+        # These policies use the new trace format: timestamp, operation, LBA, block_size, seq/rand, inter_arrival, service_time, idle_time
+        env.process(trace.source_trace_rl(file_path=config.FILE_PATH))
+    else:
+        # Legacy policies use old format: timestamp, id, size, type
+        env.process(trace.source_trace(config.DELIMITER, config.COLUMN_ID, config.COLUMN_TIMESTAMP, config.COLUMN_SIZE_FILE,
+                                       config.COLUMN_TYPE_REQUEST, file_path=config.FILE_PATH))
+    series = None
+    if getattr(config, 'SAMPLER', False):
+        series = sampler.TimeSeriesSampler(env, trace,
+                                           interval_ns=config.SAMPLER_INTERVAL * sampler.SECOND_TO_NANOSECOND,
+                                           capacity=config.SAMPLER_CAPACITY)
+    cprofile_path = getattr(config, 'PROFILE_CPROFILE', None)
+    cprof = cProfile.Profile() if cprofile_path else None
+    t0 = perf_counter_ns()
+    try:
+        if cprof is not None:
+            cprof.enable()
+        if series is not None:
+            series.run()
+        else:
+            env.run()
+    finally:
+        if cprof is not None:
+            cprof.disable()
+            cprof.dump_stats(cprofile_path)
+        trace.request_log.close()
+    run_ns = perf_counter_ns() - t0
+
+    trace.agent_system.shutdown()
+
+    # Print storage status after simulation completes
+    logger.info("\n" + "="*80)
+    trace.print_storage_status()
+    logger.info("="*80 + "\n")
+
+    device_load, model_stats = {}, {}
+    for tier, array in trace.tier_devices.items():
+        load = array.device_load()
+        if load:
+            # The internal model's busy time is die time; a drive is fully used with all dies busy
+            device_load[tier] = devices.load_summary(load, array.n_devices, env.now, getattr(array, 'n_dies', 1))
+        if isinstance(array, (hdd_model.HDDArray, ssd_model.SSDArray)):
+            model_stats[tier] = array.stats()
+    for tier, load in device_load.items():
+        logger.info("[DEVICES] %s: %d of %d devices used, utilization mean %.4g%% max %.4g%% (device %s), "
+                    "imbalance %.2f", tier, load['devices_used'], load['devices'], load['mean_utilization'] * 100,
+                    load['max_utilization'] * 100, load['busiest'], load['imbalance'])
+    for tier, stats in model_stats.items():
+        array = trace.tier_devices[tier]
+        if isinstance(array, hdd_model.HDDArray):
+            logger.info("[%s] %d requests on %d drives, %.1f%% sequential (%s scheduling)", tier, stats['served'],
+                        stats['devices_used'], stats['sequential_ratio'] * 100, array.scheduler)
+        else:
+            logger.info("[%s] %.1f MB written by the host, %.1f MB to NAND (WA %.2f), %d GC stalls (%.3f s)", tier,
+                        stats['host_bytes_written'] / 1e6, stats['nand_bytes_written'] / 1e6,
+                        stats['write_amplification'], stats['gc_stalls'], stats['gc_stall_s'])
+    if trace.profiler is not None:
+        logger.info(trace.profiler.format_breakdown(run_ns))
+    if cprof is not None:
+        logger.info("[PROFILE] cProfile statistics written to %s", cprofile_path)
+
+    if series is not None:
+        if series.dropped:
+            logger.warning("[SAMPLER] Ring full, oldest %d of %d samples overwritten (raise SAMPLER_CAPACITY)",
+                           series.dropped, series.samples)
+        if getattr(config, 'SAMPLER_PATH', None):
+            series.dump(config.SAMPLER_PATH)
+            logger.info("[SAMPLER] %d samples written to %s", min(series.samples, series.capacity),
+                        config.SAMPLER_PATH)
+
+    hdd_array, ssd_array = trace.tier_devices.get(TIER_NAMES[HDD]), trace.tier_devices.get(TIER_NAMES[SSD])
+    return {
+        'policy': trace.replacement_policy,
+        'sim_time': env.now,
+        'metrics': trace.metrics.as_dict(),
+        'latency': trace.metrics.latency_summary(),
+        'storage': trace.get_storage_stats(),
+        'migration': trace.agent_system.get_statistics(),
+        'timeseries': series.as_arrays() if series is not None else None,
+        'profile': trace.profiler.as_dict(run_ns) if trace.profiler is not None else None,
+        'checkpoints': trace.checkpointer.saved if trace.checkpointer is not None else [],
+        'tiers': [spec.as_dict() for spec in trace.tiers],
+        'hdd': model_stats.get(TIER_NAMES[HDD]) if isinstance(hdd_array, hdd_model.HDDArray) else None,
+        'ssd': model_stats.get(TIER_NAMES[SSD]) if isinstance(ssd_array, ssd_model.SSDArray) else None,
+        'models': model_stats or None,
+        'caches': trace.cache_stats() or None,
+        'devices': device_load or None,
+    }
+
+
+LATENCY_COLUMNS = ('mean', 'p50', 'p90', 'p99', 'p99.9', 'max')
+
+
+def format_latency(latency: Dict) -> str:
+    """Per tier/op percentile table (us) of total latency, queue wait and service time."""
+    ns_to_us = 1 / float(1000)
+    lines = ['# Latency Percentiles [us] (total = queue wait + service)',
+             'Tier/Op            count ' + ''.join(f'{c:>12}' for c in LATENCY_COLUMNS)]
+    for tier, ops in latency.items():
+        for op, parts in ops.items():
+            for i, (part, label) in enumerate((('latency', 'total'), ('wait', 'wait'), ('service', 'service'))):
+                stats = parts[part]
+                head = f'{tier} {op} {label}' if i == 0 else f'  {label}'
+                count = str(stats['count']) if i == 0 else ''
+                lines.append(f'{head:<16}{count:>8} '
+                             + ''.join(f'{stats[c] * ns_to_us:>12.3f}' for c in LATENCY_COLUMNS))
+    if len(lines) == 2:
+        lines.append('No requests')
+    return '\n'.join(lines)
+
+
+def format_caches(caches: Dict) -> str:
+    """Hit ratio and occupancy of each tier store / cache, with its eviction policy."""
+    lines = ['# Cache Hit Ratio (hits / lookups)']
+    for name, stats in caches.items():
+        lines.append(f"{name + ' (' + stats['policy'] + ')':<28} {stats['hits']:>10} hits {stats['misses']:>10} misses "
+                     f"{stats['hit_ratio'] * 100:>8.2f}%   {stats['files']} files, "
+                     f"{stats['used_bytes'] / 1e9:.4g} of {stats['capacity_bytes'] / 1e9:.4g} GB")
+        if 'admitted' in stats:
+            lines.append(f"  admission: {stats['window_hits']} window hits, {stats['admitted']} admitted, "
+                         f"{stats['rejected']} rejected, sketch {stats['sketch_bytes'] / 1e6:.3g} MB "
+                         f"aged {stats['sketch_resets']} times")
+        if 'bypassed' in stats:
+            lines.append(f"  offline optimum (Belady MIN, {stats['bypassed']} misses bypassed): upper bound of this "
+                         f"cache's hit ratio under ssd_caching / f4 with any EVICTION_POLICY or SSD_ADMISSION")
+    return '\n'.join(lines)
+
+
+DEVICE_LOAD_TOP = 5
+
+
+def format_device_load(device_load: Dict) -> str:
+    """Per-tier device utilization, imbalance and busiest devices."""
+    lines = ['# Device Load (utilization = busy time / simulated time)']
+    for tier, load in device_load.items():
+        lines.append(f"{tier}: {load['devices_used']} of {load['devices']} devices used, "
+                     f"{load['requests']} requests, utilization mean {load['mean_utilization'] * 100:.4g}% "
+                     f"max {load['max_utilization'] * 100:.4g}%, imbalance (max / mean) {load['imbalance']:.2f}")
+        per_device = load['per_device']
+        for device in sorted(per_device, key=lambda d: -per_device[d]['utilization'])[:DEVICE_LOAD_TOP]:
+            lines.append(f"  device {device:<8} {per_device[device]['requests']:>10} requests "
+                         f"{per_device[device]['utilization'] * 100:>10.4g}%")
+    return '\n'.join(lines)
+
+
+# Tiers whose average served time the original summary computes from reads only
+LEGACY_AVERAGE_TIERS = ('SSD', 'HDD')
+
+
+def summary_labels(name: str):
+    """(counter label, served-time label) of a tier, in the original wording for RAM / SSD / HDD."""
+    if name == 'RAM':
+        return 'RAM', 'RAM tier'
+    if name in LEGACY_AVERAGE_TIERS:
+        return f'{name}s tier', f'{name}s tier'
+    return f'{name} tier', f'{name} tier'
+
+
+def summary_line(label: str, value, unit: str = '') -> str:
+    return label.ljust(35) + ' ' + str(value) + unit + '\n'
+
+
+def format_summary(results: Dict) -> str:
+    """Text summary of a run, as written to summary_migration_info.txt."""
+    m = results['metrics']
+    latency = results.get('latency')
+    migration_stats = results['migration']
+
+    ms_to_seconds = 1 / float(1000)  # Convert milliseconds to seconds
+    seconds_to_hours = 1 / float(3600)  # Convert seconds to hours
+    tier_names = [tier['name'] for tier in results['tiers']] if results.get('tiers') else TIER_NAMES
+    counts, totals, averages = [], [], []
+    for name in tier_names:
+        key = name.lower()
+        reads, writes, served_time = m['reads_' + key], m['writes_' + key], m[key + '_served_time']
+        count_label, time_label = summary_labels(name)
+        # The original summary averages the SSD and HDD tiers only when they saw reads
+        avg_served_time = 0
+        if (reads if name in LEGACY_AVERAGE_TIERS else reads + writes) > 0:
+            avg_served_time = round(served_time / float(reads + writes), 5)
+        # Convert to seconds and hours
+        total_served_time_hour = round(round(served_time * ms_to_seconds, 5) * seconds_to_hours, 5)
+        avg_served_time_hour = round(round(avg_served_time * ms_to_seconds, 5) * seconds_to_hours, 5)
+        counts.append(summary_line(f'Numbers of Reads in {count_label}:', reads))
+        counts.append(summary_line(f'Numbers of Writes in {count_label}:', writes))
+        totals.append(summary_line(f'Total Served Time in {time_label}:', total_served_time_hour, ' [h]'))
+        averages.append(summary_line(f'Average Served Time in {time_label}:', avg_served_time_hour, ' [h]'))
+
+    summary = "Total of operations at file's traces:  " + str(m['total_operations']) + '\n'
+    summary = summary + ''.join(counts + totals + averages)
+
+    # Data Migration Statistics (LBA-based)
+    if migration_stats is None:
+        summary = summary + '\n# Data Migration Statistics (LBA-based)\nNot simulated (SIM_MODE = analytic)'
+        return summary + '\n\n' + format_latency(latency) if latency is not None else summary
+    summary = summary + '\n# Data Migration Statistics (LBA-based)\n'
+    summary = summary + 'Total LBAs Tracked:                 ' + str(migration_stats['total_lbas_tracked']) + '\n'
+    summary = summary + 'Hot LBAs (access >= 5):             ' + str(migration_stats['hot_lbas']) + '\n'
+    summary = summary + 'Cold LBAs (access <= 1):            ' + str(migration_stats['cold_lbas']) + '\n'
+    summary = summary + 'Total LBA Operations:               ' + str(migration_stats['total_lba_operations']) + '\n'
+    summary = summary + 'LBAs Migrated:                      ' + str(migration_stats['lbas_migrated']) + '\n'
+    summary = summary + 'Total Migrations Across LBAs:       ' + str(migration_stats['total_migrations_across_lbas']) + '\n'
+    summary = summary + 'Migrations Enqueued:                ' + str(migration_stats['migrations_enqueued']) + '\n'
+    summary = summary + 'Migrations Completed:               ' + str(migration_stats['migrations_completed']) + '\n'
+    summary = summary + 'Total I/O Requests:                 ' + str(migration_stats['total_requests']) + '\n'
+    summary = summary + 'Avg Reward:                         ' + str(round(migration_stats['avg_reward'], 5)) + '\n'
+    summary = summary + 'Migration Queue Size:               ' + str(migration_stats['queue_size']) + '\n'
+    summary = summary + 'Queue Full:                         ' + str(migration_stats['queue_full'])
+
+    # Tail latencies, after the original sections so their line layout is unchanged
+    if latency is not None:
+        summary = summary + '\n\n' + format_latency(latency)
+    if results.get('caches'):
+        summary = summary + '\n\n' + format_caches(results['caches'])
+    if results.get('devices'):
+        summary = summary + '\n\n' + format_device_load(results['devices'])
+    return summary
@@ -0,0 +1,207 @@
+"""ssd_model.py
+
+SSD internal model (SSD_MODEL = 'internal'), used by Trace instead of the flat
+size / transfer-rate service time of the SSD tier.
+
+The tier's SSD_CAPACITY_BYTES is spread over NUMBER_SSD drives; requests are placed
+on the drives (split across stripe units) by DEVICE_LAYOUT (devices.py). Each drive has SSD_CHANNELS channels of SSD_DIES_PER_CHANNEL
+dies; a request is split into SSD_PAGE_BYTES pages striped over the dies, starting at
+the die of its first page. A page occupies its die for
+
+  read     SSD_READ_US (array read) + page / SSD_CHANNEL_MBPS (channel transfer)
+  write    page / SSD_CHANNEL_MBPS + SSD_WRITE_US (program) + foreground GC, if any
+
+and waits for the die to be free first (dies serve pages in arrival order). The
+request finishes with its last page, so large requests use the dies in parallel and
+small random ones queue on individual dies.
+
+Garbage collection: with the tier a fraction u of full (Trace's used SSD bytes plus
+SSD_PREFILL of already-present data) and SSD_OVERPROVISION spare area, the physical
+utilization is u / (1 + overprovision) and every byte the host writes makes GC
+relocate WA - 1 more, with the greedy-GC write amplification
+
+  WA = (1 + s) / (2 s),   s = 1 - u / (1 + overprovision)
+
+(1 on an empty drive, about 8 when full with 7% spare). Relocation work is queued as
+GC debt, paid back in the background at SSD_GC_MBPS; when writes arrive faster than
+that and the debt exceeds the spare area, the excess is relocated in the foreground:
+the writing die stalls for a page read and program per relocated page. Host and NAND
+(host + relocated) bytes written are counted per drive for wear.
+
+    ssd = SSDArray(env, config)
+    arrived, started, finished = yield from layout.route(env, ssd.serve, lba, size_bytes, is_read, is_seq, fullness)
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Tuple
+
+try:
+    from settings import (SSD_CHANNELS, SSD_DIES_PER_CHANNEL, SSD_PAGE_BYTES, SSD_READ_US, SSD_WRITE_US,
+                          SSD_CHANNEL_MBPS, SSD_OVERPROVISION, SSD_GC_MBPS, SSD_PREFILL)
+except ImportError:
+    SSD_CHANNELS = 8
+    SSD_DIES_PER_CHANNEL = 4
+    SSD_PAGE_BYTES = 16384
+    SSD_READ_US = 60.0
+    SSD_WRITE_US = 500.0
+    SSD_CHANNEL_MBPS = 800.0
+    SSD_OVERPROVISION = 0.07
+    SSD_GC_MBPS = 200.0
+    SSD_PREFILL = 0.0
+
+SECTOR_BYTES = 512
+SECOND_TO_NANOSECOND = 1000 * 1000 * 1000
+MICROSECOND_TO_NANOSECOND = 1000
+
+SSD_MODELS = ('flat', 'internal')
+
+
+def write_amplification(fullness: float, overprovision: float) -> float:
+    """Greedy-GC write amplification at ``fullness`` (0..1) of the user capacity."""
+    spare = 1.0 - min(max(fullness, 0.0), 1.0) / (1.0 + overprovision)
+    spare = max(spare, 1e-3)
+    return (1.0 + spare) / (2.0 * spare)
+
+
+class SSDDrive:
+    """Die timelines, GC debt and wear counters of one drive."""
+
+    def __init__(self, n_dies: int) -> None:
+        self.die_free = [0.0] * n_dies    # time each die finishes its queued pages
+        self.gc_debt = 0.0                # pages still to relocate
+        self.gc_time = 0.0                # time gc_debt was last paid down
+        self.host_bytes_written = 0
+        self.nand_bytes_written = 0.0
+        self.gc_stalls = 0
+        self.gc_stall_ns = 0.0
+        self.served = 0
+        self.busy_ns = 0.0                # die time, summed over the dies
+
+
+class SSDArray:
+    """NUMBER_SSD drives sharing SSD_CAPACITY_BYTES; drives are created on first access."""
+
+    def __init__(self, env, config, n_devices: int = None, capacity_bytes: int = None) -> None:
+        # n_devices and capacity of another tier than the SSD one (tiers.py)
+        self.env = env
+        self.n_devices = max(int(config.NUMBER_SSD if n_devices is None else n_devices), 1)
+        capacity_bytes = config.SSD_CAPACITY_BYTES if capacity_bytes is None else capacity_bytes
+        self.drive_sectors = max(int(capacity_bytes) // self.n_devices // SECTOR_BYTES, 1)
+        self.n_dies = max(int(getattr(config, 'SSD_CHANNELS', SSD_CHANNELS)), 1) * \
+            max(int(getattr(config, 'SSD_DIES_PER_CHANNEL', SSD_DIES_PER_CHANNEL)), 1)
+        self.page_bytes = max(int(getattr(config, 'SSD_PAGE_BYTES', SSD_PAGE_BYTES)), SECTOR_BYTES)
+        self.read_ns = getattr(config, 'SSD_READ_US', SSD_READ_US) * MICROSECOND_TO_NANOSECOND
+        self.write_ns = getattr(config, 'SSD_WRITE_US', SSD_WRITE_US) * MICROSECOND_TO_NANOSECOND
+        mb_to_byte = 1024 * 1024
+        self.channel_rate = getattr(config, 'SSD_CHANNEL_MBPS', SSD_CHANNEL_MBPS) * mb_to_byte
+        self.overprovision = getattr(config, 'SSD_OVERPROVISION', SSD_OVERPROVISION)
+        self.prefill = getattr(config, 'SSD_PREFILL', SSD_PREFILL)
+        self.gc_pages_per_ns = getattr(config, 'SSD_GC_MBPS', SSD_GC_MBPS) * mb_to_byte / self.page_bytes / SECOND_TO_NANOSECOND
+        # Foreground GC starts once the debt would use up the drive's spare area
+        self.spare_pages = max(self.drive_sectors * SECTOR_BYTES * self.overprovision / self.page_bytes, 1.0)
+        self.relocate_ns = self.read_ns + self.write_ns + 2 * self.page_bytes / self.channel_rate * SECOND_TO_NANOSECOND
+        self.drives: Dict[int, SSDDrive] = {}
+        self.in_flight: Dict[int, float] = {}    # request number -> start time (sampler)
+        self._requests = 0
+
+    # ------------------------------------------------------------------
+    # State (sampler, results)
+    # ------------------------------------------------------------------
+
+    @property
+    def queued(self) -> int:
+        now = self.env.now
+        return sum(1 for start in self.in_flight.values() if start > now)
+
+    @property
+    def busy(self) -> int:
+        now = self.env.now
+        return sum(1 for drive in self.drives.values() for t in drive.die_free if t > now)
+
+    def stats(self) -> Dict:
+        drives = self.drives.values()
+        host = sum(d.host_bytes_written for d in drives)
+        nand = sum(d.nand_bytes_written for d in drives)
+        capacity = self.drive_sectors * SECTOR_BYTES
+        return {'devices_used': len(self.drives), 'host_bytes_written': host, 'nand_bytes_written': nand,
+                'write_amplification': nand / host if host else 1.0,
+                'drive_writes': max((d.nand_bytes_written / capacity for d in drives), default=0.0),
+                'gc_stalls': sum(d.gc_stalls for d in drives),
+                'gc_stall_s': sum(d.gc_stall_ns for d in drives) / SECOND_TO_NANOSECOND}
+
+    def device_state(self) -> Dict[int, SSDDrive]:
+        return self.drives
+
+    def restore_devices(self, drives: Dict[int, SSDDrive]) -> None:
+        self.drives = drives
+
+    def device_load(self) -> Dict[int, Tuple[int, float]]:
+        """{drive: (requests, die time)}; divide by n_dies for the drive's utilization."""
+        return {index: (d.served, d.busy_ns) for index, d in self.drives.items()}
+
+    # ------------------------------------------------------------------
+    # Service time
+    # ------------------------------------------------------------------
+
+    def _gc(self, drive: SSDDrive, now: float, size_bytes: float, fullness: float) -> float:
+        """Add the relocation work caused by writing ``size_bytes``; return the foreground stall (ns)."""
+        drive.gc_debt = max(drive.gc_debt - (now - drive.gc_time) * self.gc_pages_per_ns, 0.0)
+        drive.gc_time = now
+        extra = (write_amplification(fullness, self.overprovision) - 1.0) * size_bytes
+        drive.gc_debt += extra / self.page_bytes
+        drive.nand_bytes_written += extra
+        excess = drive.gc_debt - self.spare_pages
+        if excess <= 0:
+            return 0.0
+        drive.gc_debt = self.spare_pages
+        drive.gc_stalls += 1
+        stall = excess * self.relocate_ns
+        drive.gc_stall_ns += stall
+        return stall
+
+    def schedule(self, device: int, offset: int, size_bytes: float, is_read: bool, fullness: float, now: float):
+        """Reserve the dies of drive ``device`` for one request at sector ``offset`` arriving at
+        ``now``; return its (start, finish) times."""
+        drive = self.drives.get(device)
+        if drive is None:
+            drive = self.drives[device] = SSDDrive(self.n_dies)
+        page_bytes = self.page_bytes
+        offset = (offset % self.drive_sectors) * SECTOR_BYTES
+        pages = max(int(math.ceil((offset % page_bytes + size_bytes) / page_bytes)), 1)
+        first = offset // page_bytes
+        transfer = min(size_bytes, page_bytes) / self.channel_rate * SECOND_TO_NANOSECOND
+        service = transfer + (self.read_ns if is_read else self.write_ns)
+        stall = 0.0
+        if not is_read:
+            size_b = int(size_bytes)
+            drive.host_bytes_written += size_b
+            drive.nand_bytes_written += size_b
+            stall = self._gc(drive, now, size_bytes, fullness)
+        die_free = drive.die_free
+        n_dies = self.n_dies
+        start = finish = None
+        for k in range(pages):
+            die = (first + k) % n_dies
+            s = max(now, die_free[die])
+            f = s + service + (stall if k == 0 else 0.0)
+            die_free[die] = f
+            drive.busy_ns += f - s
+            start = s if start is None or s < start else start
+            finish = f if finish is None or f > finish else finish
+        drive.served += 1
+        return start, finish
+
+    def serve(self, device: int, offset: int, size_bytes: float, is_read: bool, is_seq: bool = False,
+              fullness: float = 0.0):
+        """Serve one request on drive ``device``; a generator returning (arrived, started, finished)."""
+        env = self.env
+        arrived = env.now
+        started, finished = self.schedule(device, offset, size_bytes, is_read, min(fullness + self.prefill, 1.0), arrived)
+        self._requests += 1
+        key = self._requests
+        self.in_flight[key] = started
+        yield env.timeout(int(finished - arrived))
+        del self.in_flight[key]
+        return arrived, started, env.now
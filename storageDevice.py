@@ -1,35 +1,44 @@
-from replacementPolicy import LRUCache
+import eviction
 
 class Ram:
-    def __init__(self, capacity_bytes=1342177280, block_size=4):
+    def __init__(self, capacity_bytes=1342177280, block_size=4, eviction_policy='LRU', cache=None):
         """
         Initialize RAM cache
         :param capacity_bytes: Maximum storage capacity in bytes
         :param block_size: Block size in bytes
+        :param eviction_policy: Victim selection when full, an EVICTION_POLICY name (eviction.py)
+        :param cache: An eviction engine to use instead, e.g. belady.BeladyEviction of capacity_bytes
         """
-        self.capacity_bytes = capacity_bytes
         self.block_size = block_size
-        self.used_bytes = 0
-        self.data_cache = {}  # Store file_id -> size mapping
+        self.cache = cache if cache is not None else eviction.make_eviction(eviction_policy, capacity_bytes)
+
+    # Capacity, usage and the file_id -> size mapping live in the eviction engine
+    @property
+    def capacity_bytes(self):
+        return self.cache.capacity_bytes
+
+    @capacity_bytes.setter
+    def capacity_bytes(self, value):
+        self.cache.capacity_bytes = value
+
+    @property
+    def used_bytes(self):
+        return self.cache.used_bytes
+
+    @property
+    def data_cache(self):
+        return self.cache.files
 
     def get_data(self, key):
-        return self.data_cache.get(key)
+        return self.cache.lookup(key)
 
     def set_data(self, key, size_bytes):
-        """Store file in RAM if space available"""
-        if key not in self.data_cache:
-            if self.used_bytes + size_bytes <= self.capacity_bytes:
-                self.data_cache[key] = size_bytes
-                self.used_bytes += size_bytes
-                return True
-            else:
-                return False  # Not enough space
+        """Store file in RAM, evicting by the eviction policy if needed"""
+        self.cache.admit(key, size_bytes)
         return True
 
     def delete_data(self, data_key):
-        if data_key in self.data_cache:
-            self.used_bytes -= self.data_cache[data_key]
-            del self.data_cache[data_key]
+        self.cache.remove(data_key)
 
     def get_available_space(self):
         return self.capacity_bytes - self.used_bytes
@@ -75,47 +84,77 @@ class HardDiskDrive:
 
 class SolidStateDrive:
 
-    def __init__(self, capacity_bytes=181555200, block_size=128):
+    def __init__(self, capacity_bytes=181555200, block_size=128, eviction_policy='LRU', admission=None, cache=None):
         """
         Initialize SSD cache
         :param capacity_bytes: Maximum storage capacity in bytes
         :param block_size: Block size in bytes
+        :param eviction_policy: Victim selection when full, an EVICTION_POLICY name (eviction.py)
+        :param admission: admission.TinyLFUAdmission deciding which missed files enter the cache;
+            its window takes its share of capacity_bytes (None: every file enters)
+        :param cache: An eviction engine to use instead, e.g. belady.BeladyEviction of capacity_bytes
         """
-        self.capacity_bytes = capacity_bytes
         self.block_size = block_size
-        self.used_bytes = 0
-        self.data_cache = {}  # Store file_id -> size mapping
+        self.admission = admission
+        window_bytes = admission.window_bytes if admission is not None else 0
+        self.cache = (cache if cache is not None
+                      else eviction.make_eviction(eviction_policy, capacity_bytes - window_bytes))
+
+    # Capacity, usage and the file_id -> size mapping live in the eviction engine (and the
+    # admission window)
+    @property
+    def capacity_bytes(self):
+        return self.cache.capacity_bytes + (self.admission.window_bytes if self.admission is not None else 0)
+
+    @capacity_bytes.setter
+    def capacity_bytes(self, value):
+        self.cache.capacity_bytes = value - (self.admission.window_bytes if self.admission is not None else 0)
+
+    @property
+    def used_bytes(self):
+        return self.cache.used_bytes + (self.admission.window_used if self.admission is not None else 0)
+
+    @property
+    def data_cache(self):
+        return self.cache.files
+
+    def __contains__(self, key):
+        return key in self.cache or (self.admission is not None and key in self.admission.window)
 
     def get_data(self, key):
-        return self.data_cache.get(key)
+        if self.admission is None:
+            return self.cache.lookup(key)
+        self.admission.record(key)
+        size = self.admission.lookup(key)
+        return size if size is not None else self.cache.lookup(key)
 
     def set_data(self, key, size_bytes):
-        """Store file in SSD if space available, evict LRU if needed"""
-        if key not in self.data_cache:
-            if self.used_bytes + size_bytes <= self.capacity_bytes:
-                self.data_cache[key] = size_bytes
-                self.used_bytes += size_bytes
-                return True
-            else:
-                # Need to evict - remove least recently used
-                if self.data_cache:  # If cache not empty
-                    lru_key = next(iter(self.data_cache))  # Get first (oldest) key
-                    self.used_bytes -= self.data_cache[lru_key]
-                    del self.data_cache[lru_key]
-                    # Now add the new data
-                    self.data_cache[key] = size_bytes
-                    self.used_bytes += size_bytes
-                    return True
-                return False
+        """Store file in SSD, evicting by the eviction policy if needed (through the admission window if any)"""
+        if self.admission is None:
+            self.cache.admit(key, size_bytes)
+        else:
+            self.admission.offer(self.cache, key, size_bytes)
         return True
 
     def delete_data(self, data_key):
-        if data_key in self.data_cache:
-            self.used_bytes -= self.data_cache[data_key]
-            del self.data_cache[data_key]
+        self.cache.remove(data_key)
 
     def get_available_space(self):
         return self.capacity_bytes - self.used_bytes
 
     def get_usage_percentage(self):
         return (self.used_bytes / self.capacity_bytes) * 100
+
+    def stats(self):
+        """eviction.EvictionEngine.stats() of the cache, admission window hits and decisions included"""
+        stats = self.cache.stats()
+        if self.admission is not None:
+            stats.update(self.admission.stats())
+            stats['policy'] += '+TinyLFU'
+            stats['hits'] += stats['window_hits']
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = stats['hits'] / float(lookups) if lookups else 0.0
+            stats['files'] += stats['window_files']
+            stats['used_bytes'] += stats['window_bytes']
+            stats['capacity_bytes'] = self.capacity_bytes
+        return stats
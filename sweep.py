@@ -0,0 +1,167 @@
+"""sweep.py
+
+Parameter sweeps: run the simulator over a grid of settings in a process pool.
+
+A grid maps settings names to lists of values; every combination is one run:
+
+    grid = {
+        'REPLACEMENT_POLICY': ['all_hdd', 'all_ssd', 'rl_c51'],
+        'SSD_CAPACITY_BYTES': [50 * 2**30, 100 * 2**30],
+        'NUMBER_SSD': [2, 4],
+    }
+    rows = run_sweep(grid, workers=8)
+    write_table(rows, 'sweep_results.csv')
+
+The trace is parsed once, in the parent, into its columnar cache (trace_cache.py);
+every worker running an 8-column policy (rl_c51, all_*) replays the same
+memory-mapped columns read-only, so the page cache holds one copy for all workers
+and no worker re-parses text. The legacy policies (hashed, ssd_caching, f4, ...)
+read the text trace itself with DELIMITER / COLUMN_*. Worker stdout (the
+per-request simulator log) is discarded and torch is limited to one thread per
+worker so points do not oversubscribe the cores.
+
+Usage:
+  python sweep.py grid.json                      # all cores, sweep_results.csv
+  python sweep.py grid.json 8 results.csv
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import trace_cache
+from simulation import make_config, reads_rl_format, run_simulation
+
+# Migration statistics copied into each result row
+MIGRATION_COLUMNS = ('migrations_enqueued', 'migrations_completed', 'avg_reward')
+
+
+def expand_grid(grid: Dict[str, List]) -> List[Dict]:
+    """All combinations of a {setting: [values]} grid, in key order."""
+    keys = list(grid)
+    for k in keys:
+        if not isinstance(grid[k], (list, tuple)):
+            grid[k] = [grid[k]]
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def _shared_trace(base: Dict) -> Dict:
+    """Point FILE_PATH at a columnar cache built (or reused) once for all workers."""
+    path = base.get('FILE_PATH')
+    if path in (None, '-') or trace_cache.is_cache(path) or not os.path.isfile(path):
+        return base
+    cache = trace_cache.load_cache(path, build=True)
+    if cache is None:
+        return base
+    return dict(base, FILE_PATH=cache.path)
+
+
+def _run_point(index: int, point: Dict, base: Dict, seed: Optional[int]) -> Dict:
+    """Worker: run one grid point and return its result row."""
+    try:
+        import torch
+        torch.set_num_threads(1)
+        if seed is not None:
+            torch.manual_seed(seed)
+    except ImportError:
+        pass
+    if seed is not None:
+        random.seed(seed)
+
+    row = {'point': index}
+    row.update(point)
+    start = time.time()
+    try:
+        config = make_config(base, **point)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = run_simulation(config)
+    except Exception as e:   # one failing point must not abort the sweep
+        row['error'] = f"{type(e).__name__}: {e}"
+        return row
+    row.update(results['metrics'])
+    for key in MIGRATION_COLUMNS:
+        row[key] = (results['migration'] or {}).get(key)
+    for name, stats in (results.get('caches') or {}).items():
+        row[name.lower().replace(' ', '_') + '_hit_ratio'] = stats['hit_ratio']
+    row['sim_time'] = results['sim_time']
+    row['wall_s'] = round(time.time() - start, 3)
+    return row
+
+
+def run_sweep(grid: Dict[str, List], base=None, workers: Optional[int] = None,
+              seed: Optional[int] = None, share_trace: bool = True) -> List[Dict]:
+    """Run every grid point and return the result rows in grid order.
+
+    ``base`` is the configuration the grid is applied to (default: settings.py), as
+    for simulation.make_config(). With ``seed`` every point starts from the same
+    random/torch seed, so rl_c51 points are reproducible.
+    """
+    base = vars(make_config(base))
+    points = expand_grid(dict(grid))
+    for point in points:
+        make_config(base, **point)   # reject unknown setting names before starting workers
+
+    workers = min(workers or os.cpu_count() or 1, len(points)) or 1
+    if workers > 1:
+        # Per-request lines would be discarded anyway; skip producing them
+        if 'REQUEST_LOG' not in grid:
+            base['REQUEST_LOG'] = 'off'
+        # Parallel trace parsing inside a worker would nest pools
+        base['TRACE_PARSE_WORKERS'] = 1
+
+    # The cache holds the 8-column format; legacy policies keep parsing the text trace
+    # with DELIMITER / COLUMN_* (and f4 its zone column)
+    rl_points = [reads_rl_format(point.get('REPLACEMENT_POLICY', base['REPLACEMENT_POLICY'])) for point in points]
+    shared = base
+    if share_trace and 'FILE_PATH' not in grid and any(rl_points):
+        shared = _shared_trace(base)
+    bases = [shared if rl_point else base for rl_point in rl_points]
+
+    rows: List[Optional[Dict]] = [None] * len(points)
+    if workers == 1:
+        for i, point in enumerate(points):
+            rows[i] = _run_point(i, point, bases[i], seed)
+            print(f"[SWEEP] {i + 1}/{len(points)} done")
+        return rows
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_point, i, point, bases[i], seed): i for i, point in enumerate(points)}
+        for done, future in enumerate(as_completed(futures), 1):
+            rows[futures[future]] = future.result()
+            print(f"[SWEEP] {done}/{len(points)} done")
+    return rows
+
+
+def write_table(rows: List[Dict], path: str = 'sweep_results.csv') -> str:
+    """Merge the result rows into one CSV table (union of all columns)."""
+    columns: List[str] = []
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns.append(key)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python sweep.py <grid.json> [workers] [out.csv]")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        grid = json.load(f)
+    rows = run_sweep(grid, workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    out = write_table(rows, sys.argv[3] if len(sys.argv) > 3 else 'sweep_results.csv')
+    failed = sum(1 for row in rows if 'error' in row)
+    print(f"Wrote {out}: {len(rows)} points, {failed} failed")
@@ -0,0 +1,161 @@
+"""tiers.py
+
+Storage hierarchy of a run: an ordered list of tiers, fastest first.
+
+By default the hierarchy is the classic RAM / SSD / HDD stack built from the
+individual settings (RAM_CAPACITY_BYTES, NUMBER_SSD, READ_DATA_TRANSFER_RATE_SSD,
+SSD_MODEL, ...). With settings.TIERS it is any list of tier descriptions, e.g. a
+four-tier production stack:
+
+    TIERS = [
+        {'name': 'NVME', 'capacity_bytes': 64 * 2**30, 'read_mbps': 3000, 'write_mbps': 2000, 'devices': 8},
+        {'name': 'QLC', 'capacity_bytes': 1 * 2**40, 'read_mbps': 1500, 'write_mbps': 300, 'devices': 16,
+         'model': 'internal'},
+        {'name': 'HDD', 'read_mbps': 120, 'write_mbps': 100, 'devices': 64, 'model': 'mechanical'},
+        {'name': 'OBJECT', 'read_mbps': 100, 'write_mbps': 80, 'latency_us': 20000, 'devices': 256},
+    ]
+
+Tier keys:
+  name            tier name, used in metrics, the summary and the RL action space
+  capacity_bytes  bytes the tier holds before evicting its oldest files (omitted / None: holds
+                  everything, e.g. the backing tier)
+  read_mbps       read / write transfer rate of one device (MB/s); 0 = transfer time not
+  write_mbps      modelled (memory)
+  latency_us      fixed access latency added to every request of a 'flat' tier (us)
+  devices         number of devices serving the tier concurrently; 0 = no queueing (memory)
+  model           device service model: 'flat' (latency + size / rate), 'mechanical'
+                  (hdd_model.py) or 'internal' (ssd_model.py)
+  eviction        victim selection of a capacity-limited tier (eviction.py, default
+                  settings.EVICTION_POLICY)
+
+The RL placement agent gets one action per tier and one last-tier feature per tier
+(features.py), the migration agent promotes and demotes along the list
+(migration_agent_system.py), and metrics, the summary and the sampler report every tier.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import eviction
+import hdd_model
+import ssd_model
+from metrics import TIER_NAMES
+
+TIER_MODELS = ('flat', 'mechanical', 'internal')
+TIER_KEYS = ('name', 'capacity_bytes', 'read_mbps', 'write_mbps', 'latency_us', 'devices', 'model', 'eviction')
+
+MB_TO_BYTE = 1024 * 1024
+# Fixed RAM access time of the classic hierarchy (ns)
+RAM_LATENCY_NS = 10
+
+
+@dataclass
+class TierSpec:
+    """One tier of the hierarchy (rates in bytes/s, latency in ns)."""
+    name: str
+    capacity_bytes: Optional[int] = None
+    read_rate: float = 0.0
+    write_rate: float = 0.0
+    latency_ns: float = 0.0
+    devices: int = 0
+    model: str = 'flat'
+    eviction: str = 'LRU'
+
+    @property
+    def is_memory(self) -> bool:
+        """No devices: requests are served without queueing."""
+        return self.devices == 0
+
+    def as_dict(self) -> Dict:
+        return {'name': self.name, 'capacity_bytes': self.capacity_bytes, 'read_mbps': self.read_rate / MB_TO_BYTE,
+                'write_mbps': self.write_rate / MB_TO_BYTE, 'latency_us': self.latency_ns / 1000,
+                'devices': self.devices, 'model': self.model, 'eviction': self.eviction}
+
+    def make_store(self) -> eviction.EvictionEngine:
+        """Empty store of the files this tier holds (capacity-limited tiers only)."""
+        return eviction.make_eviction(self.eviction, self.capacity_bytes)
+
+
+def default_tiers(config) -> List[TierSpec]:
+    """The RAM / SSD / HDD hierarchy from the individual settings."""
+    hdd_model_name = getattr(config, 'HDD_MODEL', 'flat')
+    if hdd_model_name not in hdd_model.HDD_MODELS:
+        raise ValueError(f"Unknown HDD_MODEL '{hdd_model_name}' (expected one of {', '.join(hdd_model.HDD_MODELS)})")
+    ssd_model_name = getattr(config, 'SSD_MODEL', 'flat')
+    if ssd_model_name not in ssd_model.SSD_MODELS:
+        raise ValueError(f"Unknown SSD_MODEL '{ssd_model_name}' (expected one of {', '.join(ssd_model.SSD_MODELS)})")
+    policy = eviction_policy(config)
+    ram, ssd, hdd = TIER_NAMES
+    return [
+        TierSpec(ram, capacity_bytes=config.RAM_CAPACITY_BYTES, latency_ns=RAM_LATENCY_NS, eviction=policy),
+        TierSpec(ssd, capacity_bytes=config.SSD_CAPACITY_BYTES,
+                 read_rate=config.READ_DATA_TRANSFER_RATE_SSD * MB_TO_BYTE,
+                 write_rate=config.WRITE_DATA_TRANSFER_RATE_SSD * MB_TO_BYTE,
+                 devices=max(int(config.NUMBER_SSD), 1), model=ssd_model_name, eviction=policy),
+        TierSpec(hdd, read_rate=config.READ_DATA_TRANSFER_RATE_HDD * MB_TO_BYTE,
+                 write_rate=config.WRITE_DATA_TRANSFER_RATE_HDD * MB_TO_BYTE,
+                 devices=max(int(config.NUMBER_HDD), 1), model=hdd_model_name),
+    ]
+
+
+def eviction_policy(config) -> str:
+    """settings.EVICTION_POLICY, checked against the engines of eviction.py."""
+    policy = str(getattr(config, 'EVICTION_POLICY', 'LRU')).upper()
+    if policy not in eviction.EVICTION_ENGINES:
+        raise ValueError(f"Unknown EVICTION_POLICY '{policy}' "
+                         f"(expected one of {', '.join(eviction.EVICTION_ENGINES)})")
+    return policy
+
+
+def parse_tier(entry: Dict, default_eviction: str = 'LRU') -> TierSpec:
+    """TierSpec of one settings.TIERS entry."""
+    unknown = set(entry) - set(TIER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown tier key(s) {', '.join(sorted(unknown))} (expected {', '.join(TIER_KEYS)})")
+    if not entry.get('name'):
+        raise ValueError(f"Tier {entry} has no name")
+    name = str(entry['name']).upper()
+    spec = TierSpec(
+        name,
+        capacity_bytes=int(entry['capacity_bytes']) if entry.get('capacity_bytes') is not None else None,
+        read_rate=float(entry.get('read_mbps', 0.0)) * MB_TO_BYTE,
+        write_rate=float(entry.get('write_mbps', 0.0)) * MB_TO_BYTE,
+        latency_ns=float(entry.get('latency_us', 0.0)) * 1000,
+        devices=int(entry.get('devices', 1)),
+        model=entry.get('model', 'flat'),
+        eviction=str(entry.get('eviction', default_eviction)).upper(),
+    )
+    if spec.model not in TIER_MODELS:
+        raise ValueError(f"Unknown model '{spec.model}' for tier {name} (expected one of {', '.join(TIER_MODELS)})")
+    if spec.devices < 0:
+        raise ValueError(f"Tier {name} has {spec.devices} devices")
+    if spec.is_memory and spec.model != 'flat':
+        raise ValueError(f"Tier {name} has no devices, its model must be 'flat'")
+    if not spec.is_memory and (spec.read_rate <= 0 or spec.write_rate <= 0):
+        raise ValueError(f"Tier {name} has devices but no read_mbps / write_mbps")
+    if spec.eviction not in eviction.EVICTION_ENGINES:
+        raise ValueError(f"Unknown eviction '{spec.eviction}' for tier {name} "
+                         f"(expected one of {', '.join(eviction.EVICTION_ENGINES)})")
+    if spec.model == 'internal' and not spec.capacity_bytes:
+        raise ValueError(f"Tier {name} uses the 'internal' model, which needs capacity_bytes")
+    return spec
+
+
+def tier_specs(config) -> List[TierSpec]:
+    """The run's hierarchy: settings.TIERS, or the default RAM / SSD / HDD tiers."""
+    entries = getattr(config, 'TIERS', None)
+    if not entries:
+        return default_tiers(config)
+    policy = eviction_policy(config)
+    specs = [parse_tier(entry, policy) for entry in entries]
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate tier names in TIERS: {', '.join(names)}")
+    return specs
+
+
+def is_default(specs: Sequence[TierSpec]) -> bool:
+    """True for the RAM / SSD / HDD hierarchy the legacy policies are written for."""
+    return tuple(spec.name for spec in specs) == TIER_NAMES
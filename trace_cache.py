@@ -0,0 +1,218 @@
+"""trace_cache.py
+
+Columnar binary cache for MSRC ``.revised`` traces.
+
+Parsing the text trace (``line.split()`` + ``float()`` per field) dominates start-up
+on multi-GB traces, and a sweep replays the same trace dozens of times. The trace is
+converted once into one raw little-endian file per column plus a ``header.json``
+holding the row count and min/max statistics, so replays memory-map the columns and
+never touch the text again.
+
+Cache layout (``<trace>.tcache/``):
+  header.json        version, source size/mtime, row count, column dtypes, min/max stats
+  timestamp.bin      float64
+  is_read.bin        uint8    1 = read (RS), 0 = write (WS)
+  lba.bin            int64
+  block_size.bin     int64
+  is_seq.bin         uint8    1 = seq, 0 = rand
+  inter_arrival.bin  float64
+  service.bin        float64
+  idle.bin           float64
+
+Usage:
+  python trace_cache.py wdev_3.revised              # -> wdev_3.revised.tcache/
+  python trace_cache.py wdev_3.revised out.tcache
+  python trace_cache.py src1_1.revised src1_1.revised.tcache 8   # parse with 8 processes
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+import request_log
+import trace_parser
+from trace_parser import COLUMNS, TRACE_DTYPE
+
+logger = request_log.get_logger('trace_cache')
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.tcache'
+HEADER_NAME = 'header.json'
+
+
+def cache_path_for(trace_path: str) -> str:
+    """Default cache directory for a text trace."""
+    return trace_path.rstrip(os.sep) + CACHE_SUFFIX
+
+
+def is_cache(path: Optional[str]) -> bool:
+    """True if ``path`` is a trace cache directory."""
+    return bool(path) and os.path.isfile(os.path.join(path, HEADER_NAME))
+
+
+def _source_signature(trace_path: str) -> Dict:
+    st = os.stat(trace_path)
+    return {'path': os.path.abspath(trace_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def convert_trace(trace_path: str, cache_path: Optional[str] = None,
+                  chunk_lines: int = trace_parser.CHUNK_LINES, workers: int = 1) -> str:
+    """Parse a text trace once and write its columnar cache. Returns the cache path.
+
+    Rows are parsed by trace_parser in chunks and appended column by column, so memory
+    stays bounded by ``chunk_lines``; with ``workers`` > 1 the file is parsed in parallel
+    (trace_parser.parse_file_parallel) and held in memory once.
+    The cache is built in a temporary directory and renamed into place at the end.
+    """
+    cache_path = cache_path or cache_path_for(trace_path)
+    tmp_path = cache_path + '.tmp'
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    names = [name for name, _ in COLUMNS]
+    outs = [open(os.path.join(tmp_path, name + '.bin'), 'wb') for name in names]
+    stats = None
+    rows = 0
+    reads = 0
+    if workers > 1:
+        records, stats = trace_parser.parse_file_parallel(trace_path, workers, chunk_lines)
+        chunks = iter((records,))
+    else:
+        chunks = trace_parser.iter_trace(trace_path, chunk_lines)
+    try:
+        for records in chunks:
+            for j, name in enumerate(names):
+                outs[j].write(records[name].tobytes())
+            if workers <= 1:
+                stats = trace_parser.merge_stats(stats, trace_parser.column_stats(records))
+            rows += len(records)
+            reads += int(records['is_read'].sum())
+    finally:
+        for out in outs:
+            out.close()
+    if stats is None:
+        stats = trace_parser.column_stats(np.empty(0, dtype=TRACE_DTYPE))
+
+    header = {
+        'version': CACHE_VERSION,
+        'source': _source_signature(trace_path),
+        'rows': rows,
+        'reads': reads,
+        'columns': [{'name': name, 'dtype': dt} for name, dt in COLUMNS],
+        'stats': stats,
+    }
+    with open(os.path.join(tmp_path, HEADER_NAME), 'w') as f:
+        json.dump(header, f, indent=2)
+
+    if os.path.isdir(cache_path):
+        shutil.rmtree(cache_path)
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+class TraceCache:
+    """Read-only, memory-mapped view of a converted trace.
+
+    Usage:
+        cache = TraceCache('wdev_3.revised.tcache')
+        lba = cache['lba']            # np.memmap, int64
+        max_lba = cache.max('lba')
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, HEADER_NAME), 'r') as f:
+            self.header = json.load(f)
+        if self.header.get('version') != CACHE_VERSION:
+            raise ValueError(f"Unsupported trace cache version in '{path}'")
+        self.rows = int(self.header['rows'])
+        self.columns: Dict[str, np.ndarray] = {}
+        for col in self.header['columns']:
+            dtype = np.dtype(col['dtype'])
+            if self.rows == 0:
+                arr = np.empty(0, dtype=dtype)
+            else:
+                arr = np.memmap(os.path.join(path, col['name'] + '.bin'), dtype=dtype,
+                                mode='r', shape=(self.rows,))
+            self.columns[col['name']] = arr
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def min(self, name: str) -> float:
+        v = self.header['stats'][name]['min']
+        return 0.0 if v is None else v
+
+    def max(self, name: str) -> float:
+        v = self.header['stats'][name]['max']
+        return 0.0 if v is None else v
+
+    def iter_chunks(self, chunk_rows: int = trace_parser.CHUNK_LINES) -> Iterator[np.ndarray]:
+        """Yield TRACE_DTYPE record arrays of up to ``chunk_rows`` rows."""
+        for start in range(0, self.rows, chunk_rows):
+            stop = min(start + chunk_rows, self.rows)
+            out = np.empty(stop - start, dtype=TRACE_DTYPE)
+            for name in TRACE_DTYPE.names:
+                out[name] = self.columns[name][start:stop]
+            yield out
+
+    def is_fresh(self) -> bool:
+        """True if the source trace is unchanged since conversion (or is gone)."""
+        src = self.header.get('source', {})
+        path = src.get('path')
+        if not path or not os.path.exists(path):
+            return True
+        st = os.stat(path)
+        return st.st_size == src.get('size') and st.st_mtime_ns == src.get('mtime_ns')
+
+
+def load_cache(path: Optional[str], build: bool = True) -> Optional[TraceCache]:
+    """Open the cache for ``path``.
+
+    ``path`` may be a cache directory or a text trace. For a text trace the sidecar
+    ``<path>.tcache`` is reused when fresh and (re)built when ``build`` is True.
+    Returns None when no cache is available.
+    """
+    if not path:
+        return None
+    if is_cache(path):
+        return TraceCache(path)
+    if not os.path.isfile(path):
+        return None
+    sidecar = cache_path_for(path)
+    if is_cache(sidecar):
+        try:
+            cache = TraceCache(sidecar)
+            if cache.is_fresh():
+                return cache
+        except (ValueError, KeyError, json.JSONDecodeError):
+            pass
+    if not build:
+        return None
+    try:
+        convert_trace(path, sidecar)
+    except OSError as e:
+        logger.warning("[TRACE_CACHE] Could not build trace cache '%s': %s", sidecar, e)
+        return None
+    return TraceCache(sidecar)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python trace_cache.py <trace> [cache_dir] [workers]")
+        sys.exit(1)
+    out = convert_trace(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None,
+                        workers=int(sys.argv[3]) if len(sys.argv) > 3 else 1)
+    cache = TraceCache(out)
+    print(f"Wrote {out}: {len(cache)} rows, max_lba={cache.max('lba')}, "
+          f"max_block={cache.max('block_size')}, max_service={cache.max('service')}")
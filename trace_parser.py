@@ -0,0 +1,442 @@
+"""trace_parser.py
+
+Vectorized, chunked parser for MSRC ``.revised`` traces.
+
+Instead of strip/split/float per line, a chunk of lines (64K by default) is tokenized
+and converted in C by ``np.loadtxt`` into a structured array, and the op/seq columns are
+mapped to flags through their few distinct values. The result has ``TRACE_DTYPE`` rows, which
+is what the trace cache stores and what ``FeatureExtractor.iter_batches`` normalizes.
+
+Trace format (space-separated):
+  timestamp, operation(WS/RS), LBA, block_size, seq/rand, inter_arrival, service_time, idle_time
+
+Rows that are blank, comments (``#``), shorter than 8 fields or not numeric are skipped,
+the same acceptance rules as the original per-line reader.
+
+Inputs may be plain, gzip, bz2 or xz compressed (detected by magic bytes), from a file
+or from stdin; see open_trace().
+"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import warnings
+import weakref
+from itertools import islice
+from multiprocessing import resource_tracker, shared_memory
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# (column name, numpy dtype) in trace column order
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('timestamp', '<f8'),
+    ('is_read', 'u1'),
+    ('lba', '<i8'),
+    ('block_size', '<i8'),
+    ('is_seq', 'u1'),
+    ('inter_arrival', '<f8'),
+    ('service', '<f8'),
+    ('idle', '<f8'),
+)
+TRACE_DTYPE = np.dtype(list(COLUMNS))
+N_FIELDS = len(COLUMNS)
+
+READ_OPS = (b'read', b'r', b'rs', b'rr')
+CHUNK_LINES = 65536
+
+try:
+    from settings import TRACE_READ_AHEAD
+except ImportError:
+    TRACE_READ_AHEAD = True
+
+
+# Magic bytes of the compressed formats SNIA traces are shipped in
+_CODECS = (
+    ('gzip', b'\x1f\x8b', gzip.open),
+    ('bz2', b'BZh', bz2.open),
+    ('xz', b'\xfd7zXZ\x00', lzma.open),
+)
+READ_BUFFER = 1 << 22        # bytes per read from (decompressed) trace streams
+READ_AHEAD_BLOCKS = 8        # blocks queued by the background reader thread
+
+
+def detect_compression(path: Optional[str]) -> Optional[str]:
+    """'gzip', 'bz2' or 'xz' by magic bytes, None for plain files and stdin."""
+    if path in (None, '-') or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for name, magic, _ in _CODECS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+class ReadAheadReader(io.RawIOBase):
+    """Reads a stream in a background thread, READ_BUFFER bytes at a time.
+
+    zlib/bz2/lzma release the GIL while decompressing, so with this wrapper the
+    decompression of the next blocks overlaps with parsing and simulation.
+    """
+
+    def __init__(self, f: BinaryIO, block_size: int = READ_BUFFER,
+                 depth: int = READ_AHEAD_BLOCKS) -> None:
+        super().__init__()
+        self._f = f
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._pending = memoryview(b'')
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, args=(block_size,), daemon=True)
+        self._thread.start()
+
+    def _fill(self, block_size: int) -> None:
+        try:
+            while not self._stop.is_set():
+                block = self._f.read(block_size)
+                self._queue.put(block)
+                if not block:
+                    return
+        except Exception as e:   # surfaced to the reading thread
+            self._queue.put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._pending:
+            if self._eof:
+                return 0
+            block = self._queue.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                self._eof = True
+                return 0
+            self._pending = memoryview(block)
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            # Unblock the reader thread if it waits on a full queue; a thread stuck
+            # reading a pipe is left to die with the process (daemon)
+            for _ in range(50):
+                if not self._thread.is_alive():
+                    break
+                try:
+                    self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            if not self._thread.is_alive():
+                self._f.close()
+        super().close()
+
+
+def open_trace(path: Optional[str], read_ahead: Optional[bool] = None) -> BinaryIO:
+    """Open a trace for binary reading; None or '-' reads stdin.
+
+    gzip/bz2/xz input (files or stdin) is detected by magic bytes and decompressed
+    on the fly, never to disk. With read_ahead (default: for compressed input and
+    stdin) a background thread keeps the next blocks ready.
+    """
+    if path in (None, '-'):
+        head = sys.stdin.buffer.peek(6)[:6]
+        codec = next((c for c in _CODECS if head.startswith(c[1])), None)
+        # The wrappers must not close the process's stdin
+        f = _NoClose(sys.stdin.buffer)
+        if codec is not None:
+            f = codec[2](f, 'rb')
+        background = True
+    else:
+        name = detect_compression(path)
+        codec = next((c for c in _CODECS if c[0] == name), None)
+        if codec is None:
+            f = open(path, 'rb', buffering=READ_BUFFER)
+        else:
+            f = codec[2](path, 'rb')
+        background = codec is not None
+    if read_ahead is None:
+        read_ahead = TRACE_READ_AHEAD and background
+    if read_ahead:
+        return io.BufferedReader(ReadAheadReader(f), buffer_size=READ_BUFFER)
+    if isinstance(f, io.BufferedReader):
+        return f
+    return io.BufferedReader(f, buffer_size=READ_BUFFER)
+
+
+class _NoClose(io.RawIOBase):
+    """Passes reads through to a stream but leaves it open on close()."""
+
+    def __init__(self, f: BinaryIO) -> None:
+        super().__init__()
+        self._f = f
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        return self._f.readinto(b)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._f.read(size)
+
+
+# Intermediate layout handed to np.loadtxt; op and seq/rand stay as short byte strings
+_RAW_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('op', 'S8'),
+    ('lba', '<f8'),
+    ('block_size', '<f8'),
+    ('seq', 'S8'),
+    ('inter_arrival', '<f8'),
+    ('service', '<f8'),
+    ('idle', '<f8'),
+])
+
+
+def _flag(tokens: np.ndarray, accepted: Tuple[bytes, ...]) -> np.ndarray:
+    """Case-insensitive membership test; only the few distinct tokens are compared."""
+    uniq, inverse = np.unique(tokens, return_inverse=True)
+    return np.array([tok.lower() in accepted for tok in uniq], dtype=bool)[inverse]
+
+
+def _load(lines: List[bytes]) -> np.ndarray:
+    """Tokenize and convert lines in C (np.loadtxt); raises ValueError on malformed rows.
+
+    '#' is not a comment marker here: loadtxt would cut it out of the middle of a data
+    line. A line starting with '#' fails to convert, and parse_lines drops it through
+    _valid_row.
+    """
+    with warnings.catch_warnings():
+        # all-blank chunks are fine, not worth a warning
+        warnings.simplefilter('ignore', UserWarning)
+        raw = np.loadtxt(lines, dtype=_RAW_DTYPE, comments=None, usecols=range(N_FIELDS), ndmin=1)
+    out = np.empty(len(raw), dtype=TRACE_DTYPE)
+    out['timestamp'] = raw['timestamp']
+    out['is_read'] = _flag(raw['op'], READ_OPS)
+    out['lba'] = raw['lba']
+    out['block_size'] = raw['block_size']
+    out['is_seq'] = _flag(raw['seq'], (b'seq',))
+    out['inter_arrival'] = raw['inter_arrival']
+    out['service'] = raw['service']
+    out['idle'] = raw['idle']
+    return out
+
+
+def _valid_row(line: bytes) -> bool:
+    parts = line.split()
+    if len(parts) < N_FIELDS or parts[0].startswith(b'#'):
+        return False
+    try:
+        for j in (0, 2, 3, 5, 6, 7):
+            float(parts[j])
+    except ValueError:
+        return False
+    return True
+
+
+def parse_lines(lines: List[bytes]) -> np.ndarray:
+    """Parse a list of raw trace lines into a TRACE_DTYPE structured array."""
+    if not lines:
+        return np.empty(0, dtype=TRACE_DTYPE)
+    try:
+        return _load(lines)
+    except ValueError:
+        # Short or non-numeric rows somewhere in the chunk: drop them, convert the rest at once
+        rows = [line for line in lines if _valid_row(line)]
+        if not rows:
+            return np.empty(0, dtype=TRACE_DTYPE)
+        return _load(rows)
+
+
+def iter_chunks(f: BinaryIO, chunk_lines: int = CHUNK_LINES) -> Iterator[np.ndarray]:
+    """Yield TRACE_DTYPE arrays of up to ``chunk_lines`` parsed rows from a binary stream."""
+    chunk_lines = max(int(chunk_lines), 1)
+    while True:
+        lines = list(islice(f, chunk_lines))
+        if not lines:
+            return
+        records = parse_lines(lines)
+        if len(records):
+            yield records
+
+
+def iter_trace(path: Optional[str], chunk_lines: int = CHUNK_LINES) -> Iterator[np.ndarray]:
+    """Open ``path`` (None/'-' = stdin) and yield parsed chunks."""
+    f = open_trace(path)
+    try:
+        yield from iter_chunks(f, chunk_lines)
+    finally:
+        f.close()
+
+
+# ============================================================================
+# Statistics and parallel ingestion
+# ============================================================================
+
+def column_stats(records: np.ndarray) -> Dict[str, Dict[str, Optional[float]]]:
+    """Per-column min/max of a record chunk (None for an empty chunk)."""
+    stats = {}
+    for name in TRACE_DTYPE.names:
+        col = records[name]
+        if len(col):
+            stats[name] = {'min': col.min().item(), 'max': col.max().item()}
+        else:
+            stats[name] = {'min': None, 'max': None}
+    return stats
+
+
+def merge_stats(a: Optional[Dict], b: Dict) -> Dict:
+    """Reduce two column_stats() results."""
+    if a is None:
+        return b
+    merged = {}
+    for name in TRACE_DTYPE.names:
+        lo = [v for v in (a[name]['min'], b[name]['min']) if v is not None]
+        hi = [v for v in (a[name]['max'], b[name]['max']) if v is not None]
+        merged[name] = {'min': min(lo) if lo else None, 'max': max(hi) if hi else None}
+    return merged
+
+
+def split_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """Split a file into ``parts`` line-aligned (start, end) byte ranges."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    bounds = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for k in range(1, parts):
+            pos = max(size * k // parts, bounds[-1])
+            nl = mm.find(b'\n', pos)
+            if nl < 0:
+                break
+            bounds.append(nl + 1)
+    bounds.append(size)
+    return [(s, e) for s, e in zip(bounds, bounds[1:]) if e > s]
+
+
+def _count_lines(path: str, start: int, end: int) -> int:
+    """Worker: number of lines in a byte range (its last line may lack the newline)."""
+    lines = 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for pos in range(start, end, READ_BUFFER):
+            lines += mm[pos:min(pos + READ_BUFFER, end)].count(b'\n')
+        if mm[end - 1:end] != b'\n':
+            lines += 1
+    return lines
+
+
+def _parse_into(mm: mmap.mmap, start: int, lines: int, out: np.ndarray,
+                chunk_lines: int) -> Tuple[int, Optional[Dict]]:
+    """Parse ``lines`` lines from byte ``start`` of ``mm`` into ``out``, chunk_lines at a time.
+
+    Returns (rows written, their column_stats or None if there are none).
+    """
+    chunk_lines = max(int(chunk_lines), 1)
+    mm.seek(start)
+    readline = iter(mm.readline, b'')
+    n = 0
+    stats = None
+    for first in range(0, lines, chunk_lines):
+        records = parse_lines(list(islice(readline, min(chunk_lines, lines - first))))
+        if len(records):
+            out[n:n + len(records)] = records
+            n += len(records)
+            stats = merge_stats(stats, column_stats(records))
+    return n, stats
+
+
+def _parse_range(path: str, start: int, lines: int, name: str, row: int, chunk_lines: int):
+    """Worker: parse one byte range straight into its rows of the parent's shared memory.
+
+    The range owns rows [row, row + lines) of the segment; returns (rows written,
+    column_stats) so the parent can close the gaps left by skipped lines and reduce
+    the statistics without another pass.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out = np.ndarray((lines,), dtype=TRACE_DTYPE, buffer=shm.buf, offset=row * TRACE_DTYPE.itemsize)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            n, stats = _parse_into(mm, start, lines, out, chunk_lines)
+        del out
+    finally:
+        shm.close()
+    return n, stats
+
+
+def _move_rows(records: np.ndarray, src: int, dst: int, n: int, block: int) -> None:
+    """Move rows [src, src + n) down to dst in place, at most ``block`` rows buffered at a time."""
+    for i in range(0, n, block):
+        k = min(block, n - i)
+        records[dst + i:dst + i + k] = records[src + i:src + i + k]
+
+
+def parse_file_parallel(path: str, workers: Optional[int] = None,
+                        chunk_lines: int = CHUNK_LINES) -> Tuple[np.ndarray, Dict]:
+    """Parse a whole trace file across processes.
+
+    The file is split into line-aligned byte ranges and their lines are counted. The
+    parent creates one shared-memory segment with a row per line; each worker mmaps the
+    file and parses its range chunk_lines lines at a time straight into its rows, so
+    neither the range's bytes nor its records are copied whole. Rows of skipped lines
+    are closed up in place and the records returned are a view of the segment, which
+    is released with them. Workers also return per-range column min/max, reduced here,
+    so normalization needs no separate pre-scan. Returns (records, column stats).
+    """
+    workers = workers or os.cpu_count() or 1
+    if detect_compression(path) is not None:
+        # Compressed streams cannot be split by byte offset; decompress serially
+        chunks = list(iter_trace(path, chunk_lines))
+        records = np.concatenate(chunks) if chunks else np.empty(0, dtype=TRACE_DTYPE)
+        return records, column_stats(records)
+    ranges = split_ranges(path, workers)
+    if not ranges:
+        records = np.empty(0, dtype=TRACE_DTYPE)
+        return records, column_stats(records)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        lines = _count_lines(path, start, end)
+        records = np.empty(lines, dtype=TRACE_DTYPE)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            n, stats = _parse_into(mm, start, lines, records, chunk_lines)
+        return records[:n], stats or column_stats(records[:0])
+
+    # Workers must share the parent's resource tracker, otherwise each worker's own
+    # tracker unlinks the segment when the worker exits
+    resource_tracker.ensure_running()
+    with multiprocessing.Pool(len(ranges)) as pool:
+        counts = pool.starmap(_count_lines, [(path, s, e) for s, e in ranges])
+        rows = np.concatenate(([0], np.cumsum(counts))).tolist()
+        shm = shared_memory.SharedMemory(create=True, size=max(rows[-1], 1) * TRACE_DTYPE.itemsize)
+        try:
+            results = pool.starmap(_parse_range, [(path, s, lines, shm.name, row, chunk_lines)
+                                                  for (s, _), lines, row in zip(ranges, counts, rows)])
+        finally:
+            # The mapping outlives the name; the segment is freed once shm is closed
+            shm.unlink()
+
+    records = np.ndarray((rows[-1],), dtype=TRACE_DTYPE, buffer=shm.buf)
+    weakref.finalize(records, shm.close)
+    stats = None
+    pos = 0
+    for (n, part_stats), row in zip(results, rows):
+        if part_stats is not None:
+            stats = merge_stats(stats, part_stats)
+        if row != pos:
+            _move_rows(records, row, pos, n, chunk_lines)
+        pos += n
+    return records[:pos], stats or column_stats(records[:0])
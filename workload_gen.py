@@ -0,0 +1,382 @@
+"""workload_gen.py
+
+Synthetic workload generator writing MSRC ``.revised`` traces, the 8-column format
+source_trace_rl / trace_parser.py read:
+
+  timestamp, operation(WS/RS), LBA, block_size, seq/rand, inter_arrival, service_time, idle_time
+
+Requests are generated and formatted a chunk at a time with NumPy (no per-request
+Python), so memory is bounded by the chunk size and large traces stream straight to
+disk; formatting, the larger share of the work, can be spread over worker processes. A WorkloadSpec controls:
+
+  popularity     'zipf' (zipf_alpha), 'uniform' or 'hotcold' (hot_access of the requests
+                 go to the hot_fraction of the working set) over working_set extents
+  scans          each request starts a sequential scan of scan_length requests with
+                 probability scan_prob; scan requests read consecutive blocks ('seq')
+  read/write mix read_ratio
+  block sizes    block_sizes drawn with block_weights (sectors, as in the MSRC traces)
+  arrivals       'poisson' at rate requests/s, or 'bursty': alternating bursts at burst_rate
+                 and quiet periods at idle_rate, of geometric length (mean burst_length /
+                 idle_length requests)
+  service time   seek_s (random) or seq_s (sequential) plus size / bandwidth
+
+The timestamp is the running sum of the inter-arrival times and idle_time is the gap
+between the previous request's completion and this arrival (0 if it overlaps).
+Extents are spread over the LBA space by a fixed multiplicative permutation, so the
+hottest extents are not adjacent. The same spec and seed always give the same trace.
+
+    spec = WorkloadSpec(n_requests=10**7, popularity='hotcold', arrival='bursty', seed=1)
+    generate_trace('synthetic.revised', spec)
+
+Usage:
+  python workload_gen.py <out> [n_requests] [spec.json] [workers]
+  (out '-' writes to stdout, *.gz is gzip-compressed; workers format chunks in parallel)
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+SECTOR_BYTES = 512
+SECOND_TO_NANOSECOND = 1000 * 1000 * 1000
+CHUNK_REQUESTS = 1 << 20
+
+POPULARITIES = ('zipf', 'uniform', 'hotcold')
+ARRIVALS = ('poisson', 'bursty')
+
+# Multipliers for the extent permutation (rank * m mod working_set); the first one
+# coprime with the working-set size is used
+_PERMUTATION_PRIMES = (2654435761, 2246822519, 3266489917, 668265263)
+
+_PAD = 0   # fills fixed-width fields while formatting, dropped from the output
+_ZERO = ord('0')
+_POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)
+
+# Output columns: fixed-point seconds, ints, or (text if true, text if false) flags
+_FIXED_DECIMALS = 9
+_FIXED_SCALE = 10 ** _FIXED_DECIMALS
+_LINE_LAYOUT = (
+    ('timestamp', 'fixed'),
+    ('is_read', (b'RS', b'WS')),
+    ('lba', 'int'),
+    ('block_size', 'int'),
+    ('is_seq', (b'seq', b'rand')),
+    ('inter_arrival', 'fixed'),
+    ('service', 'fixed'),
+    ('idle', 'fixed'),
+)
+
+
+@dataclass
+class WorkloadSpec:
+    n_requests: int = 1_000_000
+    working_set: int = 1_000_000      # distinct extents addressed
+    lba_base: int = 0
+    popularity: str = 'zipf'          # 'zipf', 'uniform', 'hotcold'
+    zipf_alpha: float = 0.9
+    hot_fraction: float = 0.1         # hotcold: share of the working set that is hot
+    hot_access: float = 0.9           # hotcold: share of the requests that go to it
+    read_ratio: float = 0.7
+    block_sizes: Tuple[int, ...] = (8, 16, 32, 64, 128)
+    block_weights: Tuple[float, ...] = (0.5, 0.2, 0.15, 0.1, 0.05)
+    scan_prob: float = 0.001          # probability that a request starts a sequential scan
+    scan_length: int = 64             # requests per scan
+    arrival: str = 'poisson'          # 'poisson', 'bursty'
+    rate: float = 1000.0              # poisson: requests/s
+    burst_rate: float = 20000.0       # bursty: requests/s inside a burst
+    idle_rate: float = 200.0          # bursty: requests/s between bursts
+    burst_length: float = 2000.0      # bursty: mean requests per burst
+    idle_length: float = 200.0        # bursty: mean requests per quiet period
+    seek_s: float = 0.004             # service time overhead of a random request
+    seq_s: float = 0.00005            # service time overhead of a sequential request
+    bandwidth: float = 200e6          # transfer rate, bytes/s
+    seed: int = 0
+    chunk: int = CHUNK_REQUESTS
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> 'WorkloadSpec':
+        """Spec from a dict (e.g. JSON); unknown keys raise ValueError."""
+        known = {f.name for f in fields(cls)}
+        unknown = [k for k in values if k not in known]
+        if unknown:
+            raise ValueError(f"Unknown workload option(s): {', '.join(sorted(unknown))}")
+        values = dict(values)
+        for key in ('block_sizes', 'block_weights'):
+            if key in values:
+                values[key] = tuple(values[key])
+        return cls(**values)
+
+    def validate(self) -> None:
+        if self.popularity not in POPULARITIES:
+            raise ValueError(f"Unknown popularity '{self.popularity}' (expected one of {', '.join(POPULARITIES)})")
+        if self.arrival not in ARRIVALS:
+            raise ValueError(f"Unknown arrival '{self.arrival}' (expected one of {', '.join(ARRIVALS)})")
+        if self.working_set < 1 or self.n_requests < 0 or self.chunk < 1:
+            raise ValueError('working_set and chunk must be >= 1, n_requests >= 0')
+        if len(self.block_sizes) != len(self.block_weights):
+            raise ValueError('block_sizes and block_weights must have the same length')
+
+
+# ============================================================================
+# Request generation
+# ============================================================================
+
+class WorkloadGenerator:
+    """Yields chunks of TRACE_DTYPE-like columns; state carries over between chunks."""
+
+    def __init__(self, spec: WorkloadSpec) -> None:
+        spec.validate()
+        self.spec = spec
+        self.rng = np.random.default_rng(spec.seed)
+        n = spec.working_set
+        self._multiplier = next((p for p in _PERMUTATION_PRIMES if math.gcd(p, n) == 1), 1)
+        self._stride = max(spec.block_sizes)    # extents never overlap
+        self._zipf_cdf = None
+        if spec.popularity == 'zipf':
+            weights = np.arange(1, n + 1, dtype=np.float64) ** -spec.zipf_alpha
+            self._zipf_cdf = np.cumsum(weights)
+            self._zipf_cdf /= self._zipf_cdf[-1]
+        weights = np.asarray(spec.block_weights, dtype=np.float64)
+        self._block_cdf = np.cumsum(weights / weights.sum())
+        self._block_sizes = np.asarray(spec.block_sizes, dtype=np.int64)
+        # Carried state: time, previous completion, open scan, arrival phase
+        self._clock = 0.0
+        self._prev_service = 0.0
+        self._scan = None            # (start lba, block size, offset of the last request)
+        self._burst = False
+        self._phase_left = 0
+
+    def _extents(self, n: int) -> np.ndarray:
+        """Popularity rank of each request (0 = most popular)."""
+        spec, rng = self.spec, self.rng
+        if spec.popularity == 'zipf':
+            ranks = np.searchsorted(self._zipf_cdf, rng.random(n))
+            return np.minimum(ranks, spec.working_set - 1)
+        if spec.popularity == 'uniform':
+            return rng.integers(0, spec.working_set, n)
+        hot = max(1, int(spec.working_set * spec.hot_fraction))
+        cold = max(spec.working_set - hot, 1)
+        is_hot = rng.random(n) < spec.hot_access
+        return np.where(is_hot, rng.integers(0, hot, n), hot + rng.integers(0, cold, n) % cold)
+
+    def _lbas(self, ranks: np.ndarray) -> np.ndarray:
+        slot = (ranks.astype(np.uint64) * np.uint64(self._multiplier)) % np.uint64(self.spec.working_set)
+        return self.spec.lba_base + slot.astype(np.int64) * self._stride
+
+    def _apply_scans(self, lba: np.ndarray, block: np.ndarray) -> np.ndarray:
+        """Overwrite lba/block of requests inside scans in place; return the seq flags."""
+        spec = self.spec
+        n = len(lba)
+        idx = np.arange(n)
+        starts = self.rng.random(n) < spec.scan_prob
+        last_start = np.maximum.accumulate(np.where(starts, idx, -1))
+        seq = np.zeros(n, dtype=bool)
+        # Continuation of a scan opened in the previous chunk
+        head = last_start < 0
+        if self._scan is not None and spec.scan_length > 1:
+            start_lba, start_block, done = self._scan
+            offset = done + 1 + idx[head]
+            cont = offset < spec.scan_length
+            pos = idx[head][cont]
+            lba[pos] = start_lba + offset[cont] * start_block
+            block[pos] = start_block
+            seq[pos] = True
+        in_chunk = ~head
+        offset = idx - last_start
+        follow = in_chunk & (offset > 0) & (offset < spec.scan_length)
+        src = last_start[follow]
+        block[follow] = block[src]
+        lba[follow] = lba[src] + offset[follow] * block[src]
+        seq[follow] = True
+        # Scan still open at the end of the chunk
+        if n and last_start[-1] >= 0 and offset[-1] < spec.scan_length - 1:
+            s = last_start[-1]
+            self._scan = (int(lba[s]), int(block[s]), int(offset[-1]))
+        elif n and last_start[-1] < 0 and self._scan is not None:
+            start_lba, start_block, done = self._scan
+            done += n
+            self._scan = (start_lba, start_block, done) if done < spec.scan_length - 1 else None
+        else:
+            self._scan = None
+        return seq
+
+    def _rates(self, n: int) -> np.ndarray:
+        spec = self.spec
+        if spec.arrival == 'poisson':
+            return np.full(n, float(spec.rate))
+        rates = np.empty(n, dtype=np.float64)
+        pos = 0
+        while pos < n:
+            if self._phase_left == 0:
+                self._burst = not self._burst
+                mean = spec.burst_length if self._burst else spec.idle_length
+                self._phase_left = int(self.rng.geometric(1.0 / max(mean, 1.0)))
+            take = min(self._phase_left, n - pos)
+            rates[pos:pos + take] = spec.burst_rate if self._burst else spec.idle_rate
+            pos += take
+            self._phase_left -= take
+        return rates
+
+    def chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Columns timestamp, is_read, lba, block_size, is_seq, inter_arrival, service, idle."""
+        spec, rng = self.spec, self.rng
+        remaining = spec.n_requests
+        while remaining > 0:
+            n = min(spec.chunk, remaining)
+            remaining -= n
+            lba = self._lbas(self._extents(n))
+            block = self._block_sizes[np.searchsorted(self._block_cdf, rng.random(n), side='right')
+                                      .clip(0, len(self._block_sizes) - 1)]
+            is_seq = self._apply_scans(lba, block)
+            is_read = rng.random(n) < spec.read_ratio
+            inter_arrival = rng.exponential(1.0, n) / self._rates(n)
+            timestamp = self._clock + np.cumsum(inter_arrival)
+            self._clock = float(timestamp[-1])
+            service = np.where(is_seq, spec.seq_s, spec.seek_s) + block * SECTOR_BYTES / spec.bandwidth
+            prev_service = np.concatenate(([self._prev_service], service[:-1]))
+            idle = np.maximum(inter_arrival - prev_service, 0.0)
+            self._prev_service = float(service[-1])
+            yield {'timestamp': timestamp, 'is_read': is_read, 'lba': lba, 'block_size': block,
+                   'is_seq': is_seq, 'inter_arrival': inter_arrival, 'service': service, 'idle': idle}
+
+
+# ============================================================================
+# Vectorized text formatting
+# ============================================================================
+
+def _int_width(values: np.ndarray) -> int:
+    return len(str(int(values.max()))) if len(values) else 1
+
+
+def _put_int(rows: np.ndarray, values: np.ndarray, zero_pad: bool = False) -> None:
+    """Write non-negative ints as decimal digits into ``rows`` (one row per character
+    position, one column per request), right-aligned after _PAD bytes or zero-padded."""
+    width = len(rows)
+    dtype = np.uint32 if not len(values) or values.max() < 2 ** 32 else np.uint64
+    v = values.astype(dtype)
+    ten = dtype(10)
+    for k in range(width - 1, -1, -1):
+        v, digit = np.divmod(v, ten)
+        np.add(digit, _ZERO, out=rows[k], casting='unsafe')
+    if not zero_pad:
+        for k in range(width - 1):
+            np.copyto(rows[k], _PAD, where=values < _POWERS_OF_TEN[width - 1 - k])
+
+
+def _put_text(rows: np.ndarray, flags: np.ndarray, if_true: bytes, if_false: bytes) -> None:
+    for k in range(len(rows)):
+        rows[k] = np.where(flags, if_true.ljust(len(rows), b'\0')[k], if_false.ljust(len(rows), b'\0')[k])
+
+
+def format_chunk(cols: Dict[str, np.ndarray]) -> bytes:
+    """Trace lines of one chunk, one request per line.
+
+    The lines are built as a (line width, n) byte matrix, one row per character
+    position, so every digit is written for the whole chunk in one vectorized step.
+    Fields are fixed-width while formatting; their _PAD bytes are then dropped, so the
+    columns are separated by single spaces as in the MSRC .revised traces.
+    """
+    n = len(cols['lba'])
+    if n == 0:
+        return b''
+    fields_ = []        # (kind, width, payload)
+    for name, kind in _LINE_LAYOUT:
+        if kind == 'fixed':
+            scaled = np.rint(cols[name] * _FIXED_SCALE).astype(np.int64)
+            whole, frac = np.divmod(scaled, _FIXED_SCALE)
+            fields_.append(('int', _int_width(whole), whole))
+            fields_.append(('raw', 1, b'.'))
+            fields_.append(('pad', _FIXED_DECIMALS, frac))
+        elif kind == 'int':
+            fields_.append(('int', _int_width(cols[name]), cols[name]))
+        else:
+            if_true, if_false = kind
+            fields_.append(('text', max(len(if_true), len(if_false)), (cols[name], if_true, if_false)))
+        fields_.append(('raw', 1, b' '))
+    fields_[-1] = ('raw', 1, b'\n')
+
+    lines = np.empty((sum(width for _, width, _ in fields_), n), dtype=np.uint8)
+    row = 0
+    for kind, width, payload in fields_:
+        rows = lines[row:row + width]
+        if kind == 'raw':
+            rows[:] = payload[0]
+        elif kind == 'text':
+            _put_text(rows, *payload)
+        else:
+            _put_int(rows, payload, zero_pad=(kind == 'pad'))
+        row += width
+    out = lines.T.ravel()
+    return out[out != _PAD].tobytes()
+
+
+# ============================================================================
+# Output
+# ============================================================================
+
+def _open_output(path: str) -> BinaryIO:
+    if path == '-':
+        return sys.stdout.buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wb', compresslevel=1)
+    return open(path, 'wb')
+
+
+def generate_trace(path: str, spec: Optional[WorkloadSpec] = None, workers: int = 1) -> int:
+    """Write ``spec``'s trace to ``path`` ('-' = stdout, '.gz' = gzip); return the request count.
+
+    Requests are always generated in one process (the random stream and the carried
+    state are sequential); with ``workers`` > 1 the chunks are formatted in a process
+    pool, at most 2 * workers chunks in flight, and written in order. The output is
+    the same for any number of workers.
+    """
+    spec = spec or WorkloadSpec()
+    out = _open_output(path)
+    written = 0
+    try:
+        chunks = WorkloadGenerator(spec).chunks()
+        if workers <= 1:
+            for cols in chunks:
+                out.write(format_chunk(cols))
+                written += len(cols['lba'])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending: deque = deque()
+                for cols in chunks:
+                    pending.append(pool.submit(format_chunk, cols))
+                    written += len(cols['lba'])
+                    if len(pending) >= 2 * workers:
+                        out.write(pending.popleft().result())
+                while pending:
+                    out.write(pending.popleft().result())
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        else:
+            out.flush()
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python workload_gen.py <out> [n_requests] [spec.json] [workers]")
+        sys.exit(1)
+    options = {}
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], 'r') as f:
+            options = json.load(f)
+    if len(sys.argv) > 2:
+        options['n_requests'] = int(float(sys.argv[2]))
+    spec = WorkloadSpec.from_dict(options)
+    count = generate_trace(sys.argv[1], spec, workers=int(sys.argv[4]) if len(sys.argv) > 4 else 1)
+    if sys.argv[1] != '-':
+        print(f"Wrote {sys.argv[1]}: {count} requests ({json.dumps(asdict(spec))})")